@@ -1,4 +1,6 @@
 from django.contrib import admin
+from django.db.models import F, Func, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils.html import format_html
 from django.urls import reverse
 from .models import Employee, ImportLog, Department
@@ -18,31 +20,53 @@ class DepartmentChildrenFilter(admin.SimpleListFilter):
             return queryset.filter(children__isnull=True)
         return queryset
 
+def count_subquery(queryset):
+    """Подзапрос, возвращающий количество записей queryset (0, если записей нет)"""
+    return Coalesce(Subquery(
+        queryset.order_by().annotate(count=Func(F('pk'), function='COUNT')).values('count'),
+        output_field=IntegerField()
+    ), 0)
+
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
-    """Админка для подразделений"""
-    list_display = ['name', 'short_name', 'parent', 'level', 'employee_count', 'children_count']
+    """
+    Админка для подразделений
+
+    Количества сотрудников и вложенных подразделений хранятся в самой
+    модели (см. counters.py), количество дочерних подразделений считается
+    подзапросом в том же запросе, что и список. По всем столбцам можно
+    сортировать без дополнительных запросов на строку.
+    """
+    list_display = ['name', 'short_name', 'parent', 'level', 'employee_count', 'subtree_employee_count',
+                    'children_count', 'descendant_count']
     list_filter = ['level', 'parent', DepartmentChildrenFilter]
+    list_select_related = ['parent']
     search_fields = ['name', 'short_name']
     ordering = ['level', 'name']
-    readonly_fields = ['created_at', 'updated_at', 'full_path_display']
+    readonly_fields = ['created_at', 'updated_at', 'full_path_display'] + list(Department.COUNTER_FIELDS)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            children_total=count_subquery(Department.objects.filter(parent=OuterRef('pk'))),
+        )
 
     def employee_count(self, obj):
-        count = obj.employee_set.count()
         url = reverse('admin:employees_employee_changelist') + f'?department__id__exact={obj.id}'
-        return format_html('<a href="{}">{}</a>', url, count)
+        return format_html('<a href="{}">{}</a>', url, obj.direct_employee_count)
     employee_count.short_description = 'Кол-во сотрудников'
+    employee_count.admin_order_field = 'direct_employee_count'
 
     def children_count(self, obj):
-        count = obj.children.count()
+        count = obj.children_total
         if count > 0:
             url = reverse('admin:employees_department_changelist') + f'?parent__id__exact={obj.id}'
             return format_html('<a href="{}">{}</a>', url, count)
         return count
     children_count.short_description = 'Дочерние подразделения'
+    children_count.admin_order_field = 'children_total'
 
     def full_path_display(self, obj):
-        return obj.get_full_path()
+        return obj.full_path
     full_path_display.short_description = 'Полный путь'
 
 @admin.register(Employee)
@@ -52,6 +76,7 @@ class EmployeeAdmin(admin.ModelAdmin):
     list_filter = ['hierarchy', 'department']
     search_fields = ['full_name', 'position', 'phone', 'email']
     readonly_fields = ['created_at', 'updated_at']
+    list_select_related = ['department']
 
     def department_display(self, obj):
         if obj.department:
@@ -68,10 +93,13 @@ class ImportLogAdmin(admin.ModelAdmin):
     """Админка для логов импорта"""
     list_display = ['file_name', 'uploaded_at', 'status_display', 'total_records', 'added', 'updated']
     list_filter = ['status', 'uploaded_at']
-    readonly_fields = ['file_name', 'uploaded_at', 'status', 'total_records', 'added', 'updated', 'errors']
+    readonly_fields = ['file_name', 'source_file', 'uploaded_at', 'started_at', 'finished_at', 'status',
+                       'total_records', 'processed_records', 'added', 'updated', 'rows_per_second', 'errors',
+                       'dry_run', 'applied_at']
 
     def status_display(self, obj):
-        colors = {'success': 'green', 'partial': 'orange', 'failed': 'red'}
+        colors = {'success': 'green', 'partial': 'orange', 'failed': 'red', 'pending': 'gray', 'running': 'blue',
+                  'preview': 'teal'}
         return format_html(
             '<span style="color: {}; font-weight: bold;">{}</span>',
             colors.get(obj.status, 'gray'),
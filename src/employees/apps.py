@@ -5,3 +5,6 @@ class EmployeesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'employees'
     verbose_name = 'Сотрудники'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,103 @@
+"""
+Асинхронные представления API для чтения справочника
+
+Предназначены для запуска под ASGI (phonebook.asgi): запросы обслуживаются
+в цикле событий без перехода в пул потоков на каждый запрос. Данные
+читаются через async ORM и асинхронные методы кэша, индекс автодополнения
+находится в памяти процесса. Поиск и карточка сотрудника подключаются
+вместо синхронных вариантов настройкой EMPLOYEES_ASYNC_API.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views.generic import View
+
+from .autocomplete import autocomplete_index
+from .changefeed import DEFAULT_PAGE_SIZE, EMPLOYEE_FEED_FIELDS, MAX_PAGE_SIZE
+from .details import aget_employee_card, employee_card_response
+from .models import Department, Employee
+from .versioning import aget_directory_version, directory_conditional
+
+SUBTREE_CACHE_KEY = 'employees:subtree:{version}:{pk}:{employees}:{offset}:{limit}'
+SUBTREE_CACHE_TIMEOUT = 60 * 60
+DEFAULT_SUBTREE_MAX_DEPARTMENTS = 1000
+SUBTREE_DEPARTMENT_FIELDS = ['id', 'name', 'short_name', 'parent_id', 'level', 'full_path',
+                             *Department.COUNTER_FIELDS]
+
+
+@method_decorator(directory_conditional(public=True), name='get')
+class EmployeeSearchAPIView(View):
+    """
+    API endpoint для поиска сотрудников (асинхронный)
+    """
+    async def get(self, request):
+        query = request.GET.get('query', '').strip()
+
+        if not query or len(query) < 2:
+            return JsonResponse({'results': []})
+
+        results = await autocomplete_index.asearch(query, limit=15)
+
+        return JsonResponse({'results': results})
+
+
+class EmployeeDetailAPIView(View):
+    """
+    API endpoint для получения детальной информации о сотруднике (асинхронный)
+    """
+    async def get(self, request, pk):
+        return employee_card_response(request, await aget_employee_card(pk))
+
+
+@method_decorator(directory_conditional(public=True), name='get')
+class DepartmentSubtreeAPIView(View):
+    """
+    API endpoint поддерева подразделения: само подразделение и все вложенные
+    со счётчиками; с параметром employees=1 — также сотрудники поддерева,
+    постранично (offset, limit; следующая страница — next_offset).
+    Поддерево больше EMPLOYEES_SUBTREE_MAX_DEPARTMENTS подразделений
+    отклоняется: его нужно запрашивать по частям.
+    """
+    async def get(self, request, pk):
+        with_employees = request.GET.get('employees') in ('1', 'true')
+        try:
+            offset = max(int(request.GET.get('offset', 0)), 0)
+            limit = max(1, min(int(request.GET.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+        except ValueError:
+            return JsonResponse({'error': 'Параметры offset и limit должны быть числами'}, status=400)
+        if not with_employees:
+            offset = limit = 0
+
+        key = SUBTREE_CACHE_KEY.format(version=await aget_directory_version(), pk=pk,
+                                       employees=int(with_employees), offset=offset, limit=limit)
+        data = await cache.aget(key)
+        if data is None:
+            data = await self.build_subtree(pk, with_employees, offset, limit)
+            await cache.aset(key, data, SUBTREE_CACHE_TIMEOUT)
+        if 'error' in data:
+            return JsonResponse(data, status=400)
+        return JsonResponse(data)
+
+    async def build_subtree(self, pk, with_employees, offset, limit):
+        root = await Department.objects.filter(pk=pk).values('path', 'descendant_count').afirst()
+        if root is None:
+            raise Http404('Подразделение не найдено')
+        max_departments = getattr(settings, 'EMPLOYEES_SUBTREE_MAX_DEPARTMENTS', DEFAULT_SUBTREE_MAX_DEPARTMENTS)
+        if root['descendant_count'] + 1 > max_departments:
+            return {'error': f'Поддерево слишком велико (больше {max_departments} подразделений), '
+                             f'запросите вложенные подразделения по отдельности'}
+
+        path = root['path']
+        departments = Department.objects.filter(Department.subtree_q(path)).order_by('path')
+        data = {
+            'id': pk,
+            'departments': [row async for row in departments.values(*SUBTREE_DEPARTMENT_FIELDS)],
+        }
+        if with_employees:
+            employees = (Employee.objects.filter(Department.subtree_q(path, prefix='department__'))
+                         .order_by(*Employee._meta.ordering, 'id'))
+            rows = [row async for row in employees.values('id', *EMPLOYEE_FEED_FIELDS)[offset:offset + limit + 1]]
+            data['employees'] = rows[:limit]
+            data['next_offset'] = offset + limit if len(rows) > limit else None
+        return data
@@ -0,0 +1,304 @@
+"""
+Индекс автодополнения для быстрого поиска сотрудников (typeahead)
+
+Индекс хранится в памяти процесса и отвечает на запросы без обращения к базе:
+- отсортированный список слов работает как префиксное дерево (поиск
+  диапазона префикса двоичным поиском);
+- триграммный индекс слов находит варианты с опечатками;
+- запрос дополнительно проверяется в другой раскладке клавиатуры
+  (ghbdtn → привет) и в транслитерации (ivanov → иванов).
+
+Индекс строится лениво при первом запросе и обновляется по сигналам
+сохранения и удаления сотрудников. Номер версии справочника
+(versioning.get_directory_version) служит признаком актуальности: если данные менялись
+в обход индекса, при следующем запросе он перестраивается в фоновом потоке.
+Перестройка выполняется одна на процесс, а запросы до её окончания
+обслуживает прежний индекс; ждать приходится только первому построению.
+"""
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+
+from .models import Employee
+from .search import normalize_text, phone_tokens, tokenize
+from .versioning import aget_directory_version, get_directory_version
+
+# Веса полей при ранжировании
+FULL_NAME_WEIGHT = 3
+PHONE_WEIGHT = 3
+SHORT_NAME_WEIGHT = 2
+POSITION_WEIGHT = 1
+DEPARTMENT_WEIGHT = 1
+
+EXACT_MATCH_FACTOR = 3
+PREFIX_MATCH_FACTOR = 2
+MIN_FUZZY_TOKEN_LENGTH = 3
+MIN_TRIGRAM_SIMILARITY = 0.25
+
+LATIN_LAYOUT = "qwertyuiop[]asdfghjkl;'zxcvbnm,.`"
+CYRILLIC_LAYOUT = 'йцукенгшщзхъфывапролджэячсмитьбюё'
+LAYOUT_SWITCH = str.maketrans(
+    LATIN_LAYOUT + LATIN_LAYOUT.upper() + CYRILLIC_LAYOUT + CYRILLIC_LAYOUT.upper(),
+    CYRILLIC_LAYOUT + CYRILLIC_LAYOUT.upper() + LATIN_LAYOUT + LATIN_LAYOUT.upper(),
+)
+
+# Транслитерация латиницы в кириллицу (сочетания букв проверяются первыми)
+TRANSLITERATION = {
+    'shch': 'щ', 'sch': 'щ', 'yo': 'е', 'zh': 'ж', 'kh': 'х', 'ts': 'ц', 'ch': 'ч',
+    'sh': 'ш', 'yu': 'ю', 'ya': 'я', 'ye': 'е', 'a': 'а', 'b': 'б', 'v': 'в', 'g': 'г',
+    'd': 'д', 'e': 'е', 'z': 'з', 'i': 'и', 'y': 'ы', 'k': 'к', 'l': 'л', 'm': 'м',
+    'n': 'н', 'o': 'о', 'p': 'п', 'r': 'р', 's': 'с', 't': 'т', 'u': 'у', 'f': 'ф',
+    'h': 'х', 'c': 'ц', 'j': 'й', 'w': 'в', 'x': 'кс', 'q': 'к',
+}
+TRANSLITERATION_MAX_LENGTH = max(len(key) for key in TRANSLITERATION)
+
+executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='employees-autocomplete')
+
+
+def switch_layout(text):
+    """Переводит текст, набранный в другой раскладке клавиатуры"""
+    return text.translate(LAYOUT_SWITCH)
+
+
+def transliterate(text):
+    """Переводит латинскую транслитерацию в кириллицу"""
+    text = text.lower()
+    result = []
+    position = 0
+    while position < len(text):
+        for length in range(TRANSLITERATION_MAX_LENGTH, 0, -1):
+            chunk = text[position:position + length]
+            if chunk in TRANSLITERATION:
+                result.append(TRANSLITERATION[chunk])
+                position += length
+                break
+        else:
+            result.append(text[position])
+            position += 1
+    return ''.join(result)
+
+
+def trigrams(token):
+    """Возвращает множество триграмм слова (с маркерами начала и конца)"""
+    padded = f'${token}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def employee_payload(employee):
+    """Данные сотрудника, которые возвращает API поиска"""
+    return {
+        'id': employee.id,
+        'full_name': employee.full_name,
+        'position': employee.position,
+        'department': employee.department.name if employee.department else "Без подразделения",
+        'phone': employee.phone
+    }
+
+
+def employee_tokens(employee):
+    """Возвращает слова сотрудника с весами полей"""
+    department = employee.department
+    weighted = {}
+
+    def add(tokens, weight):
+        for token in tokens:
+            weighted[token] = max(weight, weighted.get(token, 0))
+
+    add(tokenize(employee.full_name), FULL_NAME_WEIGHT)
+    for phone in (employee.phone, employee.internal_phone):
+        add(tokenize(phone), PHONE_WEIGHT)
+        add(phone_tokens(phone), PHONE_WEIGHT)
+    add(tokenize(employee.position), POSITION_WEIGHT)
+    if department:
+        add(tokenize(department.short_name), SHORT_NAME_WEIGHT)
+        add(tokenize(department.name), DEPARTMENT_WEIGHT)
+    return weighted
+
+
+class AutocompleteIndex:
+    """Индекс автодополнения по сотрудникам"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.rebuild_lock = threading.Lock()
+        self.version = None
+        self.payloads = {}
+        self.employee_tokens = {}
+        self.postings = {}
+        self.sorted_tokens = []
+        self.trigram_tokens = {}
+
+    def rebuild(self):
+        """Полностью перестраивает индекс по данным из базы"""
+        # Новый индекс строится отдельно, пока прежний отвечает на запросы,
+        # и подменяет его целиком
+        version = get_directory_version()
+        fresh = AutocompleteIndex()
+        for employee in Employee.objects.select_related('department').iterator(chunk_size=2000):
+            fresh._add(employee, keep_sorted=False)
+        fresh.sorted_tokens.sort()
+        with self.lock:
+            self.payloads = fresh.payloads
+            self.employee_tokens = fresh.employee_tokens
+            self.postings = fresh.postings
+            self.sorted_tokens = fresh.sorted_tokens
+            self.trigram_tokens = fresh.trigram_tokens
+            self.version = version
+
+    def ensure_current(self, version=None):
+        """
+        Проверяет, соответствует ли индекс текущей версии данных. Первое
+        построение выполняется сразу, последующие перестройки — в фоне
+        """
+        if version is None:
+            version = get_directory_version()
+        if self.version == version:
+            return
+        if self.version is None:
+            with self.rebuild_lock:
+                if self.version is None:
+                    self.rebuild()
+        elif self.rebuild_lock.acquire(blocking=False):
+            executor.submit(self._rebuild_in_background)
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        finally:
+            self.rebuild_lock.release()
+            connection.close()
+
+    def update_employee(self, employee):
+        """Добавляет или обновляет сотрудника в индексе"""
+        if self.version is None:
+            return
+        with self.lock:
+            self._remove(employee.pk)
+            self._add(employee, keep_sorted=True)
+            self._advance_version()
+
+    def remove_employee(self, employee_id):
+        """Удаляет сотрудника из индекса"""
+        if self.version is None:
+            return
+        with self.lock:
+            self._remove(employee_id)
+            self._advance_version()
+
+    def _advance_version(self):
+        # Изменение применено сразу после увеличения версии. Если с момента
+        # построения индекса версия выросла больше чем на единицу, значит
+        # были и другие изменения, и индекс перестроится при следующем запросе.
+        current = get_directory_version()
+        if self.version is not None and current == self.version + 1:
+            self.version = current
+
+    def _add(self, employee, keep_sorted):
+        tokens = employee_tokens(employee)
+        self.payloads[employee.pk] = employee_payload(employee)
+        self.employee_tokens[employee.pk] = tokens
+        for token, weight in tokens.items():
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = {}
+                if keep_sorted:
+                    insort(self.sorted_tokens, token)
+                else:
+                    self.sorted_tokens.append(token)
+                for trigram in trigrams(token):
+                    self.trigram_tokens.setdefault(trigram, set()).add(token)
+            posting[employee.pk] = weight
+
+    def _remove(self, employee_id):
+        self.payloads.pop(employee_id, None)
+        for token in self.employee_tokens.pop(employee_id, {}):
+            posting = self.postings[token]
+            posting.pop(employee_id, None)
+            if posting:
+                continue
+            del self.postings[token]
+            del self.sorted_tokens[bisect_left(self.sorted_tokens, token)]
+            for trigram in trigrams(token):
+                self.trigram_tokens[trigram].discard(token)
+
+    def _prefix_tokens(self, prefix):
+        start = bisect_left(self.sorted_tokens, prefix)
+        end = bisect_left(self.sorted_tokens, prefix + '\uffff', start)
+        return self.sorted_tokens[start:end]
+
+    def _fuzzy_tokens(self, token):
+        query_trigrams = trigrams(token)
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self.trigram_tokens.get(trigram, ()))
+        for candidate, count in shared.items():
+            similarity = count / (len(query_trigrams) + len(trigrams(candidate)) - count)
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                yield candidate, similarity
+
+    def _match_token(self, token):
+        """Возвращает оценки сотрудников, подходящих под одно слово запроса"""
+        scores = {}
+
+        def collect(candidate, factor):
+            for employee_id, weight in self.postings[candidate].items():
+                score = weight * factor
+                if score > scores.get(employee_id, 0):
+                    scores[employee_id] = score
+
+        for candidate in self._prefix_tokens(token):
+            collect(candidate, EXACT_MATCH_FACTOR if candidate == token else PREFIX_MATCH_FACTOR)
+        if not scores and len(token) >= MIN_FUZZY_TOKEN_LENGTH:
+            for candidate, similarity in self._fuzzy_tokens(token):
+                collect(candidate, similarity)
+        return scores
+
+    def _match_query(self, query):
+        """Возвращает суммарные оценки сотрудников, подходящих под все слова запроса"""
+        total = None
+        for token in tokenize(query):
+            scores = self._match_token(token)
+            if total is None:
+                total = scores
+            else:
+                total = {pk: total[pk] + score for pk, score in scores.items() if pk in total}
+            if not total:
+                return {}
+        return total or {}
+
+    def search(self, query, limit=15):
+        """Возвращает данные наиболее подходящих сотрудников для запроса"""
+        self.ensure_current()
+        return self._search(query, limit)
+
+    async def asearch(self, query, limit=15):
+        """
+        Асинхронный вариант search: версия проверяется через асинхронный
+        кэш, а первое построение индекса (запросы к базе) выполняется в потоке
+        """
+        version = await aget_directory_version()
+        if self.version is None:
+            await sync_to_async(self.ensure_current)(version)
+        else:
+            self.ensure_current(version)
+        return self._search(query, limit)
+
+    def _search(self, query, limit):
+        variants = dict.fromkeys(normalize_text(variant) for variant in (
+            query, switch_layout(query), transliterate(query)
+        ))
+        with self.lock:
+            best = {}
+            for variant in variants:
+                for employee_id, score in self._match_query(variant).items():
+                    if score > best.get(employee_id, 0):
+                        best[employee_id] = score
+            ranked = sorted(best, key=lambda pk: (-best[pk], self.payloads[pk]['full_name']))
+            return [self.payloads[pk] for pk in ranked[:limit]]
+
+
+autocomplete_index = AutocompleteIndex()
@@ -0,0 +1,57 @@
+"""
+Пакетная вставка записей
+
+На PostgreSQL с psycopg 3 крупные пакеты записываются командой COPY:
+идентификаторы заранее берутся из последовательности таблицы, поэтому
+объекты после вставки получают pk так же, как после bulk_create.
+На остальных базах (и для небольших пакетов) используется bulk_create.
+"""
+from django.db import connections, router
+
+COPY_THRESHOLD = 500
+
+
+def can_copy(connection):
+    """COPY доступен только на PostgreSQL с драйвером psycopg 3"""
+    if connection.vendor != 'postgresql':
+        return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    return is_psycopg3
+
+
+def copy_insert(model, objs, connection):
+    """Вставляет объекты одной командой COPY и проставляет им pk"""
+    meta = model._meta
+    # Поля со значением по умолчанию на стороне базы COPY заполнит сам
+    fields = [field for field in meta.concrete_fields if not field.has_db_default()]
+    quote_name = connection.ops.quote_name
+    columns = ', '.join(quote_name(field.column) for field in fields)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+            [meta.db_table, meta.pk.column, len(objs)]
+        )
+        for obj, (pk,) in zip(objs, cursor.fetchall()):
+            obj.pk = pk
+
+        with cursor.copy(f'COPY {quote_name(meta.db_table)} ({columns}) FROM STDIN') as copy:
+            for obj in objs:
+                # pre_save заполняет auto_now/auto_now_add, как при bulk_create
+                copy.write_row([
+                    field.get_db_prep_save(field.pre_save(obj, add=True), connection) for field in fields
+                ])
+
+    for obj in objs:
+        obj._state.adding = False
+        obj._state.db = connection.alias
+
+
+def bulk_insert(model, objs, batch_size=None):
+    """Вставляет объекты через COPY, если это возможно, иначе через bulk_create"""
+    objs = list(objs)
+    connection = connections[router.db_for_write(model)]
+    if len(objs) >= COPY_THRESHOLD and can_copy(connection):
+        copy_insert(model, objs, connection)
+        return objs
+    return model.objects.bulk_create(objs, batch_size=batch_size)
@@ -0,0 +1,171 @@
+"""
+Журнал изменений и инкрементальная синхронизация справочника
+
+Сохранения и удаления сотрудников и подразделений (сигналы) и пакетные
+операции импорта записывают в DirectoryChange тип объекта, его
+идентификатор и действие. Клиент хранит курсор последней полученной
+записи и запрашивает только более новые:
+
+    GET /api/changes/?since=<курсор>&limit=<размер страницы>
+
+Курсор — пара «транзакция:id». На PostgreSQL id выдаётся при вставке,
+и транзакция, начавшаяся раньше, может зафиксироваться позже и с
+меньшими id, чем уже отданные клиенту. Поэтому записи упорядочены по
+транзакции, а отдаются только транзакции старше самой старой ещё
+выполняющейся (xmin снимка): всё, что появится позже, окажется после
+курсора. Длинная транзакция задерживает ленту, но не теряет записи.
+На SQLite пишущие транзакции выполняются по одной, транзакция всегда 0
+и курсор сводится к id. Целое число в since — курсор старого формата,
+равный паре (0, id).
+
+Ответ содержит по одной записи на объект (последнее действие в пределах
+страницы) с актуальными данными объекта. Объект, которого уже нет в базе,
+отдаётся как удалённый; update клиент применяет как «вставить или
+заменить». Поэтому журнал можно сжимать, оставляя только последнюю запись
+по каждому объекту (compact_changes): синхронизация с любого курсора,
+в том числе с нуля, по-прежнему приводит к актуальному состоянию.
+"""
+from django.db import connections
+from django.db.models import BigIntegerField, Exists, F, Func, OuterRef, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.lookups import GreaterThan
+
+from .bulk import bulk_insert
+from .models import Department, DirectoryChange, Employee
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 2000
+CHANGE_BATCH_SIZE = 1000
+CURSOR_SEPARATOR = ':'
+
+EMPLOYEE_FEED_FIELDS = ['full_name', 'initials', 'position', 'department_id', 'phone', 'internal_phone',
+                        'email', 'room', 'hierarchy']
+DEPARTMENT_FEED_FIELDS = ['name', 'short_name', 'parent_id', 'level', 'full_path']
+FEED_FIELDS = {
+    'department': (Department, DEPARTMENT_FEED_FIELDS),
+    'employee': (Employee, EMPLOYEE_FEED_FIELDS),
+}
+
+
+def record_changes(object_type, object_ids, action):
+    """Записывает в журнал изменение объектов одного типа"""
+    bulk_insert(
+        DirectoryChange,
+        [DirectoryChange(object_type=object_type, object_id=pk, action=action) for pk in object_ids],
+        batch_size=CHANGE_BATCH_SIZE,
+    )
+
+
+def record_change(instance, action):
+    """Записывает в журнал изменение одного сотрудника или подразделения"""
+    object_type = 'employee' if isinstance(instance, Employee) else 'department'
+    DirectoryChange.objects.create(object_type=object_type, object_id=instance.pk, action=action)
+
+
+def load_objects(object_type, ids):
+    """Возвращает {id: данные} существующих объектов одного типа"""
+    model, fields = FEED_FIELDS[object_type]
+    return {row['id']: row for row in model.objects.filter(pk__in=ids).values('id', *fields)}
+
+
+def parse_cursor(value):
+    """
+    Разбирает курсор «транзакция:id» или старый целочисленный курсор.
+
+    Возвращает пару (transaction_id, id); ValueError — при неверном формате.
+    """
+    value = (value or '').strip()
+    if not value:
+        return 0, 0
+    transaction_id, _, change_id = value.rpartition(CURSOR_SEPARATOR)
+    return max(int(transaction_id or 0), 0), max(int(change_id), 0)
+
+
+def format_cursor(transaction_id, change_id):
+    """Курсор для ответа клиенту"""
+    return f'{transaction_id}{CURSOR_SEPARATOR}{change_id}'
+
+
+def committed_changes():
+    """
+    Записи журнала, после которых уже не может зафиксироваться ни одна
+    запись с меньшим курсором
+    """
+    changes = DirectoryChange.objects.all()
+    if connections[changes.db].vendor == 'postgresql':
+        changes = changes.filter(transaction_id__lt=RawSQL(
+            '(pg_snapshot_xmin(pg_current_snapshot())::text)::bigint', []))
+    return changes
+
+
+def cursor_row(transaction_id, change_id):
+    """Значение строки (transaction_id, id) для сравнения курсоров"""
+    return Func(transaction_id, change_id, template='(%(expressions)s)', output_field=BigIntegerField())
+
+
+def after_cursor(transaction_id, change_id):
+    """
+    Условие «запись после курсора»: (transaction_id, id) > (...)
+
+    Сравнение строк целиком даёт индексу по (transaction_id, id) точную
+    начальную границу даже внутри одной большой транзакции импорта.
+    """
+    return GreaterThan(cursor_row(F('transaction_id'), F('id')), cursor_row(transaction_id, change_id))
+
+
+def get_changes(since=(0, 0), limit=DEFAULT_PAGE_SIZE):
+    """
+    Возвращает страницу изменений после курсора since (пара из parse_cursor).
+
+    Курсор следующей страницы — поле version ответа; has_more говорит,
+    остались ли записи после него.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    entries = list(committed_changes().filter(after_cursor(Value(since[0]), Value(since[1])))
+                   .order_by('transaction_id', 'id')
+                   .values_list('transaction_id', 'id', 'object_type', 'object_id', 'action')[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    latest = {}
+    inserted = set()
+    for _, change_id, object_type, object_id, action in entries:
+        key = (object_type, object_id)
+        latest.pop(key, None)
+        latest[key] = (change_id, action)
+        if action == 'insert':
+            inserted.add(key)
+
+    ids_by_type = {}
+    for object_type, object_id in latest:
+        ids_by_type.setdefault(object_type, []).append(object_id)
+    objects = {object_type: load_objects(object_type, ids) for object_type, ids in ids_by_type.items()}
+
+    changes = []
+    for (object_type, object_id), (change_id, action) in latest.items():
+        data = objects[object_type].get(object_id)
+        record = {'change': change_id, 'type': object_type, 'id': object_id}
+        if action == 'delete' or data is None:
+            record['action'] = 'delete'
+        else:
+            record['action'] = 'insert' if (object_type, object_id) in inserted else 'update'
+            record['data'] = {field: value for field, value in data.items() if field != 'id'}
+        changes.append(record)
+
+    return {
+        'since': format_cursor(*since),
+        'version': format_cursor(*entries[-1][:2]) if entries else format_cursor(*since),
+        'has_more': has_more,
+        'changes': changes,
+    }
+
+
+def compact_changes():
+    """Удаляет записи журнала, перекрытые более поздними записями того же объекта"""
+    later = DirectoryChange.objects.filter(
+        after_cursor(OuterRef('transaction_id'), OuterRef('id')),
+        object_type=OuterRef('object_type'),
+        object_id=OuterRef('object_id'),
+    )
+    deleted, _ = DirectoryChange.objects.filter(Exists(later)).delete()
+    return deleted
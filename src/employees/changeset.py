@@ -0,0 +1,287 @@
+"""
+Предпросмотр импорта (dry-run) и применение сохранённого набора изменений
+
+ChangeSetBuilder читает файл так же, как импорт, но ничего не записывает:
+строки сравниваются со снимком текущих подразделений и сотрудников, и
+результатом становится набор изменений — добавляемые сотрудники,
+обновляемые (с различиями по полям), неизменные и отсутствующие в файле
+(orphaned), а также новые подразделения и изменённые короткие названия.
+
+Набор изменений сериализуется в JSON и хранится в ImportLog.change_set.
+apply_change_set записывает его пакетными запросами без повторного чтения
+файла; записи, изменившиеся в базе после предпросмотра, пропускаются.
+"""
+from .importer import (
+    BATCH_SIZE, DepartmentResolver, EmployeeImporter, get_import_status,
+    load_employee_snapshot, normalize_batch, read_import_file,
+)
+
+DEPARTMENT_PATH_SEPARATOR = ' / '
+FIELD_LABELS = {
+    'initials': 'Инициалы',
+    'full_name': 'ФИО',
+    'position': 'Должность',
+    'department': 'Подразделение',
+    'phone': 'Телефон',
+    'internal_phone': 'Внутренний телефон',
+    'room': 'Кабинет',
+    'hierarchy': 'Уровень',
+    'email': 'Email',
+}
+
+
+class ChangeSetBuilder:
+    """
+    Строит набор изменений импорта в памяти, не изменяя базу данных
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, progress_callback=None, expected_total=None):
+        self.batch_size = batch_size
+        self.progress_callback = progress_callback
+        self.expected_total = expected_total
+        self.total = 0
+        self.errors = []
+
+        self.departments = DepartmentResolver().by_names
+        self.department_names = {dept.pk: names for names, dept in self.departments.items()}
+        self.existing = load_employee_snapshot()
+
+        self.new_departments = {}
+        self.short_names = {}
+        self.creates = {}
+        self.updates = {}
+        self.unchanged = set()
+        self.seen = set()
+        # Строки, которые импорт засчитал бы в ImportLog.updated: найденные
+        # в базе и повторы ключа в файле
+        self.matched_rows = 0
+
+    @property
+    def added(self):
+        return len(self.creates)
+
+    @property
+    def updated(self):
+        return len(self.updates)
+
+    def run(self, rows):
+        """Сравнивает строки файла с базой и возвращает набор изменений"""
+        batch = []
+        for row_number, row in rows:
+            self.total += 1
+            batch.append((row_number, row))
+            if len(batch) >= self.batch_size:
+                self.process_batch(batch)
+                batch = []
+        if batch:
+            self.process_batch(batch)
+        return self.build()
+
+    def process_batch(self, batch):
+        for row_number, chain, data in normalize_batch(batch):
+            self.process_row(row_number, chain, data)
+        if self.progress_callback:
+            self.progress_callback(self)
+
+    def process_row(self, row_number, chain, data):
+        # Как и при импорте, подразделения учитываются и для строк с ошибками
+        department_id = self.resolve_department(chain)
+
+        if isinstance(data, Exception):
+            self.errors.append(f"Строка {row_number}: {str(data)}")
+            return
+
+        if not data['full_name']:
+            self.errors.append(f"Строка {row_number}: Отсутствует ФИО")
+            return
+
+        data['department'] = chain
+        key = (data['full_name'], data['internal_phone'])
+        current = self.existing.get(key)
+        if current is not None or key in self.seen:
+            self.matched_rows += 1
+        self.seen.add(key)
+
+        if current is None:
+            # Повтор ключа в файле: побеждает последняя строка
+            self.creates[key] = data
+            return
+
+        changes = []
+        # Ключевые поля сохраняются всегда: по ним проверяется, что запись
+        # не изменилась в базе между предпросмотром и применением
+        old_values = {'full_name': current['full_name'], 'internal_phone': current['internal_phone']}
+        for field, value in data.items():
+            compared_field = 'department_id' if field == 'department' else field
+            old = current[compared_field]
+            new = department_id if field == 'department' else value
+            if field == 'department' and new is None and chain:
+                new = chain  # Подразделение будет создано
+            if old != new:
+                old_values[compared_field] = old
+                changes.append({
+                    'field': field,
+                    'label': FIELD_LABELS[field],
+                    'old': self.display(field, old),
+                    'new': self.display(field, new),
+                })
+
+        pk = current['pk']
+        if changes:
+            self.unchanged.discard(pk)
+            self.updates[pk] = {'id': pk, 'changes': changes, 'old': old_values, 'data': data}
+        else:
+            self.updates.pop(pk, None)
+            self.unchanged.add(pk)
+
+    def resolve_department(self, chain):
+        """
+        Возвращает id существующего подразделения цепочки или None и
+        запоминает подразделения, которые будут созданы или переименованы
+        """
+        names = ()
+        dept = None
+        for name, short_name in chain:
+            names += (name,)
+            dept = self.departments.get(names)
+            if dept is None:
+                # Как и при импорте, побеждает последнее непустое короткое название
+                if short_name or names not in self.new_departments:
+                    self.new_departments[names] = short_name
+            elif short_name and short_name != dept.short_name:
+                self.short_names[dept.pk] = (dept.short_name, short_name)
+            elif short_name:
+                self.short_names.pop(dept.pk, None)
+        return dept.pk if dept is not None else None
+
+    def final_chain(self, names):
+        """
+        Возвращает цепочку подразделений с итоговыми короткими названиями,
+        чтобы результат применения не зависел от порядка записей
+        """
+        chain = []
+        for depth in range(1, len(names) + 1):
+            dept = self.departments.get(names[:depth])
+            if dept is None:
+                short_name = self.new_departments[names[:depth]]
+            else:
+                short_name = self.short_names.get(dept.pk, (None, dept.short_name))[1]
+            chain.append([names[depth - 1], short_name])
+        return chain
+
+    def display(self, field, value):
+        """Возвращает значение поля в виде, пригодном для показа"""
+        if field != 'department':
+            return value
+        if value is None:
+            return ''
+        if isinstance(value, tuple):
+            return DEPARTMENT_PATH_SEPARATOR.join(name for name, _ in value)
+        return DEPARTMENT_PATH_SEPARATOR.join(self.department_names.get(value, ()))
+
+    def build(self):
+        """Возвращает набор изменений в виде, пригодном для сохранения в JSON"""
+        orphaned = [
+            {
+                'id': values['pk'],
+                'full_name': values['full_name'],
+                'internal_phone': values['internal_phone'],
+                'department': self.display('department', values['department_id']),
+            }
+            for key, values in self.existing.items() if key not in self.seen
+        ]
+        return {
+            'summary': {
+                'total': self.total,
+                'added': len(self.creates),
+                'updated': len(self.updates),
+                'unchanged': len(self.unchanged),
+                'matched_rows': self.matched_rows,
+                'orphaned': len(orphaned),
+                'errors': len(self.errors),
+                'new_departments': len(self.new_departments),
+                'renamed_departments': len(self.short_names),
+            },
+            'departments': {
+                'added': [
+                    {
+                        'path': DEPARTMENT_PATH_SEPARATOR.join(names),
+                        'short_name': short_name,
+                        'chain': self.final_chain(names),
+                    }
+                    for names, short_name in self.new_departments.items()
+                ],
+                'updated': [
+                    {
+                        'id': pk,
+                        'path': self.display('department', pk),
+                        'short_name': list(short_names),
+                        'chain': self.final_chain(self.department_names[pk]),
+                    }
+                    for pk, short_names in self.short_names.items()
+                ],
+            },
+            'added': [
+                {**data, 'department': self.final_chain(tuple(name for name, _ in data['department']))}
+                for data in self.creates.values()
+            ],
+            'updated': [
+                {**entry, 'data': {
+                    **entry['data'],
+                    'department': self.final_chain(tuple(name for name, _ in entry['data']['department'])),
+                }}
+                for entry in self.updates.values()
+            ],
+            'unchanged': sorted(self.unchanged),
+            'orphaned': orphaned,
+            'errors': self.errors,
+        }
+
+
+def preview_file(file, progress_callback=None):
+    """Строит набор изменений для файла, не изменяя базу данных"""
+    rows = read_import_file(file)
+    builder = ChangeSetBuilder(progress_callback=progress_callback, expected_total=rows.total)
+    return builder.run(rows)
+
+
+def load_chain(department):
+    """Восстанавливает цепочку подразделений из JSON"""
+    return tuple(tuple(pair) for pair in department)
+
+
+def get_matched_rows(summary):
+    """Число строк для ImportLog.updated (в старых наборах изменений его нет)"""
+    return summary.get('matched_rows', summary['updated'] + summary['unchanged'])
+
+
+def apply_change_set(change_set, progress_callback=None):
+    """Применяет сохранённый набор изменений и возвращает результат импорта"""
+    creates = {}
+    for data in change_set['added']:
+        data = {**data, 'department': load_chain(data['department'])}
+        creates[(data['full_name'], data['internal_phone'])] = data
+
+    updates = {}
+    for entry in change_set['updated']:
+        data = {**entry['data'], 'department': load_chain(entry['data']['department'])}
+        updates[entry['id']] = (entry['old'], data)
+
+    departments = change_set['departments']
+    department_chains = [load_chain(dept['chain']) for dept in departments['added'] + departments['updated']]
+
+    importer = EmployeeImporter(progress_callback=progress_callback)
+    result = importer.apply(creates, updates, total=change_set['summary']['total'],
+                            department_chains=department_chains)
+    errors = change_set['errors'] + result['errors']
+    # updated в ImportLog — как при импорте файла: все найденные строки,
+    # кроме пропущенных из-за изменений после предпросмотра
+    updated = get_matched_rows(change_set['summary']) - (len(updates) - result['updated'])
+    return {
+        'status': get_import_status(result['added'], updated, errors),
+        'total': result['total'],
+        'added': result['added'],
+        'updated': updated,
+        'unchanged': change_set['summary']['unchanged'],
+        'errors': errors,
+    }
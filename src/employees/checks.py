@@ -0,0 +1,28 @@
+"""
+Системные проверки настроек приложения
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Warning, register
+from django.db import connection
+
+
+@register()
+def check_import_progress_cache(app_configs, **kwargs):
+    """
+    На SQLite ход фонового импорта публикуется только через кэш (см. jobs.py),
+    поэтому кэш в памяти процесса не подходит для нескольких процессов
+    """
+    if settings.DEBUG or connection.vendor != 'sqlite':
+        return []
+    if not isinstance(caches['default'], (LocMemCache, DummyCache)):
+        return []
+    return [Warning(
+        'На SQLite ход фонового импорта публикуется через кэш, а кэш по умолчанию '
+        'хранится в памяти процесса: другие процессы его не видят',
+        hint='Если импорт выполняет команда process_imports или веб работает в нескольких '
+             'процессах, задайте в CACHES общий кэш (например, FileBasedCache или Redis)',
+        id='employees.W001',
+    )]
@@ -0,0 +1,117 @@
+"""
+Счётчики сотрудников и вложенных подразделений в Department
+
+direct_employee_count — сотрудники самого подразделения,
+subtree_employee_count — сотрудники подразделения и всех вложенных,
+descendant_count — количество всех вложенных подразделений.
+
+При создании, переводе и удалении сотрудника и при создании подразделения
+счётчики меняются приращениями (F-выражения) для подразделения и его
+предков, найденных по материализованному пути. Перемещение и удаление
+подразделений, а также импорт, обходящий сигналы, пересчитывают счётчики
+целиком одним проходом (rebuild_department_counters) — не чаще раза на
+транзакцию (schedule_counter_rebuild). Уменьшение не опускает счётчик ниже
+нуля: если счётчики разошлись с данными (например, после удаления в обход
+сигналов), сохранение не падает на ограничении поля, а расхождение исправит
+следующий пересчёт.
+"""
+from django.db import models
+from django.db.models import Case, Count, F, Value, When
+from django.db.models.functions import Greatest
+
+from .models import Department, Employee
+from .versioning import bump_directory_version, on_commit_once
+
+COUNTER_BATCH_SIZE = 1000
+
+
+def shift_counter(field, delta):
+    """Выражение field + delta, не опускающееся ниже нуля"""
+    if delta >= 0:
+        return F(field) + delta
+    return Greatest(F(field) + delta, Value(0), output_field=models.PositiveIntegerField())
+
+
+def get_department_path(department_id):
+    return Department.objects.filter(pk=department_id).values_list('path', flat=True).first()
+
+
+def adjust_employee_counters(department_id, delta):
+    """Изменяет счётчики сотрудников подразделения и его предков на delta"""
+    if department_id is None:
+        return
+    path = get_department_path(department_id)
+    if not path:
+        return
+    Department.objects.filter(pk__in=Department.ids_from_path(path)).update(
+        direct_employee_count=Case(
+            When(pk=department_id, then=shift_counter('direct_employee_count', delta)),
+            default=F('direct_employee_count'),
+            output_field=models.PositiveIntegerField(),
+        ),
+        subtree_employee_count=shift_counter('subtree_employee_count', delta),
+    )
+
+
+def move_employee_counters(old_department_id, new_department_id):
+    """Переносит сотрудника между подразделениями в счётчиках"""
+    if old_department_id == new_department_id:
+        return
+    adjust_employee_counters(old_department_id, -1)
+    adjust_employee_counters(new_department_id, 1)
+
+
+def add_department_counters(parent_id):
+    """Учитывает новое подразделение в счётчиках его предков"""
+    if parent_id is None:
+        return
+    path = get_department_path(parent_id)
+    if path:
+        Department.objects.filter(pk__in=Department.ids_from_path(path)).update(
+            descendant_count=F('descendant_count') + 1
+        )
+
+
+def rebuild_department_counters():
+    """
+    Пересчитывает все счётчики двумя запросами на чтение и сохраняет
+    только изменившиеся (увеличивая версию справочника). Возвращает
+    количество обновлённых подразделений.
+    """
+    departments = list(Department.objects.order_by('path').only('id', 'parent_id', 'path', *Department.COUNTER_FIELDS))
+    counts = dict(Employee.objects.filter(department__isnull=False)
+                  .order_by().values_list('department_id').annotate(count=Count('id')))
+
+    computed = {dept.pk: [counts.get(dept.pk, 0), counts.get(dept.pk, 0), 0] for dept in departments}
+    # Пути упорядочены так, что потомки идут после предков:
+    # обратный обход суммирует значения снизу вверх
+    for dept in reversed(departments):
+        parent = computed.get(dept.parent_id)
+        if parent is not None:
+            direct, subtree, descendants = computed[dept.pk]
+            parent[1] += subtree
+            parent[2] += descendants + 1
+
+    changed = []
+    for dept in departments:
+        values = computed[dept.pk]
+        if [getattr(dept, field) for field in Department.COUNTER_FIELDS] != values:
+            for field, value in zip(Department.COUNTER_FIELDS, values):
+                setattr(dept, field, value)
+            changed.append(dept)
+    if changed:
+        # Каждая порция — отдельный bulk_update: вне внешней транзакции (импорт
+        # на SQLite) блокировка записи не держится на весь пересчёт
+        for start in range(0, len(changed), COUNTER_BATCH_SIZE):
+            Department.objects.bulk_update(changed[start:start + COUNTER_BATCH_SIZE], Department.COUNTER_FIELDS)
+        bump_directory_version()
+    return len(changed)
+
+
+def schedule_counter_rebuild():
+    """
+    Пересчитывает счётчики после фиксации текущей транзакции, один раз на
+    транзакцию: каскадное удаление дерева вызывает сигнал для каждого
+    удалённого подразделения
+    """
+    on_commit_once(rebuild_department_counters)
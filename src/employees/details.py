@@ -0,0 +1,92 @@
+"""
+Карточка сотрудника для модального окна справочника
+
+Карточка строится одним запросом (сотрудник вместе с подразделением и его
+сохранённым полным путём). Вместе с данными кэшируются валидаторы ответа:
+ETag и Last-Modified по времени изменения сотрудника и подразделения.
+Ключ кэша содержит версию справочника, поэтому после любых изменений
+карточки строятся заново, а повторные и условные запросы обслуживаются
+без обращения к базе. Для асинхронных представлений есть варианты
+функций с префиксом a (async ORM и асинхронный кэш).
+"""
+from django.core.cache import cache
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Employee
+from .versioning import aget_directory_version, get_directory_version, patch_directory_cache_control
+
+CARD_CACHE_KEY = 'employees:card:{version}:{pk}'
+CARD_CACHE_TIMEOUT = 60 * 60
+
+
+def employee_card_queryset(pk):
+    return (Employee.objects.select_related('department')
+            .only('full_name', 'position', 'phone', 'internal_phone', 'email', 'room', 'hierarchy',
+                  'updated_at', 'department__full_path', 'department__updated_at')
+            .filter(pk=pk))
+
+
+def make_employee_card(employee):
+    """Возвращает данные карточки и валидаторы ответа; Http404, если сотрудника нет"""
+    if employee is None:
+        raise Http404('Сотрудник не найден')
+
+    department = employee.department
+    last_modified = employee.updated_at
+    if department and department.updated_at > last_modified:
+        last_modified = department.updated_at
+
+    return {
+        'data': {
+            'full_name': employee.full_name,
+            'position': employee.position,
+            'department': department.full_path if department else 'Не указано',
+            'phone': employee.phone,
+            'internal_phone': employee.internal_phone,
+            'email': employee.email or 'Не указан',
+            'room': employee.room or 'Не указан',
+            'hierarchy': employee.get_hierarchy_display()
+        },
+        'etag': quote_etag(f'{employee.pk}-{last_modified.timestamp():.6f}'),
+        'last_modified': int(last_modified.timestamp()),
+    }
+
+
+def build_employee_card(pk):
+    return make_employee_card(employee_card_queryset(pk).first())
+
+
+async def abuild_employee_card(pk):
+    return make_employee_card(await employee_card_queryset(pk).afirst())
+
+
+def get_employee_card(pk):
+    """Возвращает карточку сотрудника из кэша, при промахе строит её"""
+    key = CARD_CACHE_KEY.format(version=get_directory_version(), pk=pk)
+    card = cache.get(key)
+    if card is None:
+        card = build_employee_card(pk)
+        cache.set(key, card, CARD_CACHE_TIMEOUT)
+    return card
+
+
+async def aget_employee_card(pk):
+    """Асинхронный вариант get_employee_card"""
+    key = CARD_CACHE_KEY.format(version=await aget_directory_version(), pk=pk)
+    card = await cache.aget(key)
+    if card is None:
+        card = await abuild_employee_card(pk)
+        await cache.aset(key, card, CARD_CACHE_TIMEOUT)
+    return card
+
+
+def employee_card_response(request, card):
+    """Ответ с карточкой: 304 при совпадении If-None-Match или If-Modified-Since"""
+    response = get_conditional_response(request, etag=card['etag'], last_modified=card['last_modified'])
+    if response is None:
+        response = JsonResponse(card['data'])
+    response['ETag'] = card['etag']
+    response['Last-Modified'] = http_date(card['last_modified'])
+    return patch_directory_cache_control(response, public=True)
@@ -1,5 +1,6 @@
 from django import forms
 from .models import Employee, Department
+from .readers import SUPPORTED_EXTENSIONS, get_extension
 
 class EmployeeForm(forms.ModelForm):
     """
@@ -23,16 +24,30 @@ class EmployeeForm(forms.ModelForm):
 
 class ImportForm(forms.Form):
     """
-    Форма для импорта данных из Excel
+    Форма для импорта данных из Excel или CSV
     """
     excel_file = forms.FileField(
-        label='Excel файл',
+        label='Excel или CSV файл',
         widget=forms.FileInput(attrs={
             'class': 'form-control',
-            'accept': '.xlsx',
+            'accept': ','.join(SUPPORTED_EXTENSIONS),
         })
     )
 
+    dry_run = forms.BooleanField(
+        label='Только предпросмотр изменений (без записи в базу)',
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+
+    def clean_excel_file(self):
+        file = self.cleaned_data['excel_file']
+        if get_extension(file) not in SUPPORTED_EXTENSIONS:
+            raise forms.ValidationError(
+                f"Неподдерживаемый формат файла. Допустимые форматы: {', '.join(SUPPORTED_EXTENSIONS)}"
+            )
+        return file
+
 
 class SearchForm(forms.Form):
     """
@@ -0,0 +1,515 @@
+"""
+Импорт сотрудников и подразделений
+
+Строки файла обрабатываются пакетами. Для каждого пакета иерархия
+подразделений разрешается в памяти (недостающие подразделения создаются
+через bulk_create по уровням), сотрудники сравниваются со снимком
+существующих записей по ключу (ФИО, внутренний телефон) и записываются
+пакетной вставкой (на PostgreSQL — COPY, см. bulk.py) и bulk_update. Счётчики added/updated совпадают с
+построчным update_or_create: повтор ключа в файле считается обновлением.
+Дополнительно считается unchanged — найденные в файле сотрудники, значения
+которых в итоге не изменились (как в предпросмотре, changeset.py).
+
+Импорт выполняется в одной транзакции, кроме SQLite: там блокировка записи
+одна на всю базу, и другие писатели ждали бы конца импорта дольше
+busy_timeout. Поэтому на SQLite каждый пакет фиксируется отдельной короткой
+транзакцией вместе со своими записями журнала изменений и поискового
+индекса, а между пакетами делается короткая пауза, чтобы ожидающие
+писатели успели взять блокировку. Завершающий шаг (счётчики, версия
+справочника) выполняется и после ошибки, для уже записанных пакетов.
+Прерванный импорт можно повторить тем же файлом: записанные строки
+сопоставятся по ключу.
+"""
+import time
+from contextlib import contextmanager, nullcontext
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .bulk import bulk_insert
+from .changefeed import record_changes
+from .counters import rebuild_department_counters
+from .models import Department, Employee
+from .normalization import (
+    DEFAULT_HIERARCHY, clean_level, clean_value, determine_hierarchy_from_position,
+    extract_short_name, map_column, parse_department_name,
+)
+from .readers import read_rows
+from .search import get_search_backend
+from .versioning import bump_directory_version
+
+REQUIRED_COLUMNS = [
+    'Инициалы', 'ФИО', 'Должность', 'Структурное подразделение 1',
+    'Телефон', 'Внутренний телефон'
+]
+DEPARTMENT_COLUMNS = [f'Структурное подразделение {i}' for i in range(1, 5)]
+EMPLOYEE_FIELDS = [
+    'initials', 'full_name', 'position', 'department', 'phone',
+    'internal_phone', 'room', 'hierarchy', 'email'
+]
+# Столбцы сотрудника в порядке обращения в parse_employee: при отсутствии
+# столбца ошибка строки указывает первый недостающий
+EMPLOYEE_COLUMNS = ['Должность', 'Уровень', 'Инициалы', 'ФИО', 'Телефон', 'Внутренний телефон', 'Кабинет']
+EMPLOYEE_COLUMN_SET = frozenset(EMPLOYEE_COLUMNS)
+BATCH_SIZE = 1000
+SQLITE_BATCH_PAUSE = 0.1  # секунды
+
+
+def parse_department_chain(row):
+    """
+    Возвращает цепочку подразделений строки: кортеж пар (название, короткое название).
+    Построчный вариант; при импорте используется normalize_batch.
+    """
+    chain = []
+    for col_name in DEPARTMENT_COLUMNS:
+        dept_name = clean_value(row.get(col_name, ''))
+        if dept_name:
+            chain.append(extract_short_name(dept_name))
+    return tuple(chain)
+
+
+def parse_employee(row):
+    """
+    Возвращает данные сотрудника из строки (без подразделения).
+    Построчный вариант; при импорте используется normalize_batch.
+    """
+    position = clean_value(row['Должность'])
+    hierarchy = clean_value(row['Уровень'], is_level=True)
+
+    # Если уровень не указан или указан некорректно, определяем по должности
+    if hierarchy == DEFAULT_HIERARCHY:
+        hierarchy = determine_hierarchy_from_position(position)
+
+    return {
+        'initials': clean_value(row['Инициалы']),
+        'full_name': clean_value(row['ФИО']),
+        'position': position,
+        'phone': clean_value(row['Телефон']),
+        'internal_phone': clean_value(row['Внутренний телефон']),
+        'room': clean_value(row['Кабинет']),
+        'hierarchy': hierarchy,
+        'email': clean_value(row.get('Email', ''))
+    }
+
+
+def normalize_batch(batch):
+    """
+    Нормализует пакет пар (номер строки, строка) по столбцам.
+
+    Возвращает список троек (номер строки, цепочка подразделений, данные
+    сотрудника); вместо данных возвращается исключение, если строку
+    не удалось разобрать. Результат совпадает с построчными
+    parse_department_chain и parse_employee.
+    """
+    rows = [row for _, row in batch]
+
+    department_columns = [
+        map_column([row.get(col_name, '') for row in rows], parse_department_name)
+        for col_name in DEPARTMENT_COLUMNS
+    ]
+    chains = [tuple(part for part in parts if part) for parts in zip(*department_columns)]
+
+    def column(col_name, func=clean_value):
+        return map_column([row.get(col_name, '') for row in rows], func)
+
+    positions = column('Должность')
+    levels = column('Уровень', clean_level)
+    hierarchies = [
+        determine_hierarchy_from_position(position) if level == DEFAULT_HIERARCHY else level
+        for position, level in zip(positions, levels)
+    ]
+    fields = {
+        'initials': column('Инициалы'),
+        'full_name': column('ФИО'),
+        'position': positions,
+        'phone': column('Телефон'),
+        'internal_phone': column('Внутренний телефон'),
+        'room': column('Кабинет'),
+        'hierarchy': hierarchies,
+        'email': column('Email'),
+    }
+    names = list(fields)
+    records = [dict(zip(names, values)) for values in zip(*fields.values())]
+
+    result = []
+    for index, (row_number, row) in enumerate(batch):
+        if EMPLOYEE_COLUMN_SET <= row.keys() and not isinstance(levels[index], Exception):
+            result.append((row_number, chains[index], records[index]))
+            continue
+        # Ошибка та же, что и при построчном разборе: первая по порядку обращения
+        for col_name in EMPLOYEE_COLUMNS:
+            if col_name not in row:
+                error = KeyError(col_name)
+                break
+            if col_name == 'Уровень' and isinstance(levels[index], Exception):
+                error = levels[index]
+                break
+        result.append((row_number, chains[index], error))
+    return result
+
+
+class DepartmentResolver:
+    """
+    Разрешает цепочки названий подразделений в объекты Department.
+
+    Подразделения идентифицируются путём из названий от корня. Недостающие
+    подразделения создаются пакетно, по одному bulk_create на уровень.
+    """
+
+    def __init__(self):
+        names_by_pk = {}
+        self.by_names = {}
+        # Пути упорядочены так, что родитель всегда предшествует потомкам
+        for dept in Department.objects.order_by('path'):
+            names = names_by_pk.get(dept.parent_id, ()) + (dept.name,)
+            names_by_pk[dept.pk] = names
+            self.by_names.setdefault(names, dept)
+        self.changed_department_ids = set()
+        self.created_department_ids = set()
+
+    def resolve(self, chains):
+        """
+        Возвращает словарь {цепочка: подразделение} для переданных цепочек,
+        создавая недостающие подразделения и обновляя короткие названия
+        """
+        pending = []
+        short_name_updates = {}
+        resolved = {}
+
+        for chain in chains:
+            parent = None
+            names = ()
+            for name, short_name in chain:
+                names += (name,)
+                dept = self.by_names.get(names)
+                if dept is None:
+                    dept = Department(name=name, short_name=short_name, parent=parent, level=len(names),
+                                      full_path=Department.make_full_path(name, parent.full_path if parent else ''))
+                    self.by_names[names] = dept
+                    pending.append(dept)
+                elif short_name and dept.short_name != short_name:
+                    # Как и прежде, побеждает последнее непустое короткое название
+                    dept.short_name = short_name
+                    if dept.pk:
+                        short_name_updates[dept.pk] = dept
+                parent = dept
+            resolved[chain] = parent
+
+        self._create(pending)
+        if short_name_updates:
+            now = timezone.now()
+            for dept in short_name_updates.values():
+                dept.updated_at = now
+            Department.objects.bulk_update(short_name_updates.values(), ['short_name', 'updated_at'],
+                                           batch_size=BATCH_SIZE)
+            self.changed_department_ids.update(short_name_updates)
+        return resolved
+
+    def _create(self, pending):
+        """Создаёт новые подразделения по уровням и заполняет их пути"""
+        for level in sorted({dept.level for dept in pending}):
+            batch = [dept for dept in pending if dept.level == level]
+            Department.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+            for dept in batch:
+                dept.path = Department.make_path(dept.pk, dept.parent.path if dept.parent else '')
+            Department.objects.bulk_update(batch, ['path'], batch_size=BATCH_SIZE)
+            self.created_department_ids.update(dept.pk for dept in batch)
+
+
+class EmployeeImporter:
+    """
+    Пакетный импорт сотрудников.
+
+    Принимает последовательность пар (номер строки, строка), где строка —
+    словарь значений по названиям столбцов файла.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, progress_callback=None, expected_total=None):
+        self.batch_size = batch_size
+        self.progress_callback = progress_callback
+        self.expected_total = expected_total
+        self.added = 0
+        self.updated = 0
+        self.total = 0
+        self.errors = []
+        self.created_employee_ids = set()
+        self.matched_employee_ids = set()
+        self.changed_employee_ids = set()
+        self.original_values = {}
+        self.commit_batches = connection.vendor == 'sqlite'
+        # Изменения, ещё не записанные в журнал и поисковый индекс (см. publish_changes)
+        self.pending_employee_ids = set()
+        self.published_employee_ids = set()
+        self.published_department_ids = set()
+
+    @property
+    def unchanged(self):
+        return len(self.matched_employee_ids - self.changed_employee_ids)
+
+    def run(self, rows):
+        """Выполняет импорт и возвращает итоговые счётчики"""
+        with self.import_transaction():
+            self.load_snapshot()
+            with self.finishing():
+                self.process_rows(rows)
+        return self.get_result()
+
+    def process_rows(self, rows):
+        batch = []
+        for row_number, row in rows:
+            self.total += 1
+            batch.append((row_number, row))
+            if len(batch) >= self.batch_size:
+                self.process_batch(batch)
+                batch = []
+        if batch:
+            self.process_batch(batch)
+
+    def import_transaction(self):
+        """Транзакция всего импорта (кроме SQLite, см. описание модуля)"""
+        return nullcontext() if self.commit_batches else transaction.atomic()
+
+    @contextmanager
+    def batch_transaction(self):
+        """Транзакция одного пакета: отдельная только на SQLite"""
+        if not self.commit_batches:
+            yield
+            return
+        with transaction.atomic():
+            yield
+        # Ожидающие писатели проверяют блокировку с паузами до 100 мс и без
+        # перерыва между пакетами не успели бы её взять
+        time.sleep(SQLITE_BATCH_PAUSE)
+
+    @contextmanager
+    def finishing(self):
+        """
+        Выполняет завершающий шаг (finish) после записи пакетов; на SQLite —
+        и после ошибки, чтобы учесть уже зафиксированные пакеты
+        """
+        try:
+            yield
+        except Exception:
+            if self.commit_batches:
+                self.finish()
+            raise
+        self.finish()
+
+    def get_result(self):
+        return {
+            'total': self.total,
+            'added': self.added,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'errors': self.errors,
+        }
+
+    def load_snapshot(self):
+        """Загружает текущие подразделения и сотрудников для сравнения в памяти"""
+        self.departments = DepartmentResolver()
+        self.existing = load_employee_snapshot()
+
+    def apply(self, creates, updates, total, department_chains=()):
+        """
+        Записывает заранее подготовленные изменения (см. changeset.py).
+
+        creates — словарь {(ФИО, внутренний телефон): данные}, updates —
+        {id сотрудника: (прежние значения, данные)}. Подразделение в данных
+        задано цепочкой названий и разрешается (при необходимости создаётся)
+        здесь же; department_chains — подразделения, которые нужно создать
+        или переименовать независимо от сотрудников. Записи, изменившиеся
+        в базе после подготовки, пропускаются.
+        """
+        with self.import_transaction():
+            self.load_snapshot()
+            by_pk = {values['pk']: values for values in self.existing.values()}
+
+            for key in list(creates):
+                if key in self.existing:
+                    self.errors.append(f"{key[0]}: сотрудник уже добавлен в справочник")
+                    del creates[key]
+
+            checked = {}
+            for pk, (old, data) in updates.items():
+                current = by_pk.get(pk)
+                if current is None or any(current[field] != value for field, value in old.items()):
+                    self.errors.append(f"{data['full_name']}: запись изменена после подготовки изменений")
+                    continue
+                checked[pk] = data
+
+            self.total = total
+            self.added = len(creates)
+            self.updated = len(checked)
+            chains = [*department_chains, *(data['department'] for data in (*creates.values(), *checked.values()))]
+            with self.finishing():
+                with self.batch_transaction():
+                    departments = self.departments.resolve(chains)
+                for data in (*creates.values(), *checked.values()):
+                    data['department'] = departments.get(data['department'])
+
+                creates, checked = list(creates.items()), list(checked.items())
+                for start in range(0, max(len(creates), len(checked)), self.batch_size):
+                    end = start + self.batch_size
+                    with self.batch_transaction():
+                        self.save_employees(dict(creates[start:end]), dict(checked[start:end]))
+                    if self.progress_callback:
+                        self.progress_callback(self)
+
+        return self.get_result()
+
+    @staticmethod
+    def compared_fields():
+        return [field if field != 'department' else 'department_id' for field in EMPLOYEE_FIELDS]
+
+    def process_batch(self, batch):
+        """Обрабатывает пакет строк: подразделения, затем сотрудники"""
+        # Разбор строк не требует блокировки записи и выполняется до транзакции пакета
+        parsed = normalize_batch(batch)
+        with self.batch_transaction():
+            self.write_batch(parsed)
+        if self.progress_callback:
+            self.progress_callback(self)
+
+    def write_batch(self, parsed):
+        departments = self.departments.resolve(chain for _, chain, _ in parsed)
+
+        creates = {}
+        updates = {}
+        for row_number, chain, data in parsed:
+            if isinstance(data, Exception):
+                self.errors.append(f"Строка {row_number}: {str(data)}")
+                continue
+
+            if not data['full_name']:
+                self.errors.append(f"Строка {row_number}: Отсутствует ФИО")
+                continue
+
+            data['department'] = departments.get(chain)
+            key = (data['full_name'], data['internal_phone'])
+            if key in creates:
+                creates[key] = data
+                self.updated += 1
+            elif key in self.existing:
+                updates[self.existing[key]['pk']] = data
+                self.updated += 1
+            else:
+                creates[key] = data
+                self.added += 1
+
+        self.save_employees(creates, updates)
+
+    def save_employees(self, creates, updates):
+        """Записывает новых и изменившихся сотрудников пакетными запросами"""
+        fields = self.compared_fields()
+
+        new_employees = [Employee(**data) for data in creates.values()]
+        for employee in new_employees:
+            employee.fill_department_fields()
+        bulk_insert(Employee, new_employees, batch_size=self.batch_size)
+        for employee in new_employees:
+            self.existing[(employee.full_name, employee.internal_phone)] = {
+                'pk': employee.pk, **{field: getattr(employee, field) for field in fields}
+            }
+            self.created_employee_ids.add(employee.pk)
+
+        now = timezone.now()
+        changed = []
+        for pk, data in updates.items():
+            employee = Employee(pk=pk, updated_at=now, **data)
+            current = self.existing[(employee.full_name, employee.internal_phone)]
+            values = {field: getattr(employee, field) for field in fields}
+            if any(current[field] != value for field, value in values.items()):
+                self.original_values.setdefault(pk, dict(current))
+                current.update(values)
+                employee.fill_department_fields()
+                changed.append(employee)
+            if pk in self.created_employee_ids:
+                continue
+            # Неизменным считается сотрудник без итоговых отличий от значений до импорта
+            self.matched_employee_ids.add(pk)
+            original = self.original_values.get(pk)
+            if original is not None and any(original[field] != current[field] for field in fields):
+                self.changed_employee_ids.add(pk)
+            else:
+                self.changed_employee_ids.discard(pk)
+        Employee.objects.bulk_update(changed, EMPLOYEE_FIELDS + ['department_level', 'department_name', 'updated_at'],
+                                     batch_size=self.batch_size)
+        self.pending_employee_ids.update(employee.pk for employee in (*new_employees, *changed))
+        if self.commit_batches:
+            # Пакет фиксируется сразу: журнал и индекс обновляются в его транзакции
+            self.publish_changes()
+
+    def finish(self):
+        """
+        Обновляет счётчики, поисковый индекс и журнал изменений, сбрасывает
+        кэши после импорта. На SQLite выполняется вне общей транзакции:
+        каждый шаг фиксируется сам
+        """
+        rebuild_department_counters()
+        self.publish_changes()
+        bump_directory_version()
+
+    def publish_changes(self):
+        """
+        Записывает в журнал изменений и поисковый индекс подразделения и
+        сотрудников, изменённых после предыдущего вызова
+        """
+        departments = self.departments
+        created_departments = departments.created_department_ids - self.published_department_ids
+        changed_departments = departments.changed_department_ids - departments.created_department_ids
+        changed_departments -= self.published_department_ids
+        record_changes('department', created_departments, 'insert')
+        record_changes('department', changed_departments, 'update')
+        self.published_department_ids |= created_departments | changed_departments
+
+        pending, self.pending_employee_ids = self.pending_employee_ids, set()
+        created_employees = (pending & self.created_employee_ids) - self.published_employee_ids
+        record_changes('employee', created_employees, 'insert')
+        record_changes('employee', pending - created_employees, 'update')
+        self.published_employee_ids |= pending
+
+        renamed_departments = departments.changed_department_ids & (created_departments | changed_departments)
+        if not pending and not renamed_departments:
+            return
+        employees = Employee.objects.filter(pk__in=pending)
+        if renamed_departments:
+            employees = employees | Employee.objects.filter(department_id__in=renamed_departments)
+        get_search_backend().index_employees(employees.select_related('department'))
+
+
+def load_employee_snapshot():
+    """Возвращает словарь {(ФИО, внутренний телефон): значения полей} сотрудников"""
+    return {
+        (values['full_name'], values['internal_phone']): values
+        for values in Employee.objects.values('pk', *EmployeeImporter.compared_fields())
+    }
+
+
+def read_import_file(file):
+    """Открывает файл импорта и проверяет наличие обязательных столбцов"""
+    source = read_rows(file)
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in source.header]
+    if missing_columns:
+        source.close()
+        raise ValueError(f"Отсутствуют обязательные столбцы: {', '.join(missing_columns)}")
+    return source
+
+
+def get_import_status(added, updated, errors):
+    """Определяет итоговый статус импорта по счётчикам"""
+    return 'success' if not errors else 'partial' if added + updated > 0 else 'failed'
+
+
+def import_file(file, progress_callback=None):
+    """Импортирует файл и возвращает результат в формате ответа ImportView"""
+    rows = read_import_file(file)
+    importer = EmployeeImporter(progress_callback=progress_callback, expected_total=rows.total)
+    result = importer.run(rows)
+    return {
+        'status': get_import_status(result['added'], result['updated'], result['errors']),
+        'total': result['total'],
+        'added': result['added'],
+        'updated': result['updated'],
+        'unchanged': result['unchanged'],
+        'errors': result['errors']
+    }
@@ -0,0 +1,243 @@
+"""
+Фоновые задания импорта
+
+Очередь хранится в базе данных: каждая запись ImportLog в статусе 'pending'
+является заданием. Веб-процесс передаёт новые задания в пул потоков сразу
+после фиксации транзакции; задания, оставшиеся в очереди (например, после
+перезапуска), обрабатывает команда process_imports.
+
+Задание в режиме предпросмотра (dry_run) сохраняет набор изменений и
+завершается статусом 'preview'; apply_import возвращает такое задание
+в очередь, и оно применяет сохранённый набор без повторного чтения файла.
+
+Импорт выполняется в одной транзакции, поэтому ход выполнения до её фиксации
+записывается в ImportLog отдельным соединением (не чаще раза в
+PROGRESS_SAVE_INTERVAL секунд) и видно из любого процесса. На SQLite импорт
+фиксирует пакеты по отдельности (см. importer.py), и ход записывается через
+основное соединение между пакетами. Подробный ход публикуется и через кэш:
+если задания выполняет отдельный процесс (process_imports) или веб работает
+в нескольких процессах, нужен общий кэш (см. checks.py).
+
+Вместе с ходом выполнения обновляется heartbeat_at. Задание в статусе
+'running', не подававшее признаков работы дольше
+EMPLOYEES_IMPORT_STALE_TIMEOUT секунд, считается прерванным (перезапуск или
+сбой процесса) и возвращается в очередь условным UPDATE; обработчик берёт
+задание так же — только из статуса 'pending', поэтому одно задание не
+выполняется дважды.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connection, connections, transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .changeset import apply_change_set, get_matched_rows, preview_file
+from .importer import import_file
+from .maintenance import optimize_database
+from .models import ImportLog
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_CACHE_KEY = 'employees:import_progress:{pk}'
+PROGRESS_CACHE_TIMEOUT = 60 * 60
+PROGRESS_SAVE_INTERVAL = 1.0
+DEFAULT_STALE_TIMEOUT = 10 * 60
+
+executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='employees-import')
+
+
+def enqueue_import(log):
+    """Ставит задание импорта в пул потоков после фиксации транзакции"""
+    transaction.on_commit(lambda: executor.submit(run_import_job, log.pk))
+
+
+def get_import_progress(log):
+    """Возвращает текущее состояние задания импорта"""
+    progress = {
+        'id': log.pk,
+        'status': log.status,
+        'status_display': log.get_status_display(),
+        'finished': log.is_finished,
+        'total': log.total_records,
+        'processed': log.processed_records,
+        'added': log.added,
+        'updated': log.updated,
+        'unchanged': log.unchanged,
+        'rows_per_second': log.rows_per_second,
+        'errors': log.errors.splitlines(),
+    }
+    if log.status == 'running':
+        progress.update(cache.get(PROGRESS_CACHE_KEY.format(pk=log.pk), {}))
+    if log.can_apply:
+        progress['summary'] = log.change_set['summary']
+        progress['preview_url'] = reverse('import_preview', args=[log.pk])
+    return progress
+
+
+def progress_connection():
+    """
+    Отдельное соединение для записи хода импорта: запись в ImportLog видна
+    другим процессам до фиксации транзакции импорта. На SQLite импорт
+    фиксирует пакеты сам, и используется основное соединение
+    """
+    if connection.vendor == 'sqlite':
+        return connection
+    return connections.create_connection(DEFAULT_DB_ALIAS)
+
+
+def save_progress(progress_db, log_id, progress):
+    """Записывает ход задания и признак работы в ImportLog через соединение progress_db"""
+    meta = ImportLog._meta
+    columns = {
+        'total_records': progress['total'] or 0,
+        'processed_records': progress['processed'],
+        'added': progress['added'],
+        'updated': progress['updated'],
+        'rows_per_second': progress['rows_per_second'],
+        'heartbeat_at': progress_db.ops.adapt_datetimefield_value(timezone.now()),
+    }
+    quote_name = progress_db.ops.quote_name
+    assignments = ', '.join(f'{quote_name(meta.get_field(name).column)} = %s' for name in columns)
+    with progress_db.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {quote_name(meta.db_table)} SET {assignments} WHERE {quote_name(meta.pk.column)} = %s',
+            [*columns.values(), log_id]
+        )
+
+
+def run_import_job(log_id):
+    """Выполняет задание импорта, если оно ещё не взято другим обработчиком"""
+    progress_db = None
+    try:
+        started_at = timezone.now()
+        claimed = ImportLog.objects.filter(pk=log_id, status='pending').update(
+            status='running', started_at=started_at, heartbeat_at=started_at
+        )
+        if not claimed:
+            return
+        log = ImportLog.objects.get(pk=log_id)
+        started = time.monotonic()
+        progress_db = progress_connection()
+        last_saved = None
+
+        def report_progress(importer):
+            nonlocal last_saved
+            now = time.monotonic()
+            elapsed = now - started
+            progress = {
+                'total': importer.expected_total,
+                'processed': importer.total,
+                'added': importer.added,
+                'updated': importer.updated,
+                'rows_per_second': round(importer.total / elapsed, 1) if elapsed else None,
+            }
+            cache.set(PROGRESS_CACHE_KEY.format(pk=log_id), progress, PROGRESS_CACHE_TIMEOUT)
+            if progress_db is not None and (last_saved is None or now - last_saved >= PROGRESS_SAVE_INTERVAL):
+                last_saved = now
+                try:
+                    save_progress(progress_db, log_id, progress)
+                except DatabaseError:
+                    # Ход выполнения не должен прерывать сам импорт
+                    logger.exception('Не удалось записать ход импорта %s', log_id)
+
+        try:
+            if log.change_set is not None and not log.dry_run:
+                result = apply_change_set(log.change_set, progress_callback=report_progress)
+                log.applied_at = timezone.now()
+            else:
+                with log.source_file.open('rb') as file:
+                    if log.dry_run:
+                        result = run_preview(log, file, report_progress)
+                    else:
+                        result = import_file(file, progress_callback=report_progress)
+        except Exception as e:
+            logger.exception('Ошибка импорта файла %s', log.file_name)
+            result = {'status': 'failed', 'total': 0, 'added': 0, 'updated': 0, 'errors': [str(e)]}
+
+        elapsed = time.monotonic() - started
+        log.status = result['status']
+        log.total_records = result['total']
+        log.processed_records = result['total']
+        log.added = result['added']
+        log.updated = result['updated']
+        log.unchanged = result.get('unchanged', 0)
+        log.errors = '\n'.join(result['errors'])
+        log.finished_at = timezone.now()
+        log.rows_per_second = round(result['total'] / elapsed, 1) if elapsed else None
+        log.save()
+
+        if log.source_file:
+            log.source_file.delete(save=True)
+        cache.delete(PROGRESS_CACHE_KEY.format(pk=log_id))
+
+        # Импорт меняет много строк: обновляем статистику и переносим журнал
+        # WAL, не дожидаясь читателей
+        try:
+            optimize_database('PASSIVE')
+        except Exception:
+            logger.exception('Ошибка обслуживания базы данных после импорта')
+    finally:
+        # Поток пула живёт долго: не оставляем открытыми соединения с базой
+        if progress_db is not None and progress_db is not connection:
+            progress_db.close()
+        connection.close()
+
+
+def run_preview(log, file, progress_callback):
+    """Строит набор изменений без записи в базу и сохраняет его в лог"""
+    change_set = preview_file(file, progress_callback=progress_callback)
+    log.change_set = change_set
+    summary = change_set['summary']
+    return {
+        'status': 'preview',
+        'total': summary['total'],
+        'added': summary['added'],
+        'updated': get_matched_rows(summary),
+        'unchanged': summary['unchanged'],
+        'errors': change_set['errors'],
+    }
+
+
+def apply_import(log):
+    """Ставит в очередь применение набора изменений, сохранённого предпросмотром"""
+    applied = ImportLog.objects.filter(pk=log.pk, status='preview', change_set__isnull=False).update(
+        status='pending', dry_run=False, started_at=None, finished_at=None, processed_records=0
+    )
+    if applied:
+        enqueue_import(log)
+    return bool(applied)
+
+
+def requeue_stale_imports():
+    """
+    Возвращает в очередь задания, зависшие в статусе 'running' после сбоя
+    или перезапуска обработчика (давно не обновлялся heartbeat_at);
+    возвращает их количество
+    """
+    timeout = getattr(settings, 'EMPLOYEES_IMPORT_STALE_TIMEOUT', DEFAULT_STALE_TIMEOUT)
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    # Условие проверяется в самом UPDATE: задание, подавшее признак работы
+    # между выборкой и обновлением, не будет взято повторно
+    stale = ImportLog.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status='running',
+    )
+    requeued = stale.update(status='pending', started_at=None, heartbeat_at=None, processed_records=0)
+    if requeued:
+        logger.warning('Возвращено в очередь прерванных заданий импорта: %s', requeued)
+    return requeued
+
+
+def process_pending_imports():
+    """Обрабатывает все задания в очереди; возвращает их количество"""
+    requeue_stale_imports()
+    pending = list(ImportLog.objects.filter(status='pending').order_by('uploaded_at').values_list('pk', flat=True))
+    for log_id in pending:
+        run_import_job(log_id)
+    return len(pending)
@@ -0,0 +1,29 @@
+"""
+Обслуживание базы данных SQLite
+
+PRAGMA optimize обновляет статистику планировщика по таблицам, где она
+устарела, а контрольная точка переносит накопленный журнал WAL в основной
+файл базы. Для других баз данных функции ничего не делают.
+"""
+from django.db import connection
+
+CHECKPOINT_MODES = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+
+
+def optimize_database(checkpoint_mode='PASSIVE'):
+    """
+    Выполняет PRAGMA optimize и контрольную точку WAL.
+
+    Возвращает результат контрольной точки (busy, страниц в журнале,
+    перенесено страниц) или None, если база не SQLite. Режим PASSIVE не
+    ждёт читателей; TRUNCATE дожидается их и очищает файл журнала.
+    """
+    if connection.vendor != 'sqlite':
+        return None
+    if checkpoint_mode not in CHECKPOINT_MODES:
+        raise ValueError(f'Неизвестный режим контрольной точки: {checkpoint_mode}')
+
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA optimize')
+        cursor.execute(f'PRAGMA wal_checkpoint({checkpoint_mode})')
+        return cursor.fetchone()
@@ -0,0 +1,76 @@
+import asyncio
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.management.base import BaseCommand
+from django.test import AsyncRequestFactory
+
+from employees import async_views, views
+from employees.models import Employee
+from employees.search import tokenize
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность синхронных и асинхронных API поиска и карточки '
+            'сотрудника при конкурентных запросах (как под ASGI, без сети и middleware)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Количество запросов на каждый замер')
+        parser.add_argument('--concurrency', type=int, default=50, help='Количество одновременных запросов')
+        parser.add_argument('--seed', type=int, default=0, help='Начальное значение генератора')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        employees = list(Employee.objects.values_list('pk', 'full_name'))
+        if not employees:
+            self.stdout.write(self.style.ERROR('В справочнике нет сотрудников'))
+            return
+
+        count = options['requests']
+        queries = [tokenize(name)[0][:3] for pk, name in employees if tokenize(name)]
+        factory = AsyncRequestFactory()
+
+        def search_request():
+            return factory.get('/api/employees/search/', {'query': rng.choice(queries)}), {}
+
+        def detail_request():
+            pk = rng.choice(employees)[0]
+            return factory.get(f'/api/employees/{pk}/'), {'pk': pk}
+
+        scenarios = [
+            ('Поиск', 'EmployeeSearchAPIView', search_request),
+            ('Карточка', 'EmployeeDetailAPIView', detail_request),
+        ]
+
+        for title, view_name, make_request in scenarios:
+            for kind, module in (('sync', views), ('async', async_views)):
+                view = getattr(module, view_name).as_view()
+                requests = [make_request() for _ in range(count)]
+                elapsed, statuses = asyncio.run(self.run(view, requests, options['concurrency']))
+                rate = count / elapsed if elapsed else 0
+                codes = ', '.join(f'{code}: {number}' for code, number in sorted(statuses.items()))
+                self.stdout.write(f'{title} ({kind}): {count} запросов за {elapsed:.2f} с '
+                                  f'({rate:,.0f} запросов/с; {codes})')
+
+    async def run(self, view, requests, concurrency):
+        """Выполняет запросы не более чем по concurrency одновременно"""
+        if not iscoroutinefunction(view):
+            # Так синхронные представления вызывает ASGIHandler
+            view = sync_to_async(view, thread_sensitive=True)
+
+        semaphore = asyncio.Semaphore(concurrency)
+        statuses = {}
+
+        async def call(request, kwargs):
+            async with semaphore:
+                response = await view(request, **kwargs)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        # Прогрев: индекс автодополнения и кэш версии справочника
+        await call(*requests[0])
+        statuses.clear()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(call(request, kwargs) for request, kwargs in requests))
+        return time.perf_counter() - started, statuses
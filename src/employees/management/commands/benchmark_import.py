@@ -0,0 +1,68 @@
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from employees.importer import (
+    BATCH_SIZE, normalize_batch, parse_department_chain, parse_employee, read_import_file,
+)
+from employees.normalization import determine_hierarchy_from_position, extract_short_name
+from employees.synthetic import generate_import_rows, write_import_file
+
+
+class Command(BaseCommand):
+    help = 'Измеряет скорость чтения и нормализации строк импорта на синтетическом файле (без записи в базу)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000, help='Количество строк в файле')
+        parser.add_argument('--format', choices=['xlsx', 'csv'], default='xlsx', help='Формат файла')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Размер пакета нормализации')
+        parser.add_argument('--seed', type=int, default=0, help='Начальное значение генератора')
+
+    def handle(self, *args, **options):
+        count = options['rows']
+        batch_size = options['batch_size']
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, f"benchmark.{options['format']}")
+            started = time.perf_counter()
+            write_import_file(path, generate_import_rows(count, seed=options['seed']))
+            self.report('Генерация файла', count, time.perf_counter() - started)
+
+            started = time.perf_counter()
+            with open(path, 'rb') as file:
+                rows = list(read_import_file(file))
+            self.report('Чтение файла', len(rows), time.perf_counter() - started)
+
+        self.clear_caches()
+        started = time.perf_counter()
+        row_wise = []
+        for row_number, row in rows:
+            chain = parse_department_chain(row)
+            try:
+                row_wise.append((row_number, chain, parse_employee(row)))
+            except Exception as e:
+                row_wise.append((row_number, chain, str(e)))
+        self.report('Построчная нормализация', len(rows), time.perf_counter() - started)
+
+        self.clear_caches()
+        started = time.perf_counter()
+        batched = []
+        for start in range(0, len(rows), batch_size):
+            for row_number, chain, data in normalize_batch(rows[start:start + batch_size]):
+                batched.append((row_number, chain, str(data) if isinstance(data, Exception) else data))
+        self.report('Нормализация по столбцам', len(rows), time.perf_counter() - started)
+
+        if batched == row_wise:
+            self.stdout.write(self.style.SUCCESS('Результаты нормализации совпадают'))
+        else:
+            self.stdout.write(self.style.ERROR('Результаты нормализации различаются'))
+
+    def clear_caches(self):
+        extract_short_name.cache_clear()
+        determine_hierarchy_from_position.cache_clear()
+
+    def report(self, title, count, elapsed):
+        rate = count / elapsed if elapsed else 0
+        self.stdout.write(f'{title}: {count} строк за {elapsed:.2f} с ({rate:,.0f} строк/с)')
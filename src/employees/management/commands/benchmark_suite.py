@@ -0,0 +1,150 @@
+import json
+import os
+import platform
+import re
+import statistics
+import tempfile
+import time
+
+import django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from employees.models import Department, Employee
+from employees.synthetic import generate_org_rows, write_import_file
+from employees.views import ImportView
+
+DEFAULT_SIZES = '1000,10000,100000'
+BENCHMARK_HOST = 'localhost'
+SERVER_TIMING_QUERIES = re.compile(r'db;dur=[\d.]+;desc="(\d+) SQL"')
+
+
+class Command(BaseCommand):
+    help = ('Замеряет основные сценарии (список, поиск, карточка, импорт, админка) на синтетической '
+            'организации разного размера во временной тестовой базе и сохраняет результаты в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                            help=f'Количество сотрудников через запятую (по умолчанию {DEFAULT_SIZES})')
+        parser.add_argument('--departments', type=int, default=0,
+                            help='Количество подразделений (по умолчанию — по числу сотрудников на подразделение)')
+        parser.add_argument('--depth', type=int, default=4, help='Глубина дерева подразделений (до 4)')
+        parser.add_argument('--employees-per-department', type=int, default=20,
+                            help='Сотрудников в подразделении, если не задано --departments')
+        parser.add_argument('--repeat', type=int, default=5, help='Повторов каждого замера')
+        parser.add_argument('--format', choices=['xlsx', 'csv'], default='xlsx', help='Формат файла импорта')
+        parser.add_argument('--seed', type=int, default=0, help='Начальное значение генератора')
+        parser.add_argument('--output', default='benchmark-results.json', help='Файл для результатов (JSON)')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError('--sizes: ожидаются числа через запятую')
+        if options['repeat'] < 1:
+            raise CommandError('--repeat: нужен хотя бы один повтор')
+        self.options = options
+        self.results = []
+
+        for size in sizes:
+            # Для каждого размера — новая тестовая база, рабочая не затрагивается
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                with override_settings(ALLOWED_HOSTS=[BENCHMARK_HOST]):
+                    self.run_size(size)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                cache.clear()
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'platform': platform.platform(),
+            },
+            'parameters': {key: options[key] for key in
+                           ('sizes', 'departments', 'depth', 'employees_per_department', 'repeat', 'format', 'seed')},
+            'results': self.results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Результаты сохранены в {options['output']}"))
+
+    def run_size(self, size):
+        options = self.options
+        departments = options['departments'] or max(1, size // options['employees_per_department'])
+        per_department = max(1, size // departments)
+        rows = generate_org_rows(departments, options['depth'], per_department, seed=options['seed'])
+        self.stdout.write(f'\n{len(rows)} сотрудников, {departments} подразделений')
+        self.labels = {'employees': len(rows), 'departments': departments}
+        cache.clear()
+
+        user = User.objects.create_superuser('benchmark', 'benchmark@example.com', 'benchmark')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, f"benchmark.{options['format']}")
+            write_import_file(path, rows)
+            # Первый импорт заполняет базу, повторный сравнивает файл с ней
+            for scenario in ('import_initial', 'import_unchanged'):
+                with open(path, 'rb') as file:
+                    started = time.perf_counter()
+                    result = ImportView().process_excel_file(File(file, name=os.path.basename(path)), user)
+                    elapsed = time.perf_counter() - started
+                self.record(scenario, [elapsed], status=result['status'])
+
+        client = Client(HTTP_HOST=BENCHMARK_HOST)
+        client.force_login(user)
+        top_department = Department.objects.filter(parent=None).order_by('pk').first()
+        employee_ids = list(Employee.objects.order_by('pk').values_list('pk', flat=True)[:options['repeat'] + 1])
+        last_name = Employee.objects.order_by('pk').values_list('full_name', flat=True).first().split()[0]
+
+        self.measure(client, 'list', '/')
+        self.measure(client, 'list_department', '/', {'department': top_department.pk})
+        self.measure(client, 'list_search', '/', {'query': last_name})
+        self.measure(client, 'list_department_htmx', '/', {'department': top_department.pk}, HTTP_HX_REQUEST='true')
+        self.measure(client, 'search_api', '/api/employees/search/', {'query': last_name[:4]})
+        self.measure(client, 'detail_api', [f'/api/employees/{pk}/' for pk in employee_ids])
+        self.measure(client, 'admin_employees', '/admin/employees/employee/')
+        self.measure(client, 'admin_employees_search', '/admin/employees/employee/', {'q': last_name})
+        self.measure(client, 'admin_departments', '/admin/employees/department/')
+
+    def measure(self, client, scenario, urls, params=None, **headers):
+        """
+        Первый запрос (холодный кэш) замеряется отдельно, затем repeat
+        повторов; urls — адрес или список адресов по одному на запрос
+        """
+        if isinstance(urls, str):
+            urls = [urls] * (self.options['repeat'] + 1)
+        timings = []
+        response = None
+        for url in urls[:self.options['repeat'] + 1]:
+            started = time.perf_counter()
+            response = client.get(url, params, **headers)
+            timings.append(time.perf_counter() - started)
+
+        match = SERVER_TIMING_QUERIES.search(response.get('Server-Timing', ''))
+        self.record(scenario, timings[1:], cold=timings[0], status=response.status_code,
+                    queries=int(match.group(1)) if match else None, response_bytes=len(response.content))
+
+    def record(self, scenario, timings, cold=None, **extra):
+        result = {
+            **self.labels,
+            'scenario': scenario,
+            'runs': len(timings),
+            'median_ms': round(statistics.median(timings) * 1000, 2),
+            'min_ms': round(min(timings) * 1000, 2),
+            'max_ms': round(max(timings) * 1000, 2),
+            'cold_ms': round(cold * 1000, 2) if cold is not None else None,
+            **extra,
+        }
+        self.results.append(result)
+        details = f" ({result['queries']} SQL)" if result.get('queries') is not None else ''
+        self.stdout.write(f"  {scenario:<24} {result['median_ms']:>10.1f} мс{details}")
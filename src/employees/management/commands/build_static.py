@@ -0,0 +1,79 @@
+import gzip
+import os
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+try:
+    import brotli
+except ImportError:  # .br не создаются, если пакет Brotli не установлен
+    brotli = None
+
+# Расширения текстовых файлов, для которых записываются сжатые копии
+PRECOMPRESS_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ttf', '.eot', '.ico')
+# Файлы меньше этого размера не сжимаются
+PRECOMPRESS_MIN_SIZE = 256
+# Сжатая копия сохраняется, только если она заметно меньше исходного файла
+PRECOMPRESS_MAX_RATIO = 0.9
+
+
+def compress_file(path, data):
+    """Записывает сжатые копии файла; возвращает список созданных файлов"""
+    variants = [('.gz', lambda: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', lambda: brotli.compress(data, quality=11)))
+
+    written = []
+    for suffix, compress in variants:
+        target = path + suffix
+        if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+            continue
+        compressed = compress()
+        if len(compressed) <= len(data) * PRECOMPRESS_MAX_RATIO:
+            with open(target, 'wb') as file:
+                file.write(compressed)
+            written.append(target)
+    return written
+
+
+def precompress_directory(root):
+    """Создаёт .gz и .br рядом с текстовыми файлами каталога; возвращает их количество"""
+    count = 0
+    for directory, dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            if not filename.endswith(PRECOMPRESS_EXTENSIONS):
+                continue
+            path = os.path.join(directory, filename)
+            if os.path.getsize(path) < PRECOMPRESS_MIN_SIZE:
+                continue
+            with open(path, 'rb') as file:
+                count += len(compress_file(path, file.read()))
+    return count
+
+
+class Command(BaseCommand):
+    help = ('Собирает статику для продакшена: компиляция SCSS, collectstatic с хэшами в именах, '
+            'бандлы django-compressor и сжатые копии .gz/.br')
+
+    def handle(self, *args, **options):
+        if not settings.COMPRESS_OFFLINE:
+            raise CommandError('Сборка выполняется только с явно заданной переменной окружения STATIC_BUILD=1')
+
+        verbosity = options['verbosity']
+        # CSS компилируется рядом с исходными .scss, чтобы collectstatic
+        # собрал его вместе с остальными файлами, затем удаляется
+        self.stdout.write('Компиляция SCSS...')
+        call_command('compilescss', verbosity=verbosity)
+        try:
+            self.stdout.write('Сбор статических файлов...')
+            call_command('collectstatic', interactive=False, verbosity=verbosity)
+        finally:
+            call_command('compilescss', delete_files=True, verbosity=verbosity)
+        self.stdout.write('Объединение и минификация стилей и скриптов...')
+        call_command('compress', force=True, verbosity=verbosity)
+
+        count = precompress_directory(settings.STATIC_ROOT)
+        self.stdout.write(self.style.SUCCESS(f'Статика собрана в {settings.STATIC_ROOT}, сжатых копий: {count}'))
+        if brotli is None:
+            self.stdout.write(self.style.WARNING('Пакет Brotli не установлен: файлы .br не созданы'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from employees.changefeed import compact_changes
+
+
+class Command(BaseCommand):
+    help = 'Сжимает журнал изменений справочника, оставляя последнюю запись по каждому объекту'
+
+    def handle(self, *args, **options):
+        deleted = compact_changes()
+        self.stdout.write(self.style.SUCCESS(f'Журнал изменений сжат, удалено записей: {deleted}'))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from employees.maintenance import CHECKPOINT_MODES, optimize_database
+
+
+class Command(BaseCommand):
+    help = 'Обслуживание SQLite: PRAGMA optimize и контрольная точка журнала WAL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checkpoint', choices=CHECKPOINT_MODES, default='TRUNCATE',
+                            help='Режим контрольной точки WAL')
+        parser.add_argument('--loop', action='store_true',
+                            help='Работать постоянно, выполняя обслуживание периодически')
+        parser.add_argument('--interval', type=float, default=3600.0,
+                            help='Интервал между запусками в секундах (для --loop)')
+
+    def handle(self, *args, **options):
+        while True:
+            result = optimize_database(options['checkpoint'])
+            if result is None:
+                self.stdout.write('База данных не SQLite, обслуживание не требуется')
+                return
+            busy, log_pages, checkpointed = result
+            self.stdout.write(self.style.SUCCESS(
+                f'Обслуживание выполнено: страниц в журнале {log_pages}, перенесено {checkpointed}'
+                + (' (часть страниц занята читателями)' if busy else '')
+            ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from employees.jobs import process_pending_imports
+
+
+class Command(BaseCommand):
+    help = 'Обрабатывает задания импорта, ожидающие в очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Работать постоянно, периодически проверяя очередь')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Интервал проверки очереди в секундах (для --loop)')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending_imports()
+            if processed:
+                self.stdout.write(f'Обработано заданий импорта: {processed}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
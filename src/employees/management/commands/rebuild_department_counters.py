@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from employees.counters import rebuild_department_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики сотрудников и вложенных подразделений'
+
+    def handle(self, *args, **options):
+        changed = rebuild_department_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики пересчитаны, обновлено подразделений: {changed}'
+        ))
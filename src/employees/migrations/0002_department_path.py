@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+
+PATH_STEP_WIDTH = 10
+
+
+def build_paths(apps, schema_editor):
+    """Заполняет материализованные пути и уровни для существующих подразделений"""
+    Department = apps.get_model('employees', 'Department')
+    departments = list(Department.objects.all())
+    children = {}
+    for dept in departments:
+        children.setdefault(dept.parent_id, []).append(dept)
+
+    stack = [(dept, '', 1) for dept in children.get(None, [])]
+    while stack:
+        dept, parent_path, level = stack.pop()
+        dept.path = f'{parent_path}{dept.pk:0{PATH_STEP_WIDTH}d}/'
+        dept.level = level
+        stack.extend((child, dept.path, level + 1) for child in children.get(dept.pk, []))
+
+    Department.objects.bulk_update(departments, ['path', 'level'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255, verbose_name='Путь в иерархии'),
+        ),
+        migrations.RunPython(build_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,94 @@
+import re
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+# Копия схемы документа поискового индекса на момент миграции: миграция
+# не должна зависеть от того, как employees.search строит документ позже
+FTS_TABLE = 'employees_employee_fts'
+MIN_STEM_LENGTH = 4
+MIN_PHONE_SUFFIX_LENGTH = 3
+RUSSIAN_ENDINGS = sorted({
+    'иями', 'ями', 'ами', 'ией', 'ием', 'иях', 'ях', 'ах', 'ов', 'ев', 'ей', 'ий', 'ый', 'ой',
+    'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ого', 'его', 'ому', 'ему', 'ым', 'им', 'ом', 'ем',
+    'ую', 'юю', 'ых', 'их', 'ыми', 'ими', 'ия', 'ию', 'ии', 'ью',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+}, key=len, reverse=True)
+CYRILLIC_WORD_RE = re.compile(r'^[а-я]+$')
+WORD_RE = re.compile(r'\w+')
+
+
+def tokenize(value):
+    return WORD_RE.findall((value or '').lower().replace('ё', 'е'))
+
+
+def stem(word):
+    if not CYRILLIC_WORD_RE.match(word):
+        return word
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def build_document(full_name='', position='', department_name='', department_short_name='',
+                   phone='', internal_phone='', email=''):
+    words = []
+    for value in (full_name, position, department_name, department_short_name, email):
+        for word in tokenize(value):
+            words.append(word)
+            word_stem = stem(word)
+            if word_stem != word:
+                words.append(word_stem)
+    for value in (phone, internal_phone):
+        digits = re.sub(r'\D', '', value or '')
+        words.extend(tokenize(value))
+        words.extend(digits[i:] for i in range(len(digits) - MIN_PHONE_SUFFIX_LENGTH + 1))
+    return ' '.join(dict.fromkeys(words))
+
+
+def create_fts_index(apps, schema_editor):
+    """Создаёт и заполняет индекс FTS5 (только для SQLite с поддержкой FTS5)"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    try:
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+            f"USING fts5(document, tokenize='unicode61 remove_diacritics 0')"
+        )
+    except OperationalError:
+        # SQLite собран без FTS5: поиск будет работать без индекса
+        return
+
+    Employee = apps.get_model('employees', 'Employee')
+    rows = [
+        (employee.pk, build_document(
+            full_name=employee.full_name,
+            position=employee.position,
+            department_name=employee.department.name if employee.department else '',
+            department_short_name=employee.department.short_name if employee.department else '',
+            phone=employee.phone,
+            internal_phone=employee.internal_phone,
+            email=employee.email,
+        ))
+        for employee in Employee.objects.select_related('department')
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(f'INSERT INTO {FTS_TABLE} (rowid, document) VALUES (%s, %s)', rows)
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0002_department_path'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0003_employee_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importlog',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Окончание обработки'),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='processed_records',
+            field=models.IntegerField(default=0, verbose_name='Обработано строк'),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='rows_per_second',
+            field=models.FloatField(blank=True, null=True, verbose_name='Строк в секунду'),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='source_file',
+            field=models.FileField(blank=True, upload_to='imports/%Y/%m/', verbose_name='Файл импорта'),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Начало обработки'),
+        ),
+        migrations.AlterField(
+            model_name='importlog',
+            name='added',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='importlog',
+            name='status',
+            field=models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('success', 'Успешно'), ('partial', 'Частично'), ('failed', 'Не удалось')], max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='importlog',
+            name='total_records',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='importlog',
+            name='updated',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0004_importlog_job_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importlog',
+            name='applied_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Изменения применены'),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='change_set',
+            field=models.JSONField(blank=True, null=True, verbose_name='Набор изменений'),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='dry_run',
+            field=models.BooleanField(default=False, verbose_name='Только предпросмотр'),
+        ),
+        migrations.AlterField(
+            model_name='importlog',
+            name='status',
+            field=models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('success', 'Успешно'), ('partial', 'Частично'), ('failed', 'Не удалось'), ('preview', 'Предпросмотр')], max_length=10),
+        ),
+    ]
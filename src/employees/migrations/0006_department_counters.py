@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:55
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    """Заполняет счётчики сотрудников и вложенных подразделений"""
+    Department = apps.get_model('employees', 'Department')
+    Employee = apps.get_model('employees', 'Employee')
+    departments = list(Department.objects.order_by('path'))
+    counts = dict(Employee.objects.filter(department__isnull=False)
+                  .order_by().values_list('department_id').annotate(count=Count('id')))
+
+    by_pk = {dept.pk: dept for dept in departments}
+    for dept in departments:
+        dept.direct_employee_count = counts.get(dept.pk, 0)
+        dept.subtree_employee_count = dept.direct_employee_count
+    # Потомки идут в порядке путей после предков: суммируем снизу вверх
+    for dept in reversed(departments):
+        parent = by_pk.get(dept.parent_id)
+        if parent is not None:
+            parent.subtree_employee_count += dept.subtree_employee_count
+            parent.descendant_count += dept.descendant_count + 1
+
+    Department.objects.bulk_update(
+        departments, ['direct_employee_count', 'subtree_employee_count', 'descendant_count'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0005_importlog_change_set'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='descendant_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Вложенных подразделений'),
+        ),
+        migrations.AddField(
+            model_name='department',
+            name='direct_employee_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Сотрудников в подразделении'),
+        ),
+        migrations.AddField(
+            model_name='department',
+            name='subtree_employee_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Сотрудников с вложенными'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
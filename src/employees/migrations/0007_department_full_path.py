@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:59
+
+from django.db import migrations, models
+
+
+def fill_full_paths(apps, schema_editor):
+    """Заполняет полные пути подразделений из названий предков"""
+    Department = apps.get_model('employees', 'Department')
+    departments = list(Department.objects.order_by('path'))
+    full_paths = {}
+    # Родитель всегда предшествует потомкам в порядке путей
+    for dept in departments:
+        parent_full_path = full_paths.get(dept.parent_id)
+        dept.full_path = f'{parent_full_path} → {dept.name}' if parent_full_path else dept.name
+        full_paths[dept.pk] = dept.full_path
+    Department.objects.bulk_update(departments, ['full_path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0006_department_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='full_path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=1000, verbose_name='Полный путь'),
+        ),
+        migrations.RunPython(fill_full_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-17 05:00
+
+from django.db import migrations, models
+
+
+def create_version(apps, schema_editor):
+    """Создаёт единственную запись версии справочника"""
+    DirectoryVersion = apps.get_model('employees', 'DirectoryVersion')
+    DirectoryVersion.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0007_department_full_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirectoryVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=1, verbose_name='Версия')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Версия справочника',
+                'verbose_name_plural': 'Версия справочника',
+            },
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
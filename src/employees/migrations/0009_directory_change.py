@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-17 05:03
+
+from django.db import migrations, models
+
+
+def seed_changes(apps, schema_editor):
+    """
+    Записывает текущие подразделения и сотрудников как добавленные,
+    чтобы синхронизация с нуля отдавала весь справочник
+    """
+    Department = apps.get_model('employees', 'Department')
+    Employee = apps.get_model('employees', 'Employee')
+    DirectoryChange = apps.get_model('employees', 'DirectoryChange')
+    changes = [
+        DirectoryChange(object_type='department', object_id=pk, action='insert')
+        for pk in Department.objects.order_by('path').values_list('pk', flat=True)
+    ]
+    changes += [
+        DirectoryChange(object_type='employee', object_id=pk, action='insert')
+        for pk in Employee.objects.order_by('pk').values_list('pk', flat=True)
+    ]
+    DirectoryChange.objects.bulk_create(changes, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0008_directory_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirectoryChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_type', models.CharField(choices=[('department', 'Подразделение'), ('employee', 'Сотрудник')], max_length=10, verbose_name='Тип объекта')),
+                ('object_id', models.BigIntegerField(verbose_name='Идентификатор объекта')),
+                ('action', models.CharField(choices=[('insert', 'Добавление'), ('update', 'Изменение'), ('delete', 'Удаление')], max_length=6, verbose_name='Действие')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Изменение справочника',
+                'verbose_name_plural': 'Журнал изменений справочника',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.RunPython(seed_changes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-17 05:06
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_department_fields(apps, schema_editor):
+    """Копирует уровень и название подразделения в поля сортировки сотрудников"""
+    Department = apps.get_model('employees', 'Department')
+    Employee = apps.get_model('employees', 'Employee')
+    departments = Department.objects.filter(pk=OuterRef('department_id'))
+    Employee.objects.filter(department__isnull=False).update(
+        department_level=Subquery(departments.values('level')[:1]),
+        department_name=Subquery(departments.values('name')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0009_directory_change'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='employee',
+            options={'ordering': ['department_level', 'department_name', 'department_id', 'hierarchy', 'full_name'], 'verbose_name': 'Сотрудник', 'verbose_name_plural': 'Сотрудники'},
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='department_level',
+            field=models.IntegerField(blank=True, editable=False, null=True, verbose_name='Уровень подразделения'),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='department_name',
+            field=models.CharField(blank=True, editable=False, max_length=200, null=True, verbose_name='Название подразделения'),
+        ),
+        migrations.RunPython(fill_department_fields, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['department_level', 'department_name', 'department', 'hierarchy', 'full_name'], name='employee_sort_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['department', 'department_level', 'department_name', 'hierarchy', 'full_name'],
+                         name='employee_department_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['phone'], name='employee_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['internal_phone'], name='employee_internal_phone_idx'),
+        ),
+    ]
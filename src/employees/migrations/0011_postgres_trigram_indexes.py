@@ -0,0 +1,41 @@
+from django.db import migrations
+
+# Триграммные GIN-индексы: поиск подстрок (icontains строится как
+# UPPER(поле) LIKE UPPER(...)) и сходство ФИО при опечатках
+TRIGRAM_INDEXES = [
+    ('employee_full_name_trgm', 'employees_employee', 'full_name'),
+    ('employee_full_name_upper_trgm', 'employees_employee', 'UPPER(full_name)'),
+    ('employee_position_upper_trgm', 'employees_employee', 'UPPER(position)'),
+    ('employee_phone_upper_trgm', 'employees_employee', 'UPPER(phone)'),
+    ('employee_email_upper_trgm', 'employees_employee', 'UPPER(email)'),
+    ('department_name_upper_trgm', 'employees_department', 'UPPER(name)'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Включает pg_trgm и создаёт триграммные индексы (только PostgreSQL)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, expression in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (({expression}) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, expression in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0010_employee_sort_fields'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-17 05:42
+
+from django.db import migrations
+
+# Первая версия миграции добавляла в модель сотрудника столбец search_vector
+# (tsvector) на всех СУБД. Хранение вектора перенесено в отдельную таблицу
+# PostgreSQL (см. 0016_employee_search_table), миграция оставлена пустой,
+# чтобы не нарушать цепочку зависимостей.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0011_postgres_trigram_indexes'),
+    ]
+
+    operations = []
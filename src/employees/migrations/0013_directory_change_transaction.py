@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-17 05:55
+
+import employees.models
+from django.db import migrations, models
+
+
+def reset_transaction_ids(apps, schema_editor):
+    """
+    Существующие записи получают нулевую транзакцию: они уже зафиксированы
+    и упорядочены по id, а старые целочисленные курсоры клиентов
+    соответствуют паре (0, id)
+    """
+    DirectoryChange = apps.get_model('employees', 'DirectoryChange')
+    DirectoryChange.objects.update(transaction_id=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0012_employee_search_vector'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='directorychange',
+            options={'ordering': ['transaction_id', 'id'], 'verbose_name': 'Изменение справочника', 'verbose_name_plural': 'Журнал изменений справочника'},
+        ),
+        migrations.AddField(
+            model_name='directorychange',
+            name='transaction_id',
+            field=models.BigIntegerField(db_default=employees.models.CurrentTransactionId(), editable=False, verbose_name='Транзакция'),
+        ),
+        migrations.RunPython(reset_transaction_ids, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='directorychange',
+            index=models.Index(fields=['transaction_id', 'id'], name='directory_change_cursor_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# Триграммные индексы должны покрывать все ветви OR в запросе, иначе
+# PostgreSQL не может собрать BitmapOr и читает таблицу целиком.
+# Поиск сотрудников (PostgresSearchBackend) идёт по tsvector и
+# full_name %> запрос — индексы таблицы поисковых векторов и
+# employee_full_name_trgm. UPPER-индексы обслуживают icontains поиска в
+# админке: у сотрудников это full_name, position, phone, email (индексы из
+# 0011), у подразделений name и short_name — для short_name индекса не было.
+TRIGRAM_INDEXES = [
+    ('department_short_name_upper_trgm', 'employees_department', 'UPPER(short_name)'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Создаёт недостающие триграммные индексы (только PostgreSQL)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, expression in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (({expression}) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, expression in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0013_directory_change_transaction'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 06:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0014_department_short_name_trigram_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importlog',
+            name='unchanged',
+            field=models.IntegerField(default=0, verbose_name='Без изменений'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations
+
+# Поисковые векторы PostgreSQL хранятся в отдельной таблице, как документы
+# FTS5 на SQLite: модель сотрудника не зависит от django.contrib.postgres.
+# Внешнего ключа нет (иначе flush не сможет очистить таблицу сотрудников):
+# строки удаляет бэкенд поиска, а лишние строки не влияют на результат.
+# Документ — копия схемы на момент миграции (см. PostgresSearchBackend).
+SEARCH_TABLE = 'employees_employee_search'
+SEARCH_INDEX = 'employee_search_document_idx'
+LEGACY_COLUMN = 'search_vector'
+
+
+def drop_legacy_column(schema_editor):
+    """Удаляет столбец search_vector, добавленный прежней версией 0012"""
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        columns = [
+            column.name for column in
+            connection.introspection.get_table_description(cursor, 'employees_employee')
+        ]
+    if LEGACY_COLUMN in columns:
+        if connection.vendor == 'postgresql':
+            schema_editor.execute('DROP INDEX IF EXISTS employee_search_vector_idx')
+        schema_editor.execute(f'ALTER TABLE employees_employee DROP COLUMN {LEGACY_COLUMN}')
+
+
+def create_search_table(apps, schema_editor):
+    """Создаёт и заполняет таблицу поисковых векторов (только PostgreSQL)"""
+    drop_legacy_column(schema_editor)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (
+            employee_id bigint PRIMARY KEY,
+            document tsvector NOT NULL
+        )
+    """)
+    schema_editor.execute(f"""
+        INSERT INTO {SEARCH_TABLE} (employee_id, document)
+        SELECT employee.id, to_tsvector('russian', concat_ws(' ',
+            employee.full_name, employee.position, department.name, department.short_name,
+            employee.phone, employee.internal_phone, employee.email))
+        FROM employees_employee AS employee
+        LEFT JOIN employees_department AS department ON department.id = employee.department_id
+        ON CONFLICT (employee_id) DO NOTHING
+    """)
+    schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {SEARCH_INDEX} ON {SEARCH_TABLE} USING gin (document)')
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0015_importlog_unchanged'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
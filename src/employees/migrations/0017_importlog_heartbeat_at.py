@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 06:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0016_employee_search_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importlog',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последний признак работы'),
+        ),
+    ]
@@ -1,16 +1,46 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Concat, Left, Length, Substr
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 class Department(models.Model):
     """
     Модель структурного подразделения с иерархической структурой
+
+    Иерархия дополнительно индексируется материализованным путём (поле path):
+    путь состоит из идентификаторов всех предков и самого подразделения,
+    дополненных нулями до фиксированной ширины. Благодаря этому выборка
+    потомков, предков и сотрудников поддерева выполняется одним запросом.
+    Полный путь из названий (full_path) хранится рядом и обновляется у всего
+    поддерева при переименовании или перемещении подразделения.
+
+    Счётчики сотрудников и вложенных подразделений хранятся в самой модели
+    и поддерживаются модулем counters.py; обычное сохранение их не
+    перезаписывает, чтобы не затереть приращения, сделанные параллельно.
     """
+    PATH_STEP_WIDTH = 10
+    PATH_SEPARATOR = '/'
+    FULL_PATH_SEPARATOR = ' → '
+    COUNTER_FIELDS = ('direct_employee_count', 'subtree_employee_count', 'descendant_count')
+
     name = models.CharField(max_length=200, verbose_name="Название")
     short_name = models.CharField(max_length=50, blank=True, verbose_name="Короткое название")
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True,
                               verbose_name="Родительское подразделение", 
                               related_name='children')
     level = models.IntegerField(default=1, verbose_name="Уровень")
+    path = models.CharField(max_length=255, blank=True, default='', db_index=True,
+                            editable=False, verbose_name="Путь в иерархии")
+    full_path = models.CharField(max_length=1000, blank=True, default='', editable=False,
+                                 verbose_name="Полный путь")
+    direct_employee_count = models.PositiveIntegerField(default=0, editable=False,
+                                                        verbose_name="Сотрудников в подразделении")
+    subtree_employee_count = models.PositiveIntegerField(default=0, editable=False,
+                                                         verbose_name="Сотрудников с вложенными")
+    descendant_count = models.PositiveIntegerField(default=0, editable=False,
+                                                   verbose_name="Вложенных подразделений")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -22,36 +52,206 @@ class Department(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def make_path(cls, pk, parent_path=''):
+        """Формирует материализованный путь по идентификатору и пути родителя"""
+        return f'{parent_path}{pk:0{cls.PATH_STEP_WIDTH}d}{cls.PATH_SEPARATOR}'
+
+    @classmethod
+    def subtree_q(cls, path, prefix='', include_self=True):
+        """
+        Возвращает условие выборки поддерева по материализованному пути.
+
+        Используется диапазонный запрос вместо LIKE: все пути поддерева лежат
+        в интервале [path, path без разделителя + '0'), так как разделитель '/'
+        в ASCII предшествует цифрам. Такой запрос использует обычный индекс.
+
+        path может быть и выражением (например, OuterRef('path') в подзапросе).
+        """
+        next_char = chr(ord(cls.PATH_SEPARATOR) + 1)
+        if isinstance(path, str):
+            upper = path[:-1] + next_char
+        else:
+            upper = Concat(Left(path, Length(path) - 1), Value(next_char), output_field=models.CharField())
+        lookup = 'gte' if include_self else 'gt'
+        return models.Q(**{f'{prefix}path__{lookup}': path, f'{prefix}path__lt': upper})
+
+    @classmethod
+    def make_full_path(cls, name, parent_full_path=''):
+        """Формирует полный путь из названий по названию и полному пути родителя"""
+        if not parent_full_path:
+            return name
+        return f'{parent_full_path}{cls.FULL_PATH_SEPARATOR}{name}'
+
+    def _get_parent_paths(self):
+        """Возвращает актуальные путь и полный путь родителя из базы данных"""
+        if not self.parent_id:
+            return '', ''
+        return Department.objects.values_list('path', 'full_path').get(pk=self.parent_id)
+
+    def _get_parent_path(self):
+        """Возвращает актуальный путь родителя из базы данных"""
+        return self._get_parent_paths()[0]
+
+    @classmethod
+    def ids_from_path(cls, path):
+        """Возвращает идентификаторы всех подразделений пути (от корня)"""
+        return [int(part) for part in path.split(cls.PATH_SEPARATOR)[:-1]]
+
+    def _check_parent(self, parent_path):
+        """Проверяет, что подразделение не вкладывается в самого себя или своего потомка"""
+        if self.pk and self.parent_id and self.pk in self.ids_from_path(parent_path):
+            raise ValidationError({
+                'parent': 'Подразделение не может быть вложено в самого себя или своего потомка'
+            })
+
+    def save(self, *args, **kwargs):
+        parent_path, parent_full_path = self._get_parent_paths()
+        # Проверка из clean() повторяется здесь: импорт, shell и API
+        # сохраняют без валидации формы, а цикл испортил бы пути поддерева
+        self._check_parent(parent_path)
+        self.level = parent_path.count(self.PATH_SEPARATOR) + 1
+        self._moved = False
+        self._rebased = False
+        old_full_path = self.full_path
+        self.full_path = self.make_full_path(self.name, parent_full_path)
+
+        if self.pk is None:
+            super().save(*args, **kwargs)
+            self.path = self.make_path(self.pk, parent_path)
+            Department.objects.filter(pk=self.pk).update(path=self.path)
+            return
+
+        if kwargs.get('update_fields') is None and not self._state.adding and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+
+        old_path = self.path
+        new_path = self.make_path(self.pk, parent_path)
+        moved = old_path != new_path
+        if not moved and old_full_path == self.full_path:
+            super().save(*args, **kwargs)
+            return
+
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'path', 'level', 'full_path'}
+
+        with transaction.atomic():
+            self.path = new_path
+            self._moved = moved and bool(old_path)
+            # Потомки переносятся до сохранения, чтобы обработчики post_save
+            # уже видели их новые пути
+            if old_path:
+                self._rebase_descendants(old_path, old_full_path)
+                self._rebased = True
+            super().save(*args, **kwargs)
+            self._refresh_employee_fields(moved)
+
+    def _refresh_employee_fields(self, moved):
+        """
+        Обновляет продублированные у сотрудников уровень и название
+        подразделения: при перемещении меняются уровни всего поддерева
+        """
+        if not moved:
+            Employee.objects.filter(department=self).update(department_name=self.name)
+            return
+        departments = Department.objects.filter(pk=OuterRef('department_id'))
+        Employee.objects.filter(self.subtree_q(self.path, prefix='department__')).update(
+            department_level=Subquery(departments.values('level')[:1]),
+            department_name=Subquery(departments.values('name')[:1]),
+        )
+
+    def _rebase_descendants(self, old_path, old_full_path):
+        """
+        Переносит пути, полные пути и уровни всех потомков при перемещении
+        или переименовании подразделения
+        """
+        level_delta = (len(self.path) - len(old_path)) // (self.PATH_STEP_WIDTH + 1)
+        updates = {
+            'path': Concat(Value(self.path), Substr('path', len(old_path) + 1), output_field=models.CharField()),
+            'level': F('level') + level_delta,
+            'updated_at': timezone.now(),
+        }
+        if old_full_path:
+            updates['full_path'] = Concat(Value(self.full_path), Substr('full_path', len(old_full_path) + 1),
+                                          output_field=models.CharField())
+        Department.objects.filter(self.subtree_q(old_path, include_self=False)).update(**updates)
+        if not old_full_path:
+            self._rebuild_descendant_full_paths()
+
+    def _rebuild_descendant_full_paths(self):
+        """
+        Заново собирает полные пути потомков по названиям, если прежний
+        полный путь подразделения не заполнен и заменить префикс нельзя
+        """
+        full_paths = {self.pk: self.full_path}
+        descendants = list(Department.objects.filter(self.subtree_q(self.path, include_self=False))
+                           .order_by('path').only('id', 'parent_id', 'name', 'full_path'))
+        for dept in descendants:
+            dept.full_path = self.make_full_path(dept.name, full_paths[dept.parent_id])
+            full_paths[dept.pk] = dept.full_path
+        Department.objects.bulk_update(descendants, ['full_path'], batch_size=1000)
+
+    def clean(self):
+        super().clean()
+        if self.pk and self.parent_id:
+            self._check_parent(self._get_parent_path())
+
+    def get_ancestor_ids(self):
+        """Возвращает идентификаторы предков (от корня), разбирая материализованный путь"""
+        return self.ids_from_path(self.path)[:-1]
+
+    def get_ancestors(self, include_self=False):
+        """Возвращает предков подразделения одним запросом, начиная с корня"""
+        ids = self.get_ancestor_ids()
+        if include_self:
+            ids.append(self.pk)
+        return Department.objects.filter(pk__in=ids).order_by('path')
+
+    def get_descendants(self, include_self=False):
+        """Возвращает всех потомков подразделения одним запросом"""
+        return Department.objects.filter(self.subtree_q(self.path, include_self=include_self))
+
     def get_full_path(self):
-        """Возвращает полный путь подразделения в иерархии"""
-        parts = []
-        current = self
-        while current:
-            parts.append(current.name)
-            current = current.parent
-        return ' → '.join(reversed(parts))
+        """Возвращает полный путь подразделения в иерархии (хранится в full_path)"""
+        return self.full_path
 
     def get_all_children(self):
         """Возвращает все дочерние подразделения рекурсивно"""
-        children = list(self.children.all())
-        for child in self.children.all():
-            children.extend(child.get_all_children())
-        return children
+        return list(self.get_descendants().order_by('path'))
 
     def get_tree_data(self):
         """Возвращает данные для древовидного отображения"""
-        return {
-            'id': self.id,
-            'name': self.name,
-            'short_name': self.short_name,
-            'level': self.level,
-            'children': [child.get_tree_data() for child in self.children.all().order_by('name')]
-        }
+        nodes = {}
+        root = None
+        for dept in self.get_descendants(include_self=True).order_by('level', 'name'):
+            node = {
+                'id': dept.id,
+                'name': dept.name,
+                'short_name': dept.short_name,
+                'level': dept.level,
+                'children': []
+            }
+            nodes[dept.id] = node
+            if dept.id == self.id:
+                root = node
+            elif dept.parent_id in nodes:
+                nodes[dept.parent_id]['children'].append(node)
+        return root
 
 
 class Employee(models.Model):
     """
     Модель сотрудника/абонента телефонной книги
+
+    Уровень и название подразделения продублированы в самой модели
+    (department_level, department_name): порядок по умолчанию и составной
+    индекс строятся по ним, поэтому список выдаётся в порядке индекса без
+    соединения с подразделениями и сортировки. Поля заполняются при
+    сохранении сотрудника, при импорте и обновляются при переименовании,
+    перемещении и удалении подразделения.
     """
     HIERARCHY_LEVELS = [
         (1, 'Высшее руководство (ГД)'),
@@ -74,40 +274,162 @@ class Employee(models.Model):
     email = models.EmailField(blank=True, verbose_name="Email")
     room = models.CharField(max_length=50, blank=True, verbose_name="Кабинет")
     hierarchy = models.IntegerField(choices=HIERARCHY_LEVELS, default=7, verbose_name="Уровень иерархии")
+    department_level = models.IntegerField(null=True, blank=True, editable=False,
+                                           verbose_name="Уровень подразделения")
+    department_name = models.CharField(max_length=200, null=True, blank=True, editable=False,
+                                       verbose_name="Название подразделения")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ['department__level', 'department__name', 'hierarchy', 'full_name']
+        ordering = ['department_level', 'department_name', 'department_id', 'hierarchy', 'full_name']
         verbose_name = 'Сотрудник'
         verbose_name_plural = 'Сотрудники'
         unique_together = ['full_name', 'internal_phone']
+        indexes = [
+            # Порядок списка и админки
+            models.Index(fields=['department_level', 'department_name', 'department', 'hierarchy', 'full_name'],
+                         name='employee_sort_idx'),
+            # Сотрудники подразделения в порядке вывода
+            models.Index(fields=['department', 'department_level', 'department_name', 'hierarchy', 'full_name'],
+                         name='employee_department_idx'),
+            # Поиск по номерам телефонов
+            models.Index(fields=['phone'], name='employee_phone_idx'),
+            models.Index(fields=['internal_phone'], name='employee_internal_phone_idx'),
+        ]
 
     def __str__(self):
         return f"{self.full_name} ({self.position})"
 
+    def fill_department_fields(self):
+        """Копирует уровень и название подразделения в поля сортировки"""
+        department = self.department if self.department_id else None
+        self.department_level = department.level if department else None
+        self.department_name = department.name if department else None
+
+    def save(self, *args, **kwargs):
+        self.fill_department_fields()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'department_level', 'department_name'}
+        super().save(*args, **kwargs)
+
     def get_hierarchy_display(self):
         """Возвращает отображаемое название уровня иерархии"""
         return dict(self.HIERARCHY_LEVELS).get(self.hierarchy, 'Неизвестно')
 
 
+class DirectoryVersion(models.Model):
+    """
+    Версия справочника
+
+    Единственная запись с монотонно растущим номером, который увеличивается
+    при каждом изменении сотрудников или подразделений (см. versioning.py).
+    Номер хранится в базе, поэтому он общий для всех процессов и не
+    сбрасывается вместе с кэшем.
+    """
+    version = models.PositiveBigIntegerField(default=1, verbose_name="Версия")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Версия справочника'
+        verbose_name_plural = 'Версия справочника'
+
+    def __str__(self):
+        return str(self.version)
+
+
+class CurrentTransactionId(models.Func):
+    """
+    Идентификатор текущей транзакции PostgreSQL (64-битный, без переполнения)
+
+    На остальных СУБД записи пишутся строго последовательно, поэтому там
+    выражение равно нулю и порядок журнала задаёт только id.
+    """
+    output_field = models.BigIntegerField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return '0', []
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return '(pg_current_xact_id()::text)::bigint', []
+
+
+class DirectoryChange(models.Model):
+    """
+    Журнал изменений справочника для инкрементальной синхронизации
+
+    Запись фиксирует факт изменения объекта; курсором для клиентов служит
+    пара (transaction_id, id) (см. changefeed.py). Автоинкрементный id
+    на PostgreSQL выдаётся при вставке, а не при фиксации, поэтому сам по
+    себе порядка фиксации не отражает. Сами данные не хранятся: клиенту
+    отдаётся актуальное состояние объекта на момент запроса.
+    """
+    OBJECT_TYPES = [
+        ('department', 'Подразделение'),
+        ('employee', 'Сотрудник'),
+    ]
+    ACTIONS = [
+        ('insert', 'Добавление'),
+        ('update', 'Изменение'),
+        ('delete', 'Удаление'),
+    ]
+
+    object_type = models.CharField(max_length=10, choices=OBJECT_TYPES, verbose_name="Тип объекта")
+    object_id = models.BigIntegerField(verbose_name="Идентификатор объекта")
+    action = models.CharField(max_length=6, choices=ACTIONS, verbose_name="Действие")
+    transaction_id = models.BigIntegerField(db_default=CurrentTransactionId(), editable=False,
+                                            verbose_name="Транзакция")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['transaction_id', 'id']
+        indexes = [
+            models.Index(fields=['transaction_id', 'id'], name='directory_change_cursor_idx'),
+        ]
+        verbose_name = 'Изменение справочника'
+        verbose_name_plural = 'Журнал изменений справочника'
+
+    def __str__(self):
+        return f"{self.action} {self.object_type} #{self.object_id}"
+
+
 class ImportLog(models.Model):
     """
     Модель для логирования операций импорта данных
+
+    Импорт выполняется фоновым заданием: запись создаётся в статусе
+    'pending', переходит в 'running' и завершается итоговым статусом.
+    При предпросмотре (dry_run) база не изменяется: задание сохраняет набор
+    изменений в change_set и завершается статусом 'preview'. Применение
+    набора снова ставит запись в очередь, уже без повторного чтения файла.
     """
     STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('running', 'Выполняется'),
         ('success', 'Успешно'),
         ('partial', 'Частично'),
         ('failed', 'Не удалось'),
+        ('preview', 'Предпросмотр'),
     ]
+    FINISHED_STATUSES = ('success', 'partial', 'failed', 'preview')
 
     file_name = models.CharField(max_length=255)
+    source_file = models.FileField(upload_to='imports/%Y/%m/', blank=True, verbose_name="Файл импорта")
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Начало обработки")
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name="Последний признак работы")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Окончание обработки")
     status = models.CharField(max_length=10, choices=STATUS_CHOICES)
-    total_records = models.IntegerField()
-    added = models.IntegerField()
-    updated = models.IntegerField()
+    total_records = models.IntegerField(default=0)
+    processed_records = models.IntegerField(default=0, verbose_name="Обработано строк")
+    rows_per_second = models.FloatField(null=True, blank=True, verbose_name="Строк в секунду")
+    added = models.IntegerField(default=0)
+    updated = models.IntegerField(default=0)
+    unchanged = models.IntegerField(default=0, verbose_name="Без изменений")
     errors = models.TextField(blank=True)
+    dry_run = models.BooleanField(default=False, verbose_name="Только предпросмотр")
+    change_set = models.JSONField(null=True, blank=True, verbose_name="Набор изменений")
+    applied_at = models.DateTimeField(null=True, blank=True, verbose_name="Изменения применены")
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
 
     class Meta:
@@ -117,4 +439,13 @@ class ImportLog(models.Model):
 
     def get_status_display(self):
         """Возвращает отображаемое название статуса"""
-        return dict(self.STATUS_CHOICES).get(self.status, 'Неизвестно')
\ No newline at end of file
+        return dict(self.STATUS_CHOICES).get(self.status, 'Неизвестно')
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED_STATUSES
+
+    @property
+    def can_apply(self):
+        """Набор изменений готов и ещё не применён"""
+        return self.status == 'preview' and self.change_set is not None
@@ -0,0 +1,174 @@
+"""
+Нормализация значений при импорте
+
+Значения в файлах импорта сильно повторяются (подразделения, должности,
+пустые ячейки), поэтому нормализация выполняется по столбцам: каждое
+различное значение столбца обрабатывается один раз (map_column), а
+разбор названий подразделений и определение уровня по должности
+кэшируются между пакетами.
+
+Уровень иерархии по должности определяется автоматом Ахо–Корасик: все
+ключевые слова ищутся за один проход по строке, и результатом становится
+наименьший уровень среди найденных слов — это совпадает с проверкой групп
+слов по порядку от первого уровня к восьмому.
+"""
+import re
+from collections import deque
+from functools import lru_cache
+
+import pandas as pd
+
+DEFAULT_HIERARCHY = 7  # Специалист
+FALLBACK_HIERARCHY = 8  # Ассистенты по умолчанию
+EMPTY_VALUES = frozenset(['', 'nan', 'none', 'null'])
+CACHE_SIZE = 65536
+
+# Ключевые слова должностей по уровням иерархии (проверяются по порядку)
+HIERARCHY_KEYWORDS = [
+    (1, ['генеральный директор', 'гд', 'директор']),
+    (2, ['первый заместитель', '1-й зам']),
+    (3, ['заместитель', 'зам', 'вице']),
+    (4, ['руководитель центра', 'директор департамента', 'начальник департамента']),
+    (5, ['руководитель управления', 'начальник управления', 'руководитель отделения']),
+    (6, ['руководитель отдела', 'начальник отдела', 'руководитель службы']),
+    (7, ['специалист', 'эксперт', 'аналитик']),
+]
+
+SHORT_NAME_RE = re.compile(r'\((.*?)\)')
+
+
+def clean_value(value, is_level=False):
+    """Очищает значение ячейки; для уровня иерархии возвращает число 1-8"""
+    if isinstance(value, str):
+        # Быстрый путь: потоковый читатель возвращает строки
+        value_str = value.strip()
+        if value_str.lower() in EMPTY_VALUES:
+            return '' if not is_level else DEFAULT_HIERARCHY
+    elif value is None or pd.isna(value) or str(value).strip().lower() in EMPTY_VALUES:
+        return '' if not is_level else DEFAULT_HIERARCHY
+    else:
+        value_str = str(value).strip()
+
+    if is_level:
+        try:
+            level = int(float(value_str))
+            return max(1, min(8, level))  # Ограничиваем диапазон 1-8
+        except (ValueError, TypeError):
+            return DEFAULT_HIERARCHY
+    return value_str
+
+
+def clean_level(value):
+    """Очищает значение уровня иерархии"""
+    return clean_value(value, is_level=True)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def extract_short_name(full_name):
+    """Извлекает сокращенное название из скобок"""
+    match = SHORT_NAME_RE.search(full_name)
+    if match:
+        short_name = match.group(1)
+        clean_name = SHORT_NAME_RE.sub('', full_name).strip()
+        return clean_name, short_name
+    return full_name, ''
+
+
+def parse_department_name(value):
+    """Возвращает пару (название, короткое название) или None для пустой ячейки"""
+    dept_name = clean_value(value)
+    return extract_short_name(dept_name) if dept_name else None
+
+
+class KeywordAutomaton:
+    """
+    Автомат Ахо–Корасик для поиска набора ключевых слов в строке.
+
+    Каждому слову сопоставлено значение; find_min возвращает наименьшее
+    значение среди слов, встречающихся в строке (или default).
+    """
+
+    def __init__(self, keywords):
+        self.transitions = [{}]
+        self.best = [None]
+
+        for word, value in keywords:
+            state = 0
+            for char in word:
+                next_state = self.transitions[state].get(char)
+                if next_state is None:
+                    next_state = len(self.transitions)
+                    self.transitions[state][char] = next_state
+                    self.transitions.append({})
+                    self.best.append(None)
+                state = next_state
+            self.best[state] = self._min(self.best[state], value)
+
+        # Суффиксные ссылки строятся обходом в ширину; лучшее значение
+        # состояния учитывает и все слова, оканчивающиеся в нём
+        self.fail = [0] * len(self.transitions)
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.transitions[state].items():
+                fail = self.fail[state]
+                while fail and char not in self.transitions[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_state] = self.transitions[fail].get(char, 0)
+                self.best[next_state] = self._min(self.best[next_state], self.best[self.fail[next_state]])
+                queue.append(next_state)
+
+    @staticmethod
+    def _min(a, b):
+        if a is None:
+            return b
+        if b is None:
+            return a
+        return min(a, b)
+
+    def find_min(self, text, default=None):
+        transitions = self.transitions
+        fail = self.fail
+        best_values = self.best
+        state = 0
+        best = None
+        for char in text:
+            while state and char not in transitions[state]:
+                state = fail[state]
+            state = transitions[state].get(char, 0)
+            value = best_values[state]
+            if value is not None and (best is None or value < best):
+                best = value
+        return default if best is None else best
+
+
+hierarchy_automaton = KeywordAutomaton(
+    (word, level) for level, words in HIERARCHY_KEYWORDS for word in words
+)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def determine_hierarchy_from_position(position):
+    """Определяет уровень иерархии на основе должности"""
+    return hierarchy_automaton.find_min(position.lower(), default=FALLBACK_HIERARCHY)
+
+
+def map_column(values, func):
+    """
+    Применяет func к значениям столбца, вычисляя её один раз для каждого
+    различного значения. Исключение func возвращается вместо результата.
+    """
+    def apply(value):
+        try:
+            return func(value)
+        except Exception as e:
+            return e
+
+    try:
+        results = dict.fromkeys(values)
+    except TypeError:
+        # В столбце есть нехешируемые значения
+        return [apply(value) for value in values]
+    for value in results:
+        results[value] = apply(value)
+    return [results[value] for value in values]
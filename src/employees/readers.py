@@ -0,0 +1,118 @@
+"""
+Потоковое чтение файлов импорта (XLSX и CSV)
+
+Файл не загружается в память целиком: XLSX читается через openpyxl в режиме
+read_only, CSV — построчно через модуль csv. Читатель возвращает заголовок
+и генератор пар (номер строки, строка), где строка — словарь значений по
+названиям столбцов, а значения ячеек приведены к строкам.
+"""
+import codecs
+import csv
+import io
+
+from openpyxl import load_workbook
+
+CSV_EXTENSIONS = ('.csv',)
+XLSX_EXTENSIONS = ('.xlsx', '.xlsm')
+SUPPORTED_EXTENSIONS = XLSX_EXTENSIONS + CSV_EXTENSIONS
+CSV_ENCODINGS = ('utf-8-sig', 'cp1251')
+CSV_DELIMITERS = ';,\t'
+CSV_SAMPLE_SIZE = 64 * 1024
+
+
+class ImportFile:
+    """
+    Открытый файл импорта: заголовок, ожидаемое число строк и строки данных
+    """
+
+    def __init__(self, header, rows, total=None, close=None):
+        self.header = [normalize_cell(name) for name in header]
+        self.total = total
+        self._rows = rows
+        self._close = close
+
+    def __iter__(self):
+        try:
+            # Номер строки как в файле: первая строка — заголовок
+            for row_number, values in enumerate(self._rows, start=2):
+                values = [normalize_cell(value) for value in values]
+                if not any(values):
+                    continue
+                if len(values) < len(self.header):
+                    values += [''] * (len(self.header) - len(values))
+                yield row_number, dict(zip(self.header, values))
+        finally:
+            self.close()
+
+    def close(self):
+        if self._close:
+            self._close()
+            self._close = None
+
+
+def normalize_cell(value):
+    """Приводит значение ячейки к строке (пустые ячейки — пустая строка)"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Числа в Excel хранятся как float: 101.0 → '101'
+        value = int(value)
+    return str(value).strip()
+
+
+def get_extension(file):
+    name = (getattr(file, 'name', '') or '').lower()
+    return name[name.rfind('.'):] if '.' in name else ''
+
+
+def read_xlsx(file):
+    """Открывает первый лист XLSX-файла в режиме потокового чтения"""
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    sheet = workbook.active
+    rows = sheet.iter_rows(values_only=True)
+    header = next(rows, ())
+    # Размер листа берётся из метаданных файла и может отсутствовать
+    total = sheet.max_row - 1 if sheet.max_row else None
+    return ImportFile(header, rows, total, close=workbook.close)
+
+
+def detect_csv_format(sample):
+    """Определяет кодировку и разделитель CSV по началу файла"""
+    for encoding in CSV_ENCODINGS:
+        try:
+            # Инкрементальный декодер допускает обрезанный последний символ
+            text = codecs.getincrementaldecoder(encoding)().decode(sample)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise ValueError('Не удалось определить кодировку CSV-файла')
+
+    try:
+        delimiter = csv.Sniffer().sniff(text.split('\n', 1)[0], CSV_DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ','
+    return encoding, delimiter
+
+
+def read_csv(file):
+    """Открывает CSV-файл для построчного чтения"""
+    sample = file.read(CSV_SAMPLE_SIZE)
+    file.seek(0)
+    encoding, delimiter = detect_csv_format(sample)
+
+    text = io.TextIOWrapper(file, encoding=encoding, newline='')
+    reader = csv.reader(text, delimiter=delimiter)
+    header = next(reader, [])
+    # Отсоединяем обёртку, чтобы она не закрыла исходный файл
+    return ImportFile(header, reader, close=text.detach)
+
+
+def read_rows(file):
+    """Открывает файл импорта по расширению имени; по умолчанию — как XLSX"""
+    try:
+        if get_extension(file) in CSV_EXTENSIONS:
+            return read_csv(file)
+        return read_xlsx(file)
+    except Exception as e:
+        raise ValueError(f"Ошибка чтения файла: {str(e)}")
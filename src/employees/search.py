@@ -0,0 +1,320 @@
+"""
+Полнотекстовый поиск сотрудников
+
+Поиск вынесен в сменные бэкенды. По умолчанию для SQLite используется
+индекс FTS5 (таблица employees_employee_fts, rowid совпадает с id сотрудника),
+для PostgreSQL — tsvector с русской конфигурацией (таблица
+employees_employee_search) и триграммы. Обе таблицы создаются миграциями
+только на своей СУБД, модели от них не зависят. Бэкенд можно задать явно
+настройкой EMPLOYEES_SEARCH_BACKEND (путь к классу).
+
+Индекс FTS5 и таблица tsvector PostgreSQL синхронизируются сигналами
+моделей и импортом (index_employees). Для русской морфологии слова FTS5
+дополнительно индексируются в виде основ (см. stem), а каждое слово
+запроса ищется по префиксу.
+"""
+import re
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection, models
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+FTS_TABLE = 'employees_employee_fts'
+PG_SEARCH_TABLE = 'employees_employee_search'
+INDEX_BATCH_SIZE = 500
+MIN_STEM_LENGTH = 4
+MIN_PHONE_SUFFIX_LENGTH = 3
+
+# Окончания существительных, прилагательных и причастий (самые длинные первыми)
+RUSSIAN_ENDINGS = sorted({
+    'иями', 'ями', 'ами', 'ией', 'ием', 'иях', 'ях', 'ах', 'ов', 'ев', 'ей', 'ий', 'ый', 'ой',
+    'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ого', 'его', 'ому', 'ему', 'ым', 'им', 'ом', 'ем',
+    'ую', 'юю', 'ых', 'их', 'ыми', 'ими', 'ия', 'ию', 'ии', 'ью',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+}, key=len, reverse=True)
+
+CYRILLIC_WORD_RE = re.compile(r'^[а-я]+$')
+WORD_RE = re.compile(r'\w+')
+
+
+def normalize_text(value):
+    """Приводит строку к нижнему регистру и заменяет 'ё' на 'е'"""
+    return (value or '').lower().replace('ё', 'е')
+
+
+def tokenize(value):
+    """Разбивает строку на нормализованные слова"""
+    return WORD_RE.findall(normalize_text(value))
+
+
+def stem(word):
+    """Возвращает упрощённую основу русского слова, отбрасывая окончание"""
+    if not CYRILLIC_WORD_RE.match(word):
+        return word
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def phone_tokens(phone):
+    """Возвращает цифры телефона и их суффиксы для поиска по части номера"""
+    digits = re.sub(r'\D', '', phone or '')
+    return [digits[i:] for i in range(len(digits) - MIN_PHONE_SUFFIX_LENGTH + 1)]
+
+
+def build_document(full_name='', position='', department_name='', department_short_name='',
+                   phone='', internal_phone='', email=''):
+    """Формирует текст документа поискового индекса для сотрудника"""
+    words = []
+    for value in (full_name, position, department_name, department_short_name, email):
+        for word in tokenize(value):
+            words.append(word)
+            word_stem = stem(word)
+            if word_stem != word:
+                words.append(word_stem)
+    for value in (phone, internal_phone):
+        words.extend(tokenize(value))
+        words.extend(phone_tokens(value))
+    return ' '.join(dict.fromkeys(words))
+
+
+def build_employee_document(employee):
+    """Формирует документ поискового индекса по объекту сотрудника"""
+    department = employee.department
+    return build_document(
+        full_name=employee.full_name,
+        position=employee.position,
+        department_name=department.name if department else '',
+        department_short_name=department.short_name if department else '',
+        phone=employee.phone,
+        internal_phone=employee.internal_phone,
+        email=employee.email,
+    )
+
+
+def build_match_query(query):
+    """
+    Преобразует пользовательский запрос в выражение MATCH для FTS5.
+
+    Каждое слово ищется по префиксу как в исходной форме, так и по основе;
+    слова объединяются через AND. Возвращает None, если в запросе нет слов.
+    """
+    terms = []
+    for word in tokenize(query):
+        variants = dict.fromkeys([word, stem(word)])
+        terms.append('(' + ' OR '.join(f'"{variant}"*' for variant in variants) + ')')
+    return ' AND '.join(terms) or None
+
+
+class BaseSearchBackend(ABC):
+    """Базовый класс бэкенда поиска сотрудников"""
+
+    @abstractmethod
+    def search(self, queryset, query):
+        """Фильтрует queryset сотрудников по поисковому запросу"""
+
+    def search_ranked(self, queryset, query, limit):
+        """Возвращает список наиболее релевантных сотрудников"""
+        return list(self.search(queryset, query)[:limit])
+
+    def index_employees(self, employees):
+        """Добавляет или обновляет сотрудников в индексе"""
+
+    def remove_employees(self, employee_ids):
+        """Удаляет сотрудников из индекса"""
+
+    def rebuild(self):
+        """Полностью перестраивает индекс"""
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Поиск без индекса: подстрока в любом из полей (icontains)"""
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            models.Q(full_name__icontains=query) |
+            models.Q(position__icontains=query) |
+            models.Q(department__name__icontains=query) |
+            models.Q(department__short_name__icontains=query) |
+            models.Q(phone__icontains=query) |
+            models.Q(email__icontains=query)
+        )
+
+
+class SQLiteFTSSearchBackend(BaseSearchBackend):
+    """Поиск по индексу SQLite FTS5"""
+
+    fallback = SimpleSearchBackend()
+
+    def search(self, queryset, query):
+        match = build_match_query(query)
+        if match is None:
+            return self.fallback.search(queryset, query)
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]
+        ))
+
+    def search_ranked(self, queryset, query, limit):
+        match = build_match_query(query)
+        if match is None:
+            return self.fallback.search_ranked(queryset, query, limit)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s',
+                [match, limit]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        found = queryset.in_bulk(ids)
+        return [found[pk] for pk in ids if pk in found]
+
+    def index_employees(self, employees):
+        rows = [(employee.pk, build_employee_document(employee)) for employee in employees]
+        self.remove_employees(pk for pk, _ in rows)
+        with connection.cursor() as cursor:
+            cursor.executemany(f'INSERT INTO {FTS_TABLE} (rowid, document) VALUES (%s, %s)', rows)
+
+    def remove_employees(self, employee_ids):
+        employee_ids = list(employee_ids)
+        with connection.cursor() as cursor:
+            for start in range(0, len(employee_ids), INDEX_BATCH_SIZE):
+                batch = employee_ids[start:start + INDEX_BATCH_SIZE]
+                cursor.execute(
+                    f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({", ".join(["%s"] * len(batch))})',
+                    batch
+                )
+
+    def rebuild(self):
+        from .models import Employee
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        self.index_employees(Employee.objects.select_related('department').iterator(chunk_size=2000))
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Поиск средствами PostgreSQL: tsvector сотрудника с русской морфологией
+    и префиксами хранится в отдельной таблице employees_employee_search
+    (индекс GIN), как документы FTS5 на SQLite, и дополняется триграммным
+    сходством слов ФИО для опечаток (оператор %>, индекс gin_trgm_ops).
+    Порог сходства задаётся параметром pg_trgm.word_similarity_threshold
+    (см. settings.DB_TRIGRAM_THRESHOLD).
+    """
+    config = 'russian'
+    fallback = SimpleSearchBackend()
+
+    # Документ сотрудника; department — подразделение, присоединённое слева
+    DOCUMENT_SQL = (
+        "to_tsvector(%s::regconfig, concat_ws(' ', employee.full_name, employee.position, department.name, "
+        "department.short_name, employee.phone, employee.internal_phone, employee.email))"
+    )
+    QUERY_SQL = 'to_tsquery(%s::regconfig, %s)'
+
+    def get_query(self, words):
+        return ' & '.join(f'{word}:*' for word in words)
+
+    def matching_ids_sql(self, words, query):
+        """Идентификаторы найденных сотрудников: по tsvector и по сходству ФИО (оба по индексам)"""
+        sql = (
+            f'SELECT employee_id FROM {PG_SEARCH_TABLE} WHERE document @@ {self.QUERY_SQL} '
+            f'UNION SELECT id FROM employees_employee WHERE full_name %%> %s'
+        )
+        return sql, [self.config, self.get_query(words), query]
+
+    def search(self, queryset, query):
+        words = tokenize(query)
+        if not words:
+            return self.fallback.search(queryset, query)
+        return queryset.filter(pk__in=RawSQL(*self.matching_ids_sql(words, query)))
+
+    def search_ranked(self, queryset, query, limit):
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        words = tokenize(query)
+        if not words:
+            return self.fallback.search_ranked(queryset, query, limit)
+
+        table = queryset.model._meta.db_table
+        rank = RawSQL(
+            f'SELECT ts_rank(document, {self.QUERY_SQL}) FROM {PG_SEARCH_TABLE} '
+            f'WHERE employee_id = {connection.ops.quote_name(table)}.id',
+            [self.config, self.get_query(words)], output_field=models.FloatField()
+        )
+        queryset = self.search(queryset, query).annotate(
+            rank=models.functions.Coalesce(rank, 0.0),
+            name_similarity=TrigramWordSimilarity(query, 'full_name'),
+        )
+        return list(queryset.order_by('-rank', '-name_similarity')[:limit])
+
+    def write_documents(self, condition, params):
+        """Записывает документы сотрудников, отобранных условием condition"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {PG_SEARCH_TABLE} (employee_id, document) '
+                f'SELECT employee.id, {self.DOCUMENT_SQL} FROM employees_employee AS employee '
+                f'LEFT JOIN employees_department AS department ON department.id = employee.department_id '
+                f'WHERE {condition} '
+                f'ON CONFLICT (employee_id) DO UPDATE SET document = EXCLUDED.document',
+                [self.config, *params]
+            )
+
+    def index_employees(self, employees):
+        if isinstance(employees, models.QuerySet):
+            # Обновление одним запросом, без загрузки сотрудников в память
+            sql, params = employees.order_by().values('pk').query.sql_with_params()
+            self.write_documents(f'employee.id IN ({sql})', params)
+            return
+        employee_ids = [employee.pk for employee in employees]
+        for start in range(0, len(employee_ids), INDEX_BATCH_SIZE):
+            self.write_documents('employee.id = ANY(%s)', [employee_ids[start:start + INDEX_BATCH_SIZE]])
+
+    def remove_employees(self, employee_ids):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {PG_SEARCH_TABLE} WHERE employee_id = ANY(%s)', [list(employee_ids)])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {PG_SEARCH_TABLE}')
+        self.write_documents('TRUE', [])
+
+
+def fts_table_exists():
+    """Проверяет наличие таблицы FTS5 в базе данных"""
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+# Выбранные бэкенды по типу базы данных и настройке EMPLOYEES_SEARCH_BACKEND
+_backends = {}
+
+
+def get_search_backend():
+    """Возвращает бэкенд поиска согласно настройкам или типу базы данных"""
+    backend_path = getattr(settings, 'EMPLOYEES_SEARCH_BACKEND', None)
+    key = (connection.vendor, backend_path)
+    if key in _backends:
+        return _backends[key]
+    if backend_path:
+        backend = import_string(backend_path)()
+    elif connection.vendor == 'postgresql':
+        backend = PostgresSearchBackend()
+    elif connection.vendor == 'sqlite' and fts_table_exists():
+        backend = SQLiteFTSSearchBackend()
+    else:
+        # Таблица FTS5 может появиться после миграции, поэтому простой поиск не запоминается
+        return SimpleSearchBackend()
+    _backends[key] = backend
+    return backend
+
+
+def reset_search_backends(setting, **kwargs):
+    """Сбрасывает выбранные бэкенды при изменении настроек (override_settings)"""
+    if setting in ('EMPLOYEES_SEARCH_BACKEND', 'DATABASES'):
+        _backends.clear()
+
+
+setting_changed.connect(reset_search_backends)
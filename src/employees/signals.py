@@ -0,0 +1,157 @@
+"""
+Обработчики сигналов моделей справочника
+
+Поисковый индекс и индекс автодополнения обновляются одинаково — после
+фиксации транзакции (transaction.on_commit): откат изменений не оставляет
+в индексах записей, которых нет в базе.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .autocomplete import autocomplete_index
+from .changefeed import record_change, record_changes
+from .counters import (
+    add_department_counters, adjust_employee_counters, move_employee_counters, schedule_counter_rebuild,
+)
+from .models import Department, Employee
+from .search import get_search_backend
+from .versioning import bump_directory_version
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def bump_version(sender, **kwargs):
+    """Увеличивает версию справочника, делая закэшированные ответы неактуальными"""
+    bump_directory_version()
+
+
+@receiver(post_save, sender=Employee)
+def index_employee(sender, instance, **kwargs):
+    """Обновляет сотрудника в поисковом индексе после фиксации изменений"""
+    transaction.on_commit(lambda: get_search_backend().index_employees([instance]))
+
+
+@receiver(post_delete, sender=Employee)
+def unindex_employee(sender, instance, **kwargs):
+    """Удаляет сотрудника из поискового индекса после фиксации изменений"""
+    employee_id = instance.pk
+    transaction.on_commit(lambda: get_search_backend().remove_employees([employee_id]))
+
+
+@receiver(post_save, sender=Employee)
+def update_autocomplete(sender, instance, **kwargs):
+    """Обновляет сотрудника в индексе автодополнения после фиксации изменений"""
+    transaction.on_commit(lambda: autocomplete_index.update_employee(instance))
+
+
+@receiver(post_delete, sender=Employee)
+def remove_from_autocomplete(sender, instance, **kwargs):
+    """Удаляет сотрудника из индекса автодополнения после фиксации изменений"""
+    employee_id = instance.pk
+    transaction.on_commit(lambda: autocomplete_index.remove_employee(employee_id))
+
+
+@receiver(post_save, sender=Department)
+def reindex_department_employees(sender, instance, created, **kwargs):
+    """Переиндексирует сотрудников подразделения после изменения его названия"""
+    if not created:
+        department_id = instance.pk
+        transaction.on_commit(lambda: get_search_backend().index_employees(
+            Employee.objects.filter(department_id=department_id).select_related('department')
+        ))
+
+
+@receiver(pre_delete, sender=Department)
+def remember_department_employees(sender, instance, **kwargs):
+    """Запоминает сотрудников удаляемого подразделения для переиндексации"""
+    instance._employee_ids = list(instance.employee_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Department)
+def reindex_detached_employees(sender, instance, **kwargs):
+    """Переиндексирует сотрудников, оставшихся без подразделения, после фиксации"""
+    employee_ids = getattr(instance, '_employee_ids', None)
+    if employee_ids:
+        transaction.on_commit(lambda: get_search_backend().index_employees(
+            Employee.objects.filter(pk__in=employee_ids).select_related('department')
+        ))
+
+
+@receiver(post_delete, sender=Department)
+def clear_detached_employee_fields(sender, instance, **kwargs):
+    """
+    Сбрасывает продублированные поля подразделения у оставшихся без него
+    сотрудников и отмечает их изменёнными: department уже обнулён запросом
+    SET_NULL, который updated_at не трогает, а по нему строятся валидаторы
+    карточки (details.py)
+    """
+    employee_ids = getattr(instance, '_employee_ids', None)
+    if employee_ids:
+        Employee.objects.filter(pk__in=employee_ids).update(department_level=None, department_name=None,
+                                                            updated_at=timezone.now())
+
+
+@receiver(pre_save, sender=Employee)
+def remember_employee_department(sender, instance, **kwargs):
+    """Запоминает прежнее подразделение сотрудника для обновления счётчиков"""
+    instance._old_department_id = None
+    if instance.pk is not None and not instance._state.adding:
+        instance._old_department_id = (Employee.objects.filter(pk=instance.pk)
+                                       .values_list('department_id', flat=True).first())
+
+
+@receiver(post_save, sender=Employee)
+def update_employee_counters(sender, instance, created, **kwargs):
+    """Обновляет счётчики сотрудников подразделений"""
+    if created:
+        adjust_employee_counters(instance.department_id, 1)
+    else:
+        move_employee_counters(getattr(instance, '_old_department_id', None), instance.department_id)
+
+
+@receiver(post_delete, sender=Employee)
+def decrease_employee_counters(sender, instance, **kwargs):
+    """Уменьшает счётчики подразделения удалённого сотрудника"""
+    adjust_employee_counters(instance.department_id, -1)
+
+
+@receiver(post_save, sender=Department)
+def update_department_counters(sender, instance, created, **kwargs):
+    """Учитывает новое подразделение; после перемещения пересчитывает счётчики"""
+    if created:
+        add_department_counters(instance.parent_id)
+    elif getattr(instance, '_moved', False):
+        # Потомки получают новые пути уже после сигнала, поэтому пересчёт
+        # выполняется после фиксации транзакции
+        schedule_counter_rebuild()
+
+
+@receiver(post_delete, sender=Department)
+def rebuild_counters_after_delete(sender, instance, **kwargs):
+    """Пересчитывает счётчики после удаления подразделения"""
+    schedule_counter_rebuild()
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_save, sender=Department)
+def log_saved_object(sender, instance, created, **kwargs):
+    """Записывает добавление или изменение в журнал изменений"""
+    record_change(instance, 'insert' if created else 'update')
+    if getattr(instance, '_rebased', False):
+        # Перемещение или переименование меняет пути всех потомков
+        record_changes('department', instance.get_descendants().values_list('pk', flat=True), 'update')
+
+
+@receiver(post_delete, sender=Employee)
+@receiver(post_delete, sender=Department)
+def log_deleted_object(sender, instance, **kwargs):
+    """Записывает удаление в журнал изменений"""
+    record_change(instance, 'delete')
+    employee_ids = getattr(instance, '_employee_ids', None)
+    if employee_ids:
+        # Сотрудники удалённого подразделения остались без подразделения
+        record_changes('employee', employee_ids, 'update')
@@ -0,0 +1,187 @@
+"""
+Синтетические данные для нагрузочных проверок
+
+Генератор строит правдоподобную оргструктуру (центры, управления, отделы,
+секторы) и строки файла импорта с теми же столбцами, что и настоящий
+справочник. generate_org_rows задаёт организацию явно: количество и
+глубину подразделений и число сотрудников в каждом (для замеров на
+разных объёмах, см. команду benchmark_suite). Результат детерминирован
+при одинаковом seed.
+"""
+import csv
+import random
+
+from openpyxl import Workbook
+
+from .importer import DEPARTMENT_COLUMNS, EmployeeImporter
+
+IMPORT_COLUMNS = [
+    'Инициалы', 'ФИО', 'Должность', *DEPARTMENT_COLUMNS,
+    'Телефон', 'Внутренний телефон', 'Кабинет', 'Уровень', 'Email',
+]
+
+LAST_NAMES = [
+    'Иванов', 'Петров', 'Сидоров', 'Кузнецов', 'Смирнов', 'Попов', 'Васильев', 'Соколов',
+    'Михайлов', 'Новиков', 'Фёдоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев', 'Семёнов',
+    'Егоров', 'Павлов', 'Козлов', 'Степанов', 'Николаев', 'Орлов', 'Андреев', 'Макаров',
+]
+FIRST_NAMES = [
+    ('Александр', 'А.'), ('Дмитрий', 'Д.'), ('Сергей', 'С.'), ('Андрей', 'А.'), ('Алексей', 'А.'),
+    ('Мария', 'М.'), ('Елена', 'Е.'), ('Ольга', 'О.'), ('Наталья', 'Н.'), ('Ирина', 'И.'),
+]
+PATRONYMICS = [
+    ('Иванович', 'И.'), ('Петрович', 'П.'), ('Сергеевич', 'С.'), ('Андреевич', 'А.'),
+    ('Викторович', 'В.'), ('Николаевич', 'Н.'), ('Олегович', 'О.'), ('Юрьевич', 'Ю.'),
+]
+POSITIONS = [
+    'Специалист', 'Ведущий специалист', 'Главный специалист', 'Эксперт', 'Ведущий эксперт',
+    'Аналитик', 'Инженер', 'Ведущий инженер', 'Секретарь', 'Помощник руководителя',
+    'Начальник отдела', 'Заместитель начальника отдела', 'Руководитель службы',
+    'Начальник управления', 'Заместитель начальника управления', 'Руководитель центра',
+]
+CENTER_NAMES = ['Центр', 'Департамент', 'Дирекция']
+UNIT_NAMES = ['Управление', 'Служба']
+DIVISION_NAMES = ['Отдел', 'Отделение']
+SECTOR_NAMES = ['Сектор', 'Группа']
+LEVEL_NAMES = [CENTER_NAMES, UNIT_NAMES, DIVISION_NAMES, SECTOR_NAMES]
+TOPICS = [
+    'информационных технологий', 'финансов', 'закупок', 'кадров', 'правового обеспечения',
+    'безопасности', 'эксплуатации', 'планирования', 'аналитики', 'развития', 'снабжения',
+    'документооборота', 'внутреннего контроля', 'связи', 'капитального строительства',
+]
+
+
+def make_short_name(name):
+    """Аббревиатура названия: «Отдел финансов» → «ОФ»"""
+    return ''.join(word[0].upper() for word in name.split() if len(word) > 2)
+
+
+def make_department_name(rng, kinds, number):
+    name = f'{rng.choice(kinds)} {rng.choice(TOPICS)} {number}'
+    if rng.random() < 0.5:
+        name = f'{name} ({make_short_name(name)})'
+    return name
+
+
+def generate_departments(rng, centers=12, units=4, divisions=4, sectors=2):
+    """Возвращает список цепочек подразделений (до четырёх уровней)"""
+    chains = []
+    levels = list(zip(LEVEL_NAMES, [centers, units, divisions, sectors]))
+
+    def build(prefix, depth):
+        kinds, count = levels[depth]
+        for number in range(1, count + 1):
+            chain = prefix + [make_department_name(rng, kinds, number)]
+            chains.append(chain)
+            if depth + 1 < len(levels):
+                build(chain, depth + 1)
+
+    build([], 0)
+    return chains
+
+
+def generate_department_chains(rng, count, depth=4):
+    """
+    Возвращает count цепочек подразделений глубиной до depth уровней
+    (не больше числа столбцов подразделений в файле импорта). Дерево
+    заполняется по уровням с одинаковым ветвлением, поэтому верхние
+    уровни всегда полные.
+    """
+    depth = max(1, min(depth, len(DEPARTMENT_COLUMNS)))
+    branching = 1
+    while sum(branching ** level for level in range(1, depth + 1)) < count:
+        branching += 1
+
+    chains = []
+    parents = [[]]
+    for level in range(depth):
+        kinds = LEVEL_NAMES[min(level, len(LEVEL_NAMES) - 1)]
+        children = []
+        for prefix in parents:
+            for number in range(1, branching + 1):
+                if len(chains) >= count:
+                    return chains
+                chain = prefix + [make_department_name(rng, kinds, number)]
+                chains.append(chain)
+                children.append(chain)
+        parents = children
+    return chains
+
+
+def generate_person(rng):
+    """Возвращает ФИО и инициалы вида «Иванова Е.С.»"""
+    last_name = rng.choice(LAST_NAMES)
+    first_name, first_initial = rng.choice(FIRST_NAMES)
+    patronymic, patronymic_initial = rng.choice(PATRONYMICS)
+    if first_name.endswith('а') or first_name.endswith('я'):
+        last_name += 'а'
+        patronymic = patronymic[:-2] + 'на'
+    return f'{last_name} {first_name} {patronymic}', f'{last_name} {first_initial}{patronymic_initial}'
+
+
+def make_import_row(rng, index, person, chain, internal_phone):
+    """Строка файла импорта для сотрудника подразделения chain"""
+    full_name, initials = person
+    row = {
+        'Инициалы': initials,
+        'ФИО': full_name,
+        'Должность': rng.choice(POSITIONS),
+        'Телефон': f'+7 (495) {rng.randint(100, 999)}-{rng.randint(10, 99)}-{rng.randint(10, 99)}',
+        'Внутренний телефон': internal_phone,
+        'Кабинет': str(rng.randint(100, 999)) if rng.random() < 0.8 else '',
+        'Уровень': str(rng.randint(1, 8)) if rng.random() < 0.2 else '',
+        'Email': f'user{index}@example.com' if rng.random() < 0.7 else '',
+    }
+    for col_name, name in zip(DEPARTMENT_COLUMNS, chain + [''] * len(DEPARTMENT_COLUMNS)):
+        row[col_name] = name
+    return row
+
+
+def generate_import_rows(count, seed=0):
+    """Возвращает count строк файла импорта (словари по названиям столбцов)"""
+    rng = random.Random(seed)
+    departments = generate_departments(rng)
+    rows = []
+    for index in range(count):
+        person = generate_person(rng)
+        chain = rng.choice(departments)
+        rows.append(make_import_row(rng, index, person, chain, str(1000 + index % 9000)))
+    return rows
+
+
+def generate_org_rows(departments=500, depth=4, employees_per_department=20, seed=0):
+    """
+    Возвращает строки файла импорта для организации из departments
+    подразделений глубиной до depth уровней с employees_per_department
+    сотрудниками в каждом. Внутренние телефоны уникальны, поэтому каждая
+    строка — отдельный сотрудник.
+    """
+    rng = random.Random(seed)
+    rows = []
+    for chain in generate_department_chains(rng, departments, depth):
+        for _ in range(employees_per_department):
+            index = len(rows)
+            rows.append(make_import_row(rng, index, generate_person(rng), chain, str(10000 + index)))
+    return rows
+
+
+def import_rows(rows):
+    """Загружает строки в базу тем же импортом, что и файлы справочника"""
+    return EmployeeImporter(expected_total=len(rows)).run(enumerate(rows, start=2))
+
+
+def write_import_file(path, rows):
+    """Записывает строки в файл импорта; формат определяется расширением"""
+    if str(path).lower().endswith('.csv'):
+        with open(path, 'w', encoding='utf-8-sig', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=IMPORT_COLUMNS, delimiter=';')
+            writer.writeheader()
+            writer.writerows(rows)
+        return
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(IMPORT_COLUMNS)
+    for row in rows:
+        sheet.append([row[col_name] for col_name in IMPORT_COLUMNS])
+    workbook.save(path)
@@ -0,0 +1,98 @@
+"""
+Шаблонный тег дерева подразделений
+
+Дерево выводится без рекурсивных {% include %}: узлы обходятся в прямом
+порядке по явному стеку, а заголовок каждого узла рендерится одним заранее
+загруженным шаблоном в общем контексте. HTML каждого поддерева кэшируется
+под ключом с отпечатком его содержимого (названия, уровни и счётчики всех
+вложенных узлов). После изменения справочника заново рендерятся только
+изменившиеся ветви, остальные вставляются из кэша. Листья не кэшируются:
+их вывод стоит столько же, сколько чтение из кэша.
+"""
+import hashlib
+
+from django import template
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+NODE_TEMPLATE = 'employees/department_node.html'
+SUBTREE_CACHE_KEY = 'employees:tree_html:{pk}:{digest}'
+SUBTREE_CACHE_TIMEOUT = 60 * 60 * 24
+
+NODE_OPEN = '<div class="department-node">'
+CHILDREN_OPEN = '<div class="department-children">'
+CLOSE = '</div>'
+
+
+def flatten_tree(tree):
+    """Возвращает узлы дерева в прямом порядке обхода"""
+    nodes = []
+    stack = list(reversed(tree))
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(reversed(node['children']))
+    return nodes
+
+
+def subtree_digests(nodes):
+    """
+    Возвращает отпечатки поддеревьев по id подразделения. В обратном прямом
+    порядке потомки идут раньше предков, поэтому хватает одного прохода.
+    """
+    digests = {}
+    for node in reversed(nodes):
+        department = node['department']
+        parts = [department.pk, department.name, department.short_name, department.level, node['total_count']]
+        parts.extend(digests[child['department'].pk] for child in node['children'])
+        digests[department.pk] = hashlib.md5('\x1f'.join(map(str, parts)).encode()).hexdigest()
+    return digests
+
+
+@register.simple_tag
+def department_tree(tree):
+    """Выводит дерево подразделений (результат get_departments_tree)"""
+    nodes = flatten_tree(tree)
+    digests = subtree_digests(nodes)
+    keys = {}
+    for node in nodes:
+        if node['children']:
+            pk = node['department'].pk
+            keys[pk] = SUBTREE_CACHE_KEY.format(pk=pk, digest=digests[pk])
+    cached = cache.get_many(keys.values())
+    node_template = get_template(NODE_TEMPLATE).template
+    context = template.Context()
+
+    parts = []
+    rendered = {}
+    # Элементы стека: (узел, None) — вывести узел, (узел, начало) — закрыть его
+    stack = [(node, None) for node in reversed(tree)]
+    while stack:
+        node, start = stack.pop()
+        key = keys.get(node['department'].pk)
+        if start is not None:
+            parts.append(CLOSE * 2)
+            rendered[key] = ''.join(parts[start:])
+            continue
+
+        if key in cached:
+            parts.append(cached[key])
+            continue
+
+        start = len(parts)
+        parts.append(NODE_OPEN)
+        with context.push(dept_data=node):
+            parts.append(node_template.render(context))
+        if not node['children']:
+            parts.append(CLOSE)
+            continue
+        parts.append(CHILDREN_OPEN)
+        stack.append((node, start))
+        stack.extend((child, None) for child in reversed(node['children']))
+
+    if rendered:
+        cache.set_many(rendered, SUBTREE_CACHE_TIMEOUT)
+    return mark_safe(''.join(parts))
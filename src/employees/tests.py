@@ -1,3 +1,425 @@
-from django.test import TestCase
+import csv
+import io
+import threading
+from unittest import mock, skipUnless
 
-# Create your tests here.
\ No newline at end of file
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from .autocomplete import AutocompleteIndex
+from .changefeed import get_changes, parse_cursor
+from .counters import rebuild_department_counters
+from .importer import import_file
+from .models import Department, DirectoryChange, Employee
+from .versioning import get_directory_version
+
+IMPORT_COLUMNS = [
+    'Инициалы', 'ФИО', 'Должность', 'Структурное подразделение 1', 'Структурное подразделение 2',
+    'Структурное подразделение 3', 'Структурное подразделение 4', 'Телефон', 'Внутренний телефон',
+    'Кабинет', 'Уровень',
+]
+
+
+def create_employee(department, full_name, **fields):
+    values = {'initials': full_name[:8], 'position': 'Специалист', 'phone': '+7 (495) 123-45-67',
+              'internal_phone': '101', **fields}
+    return Employee.objects.create(department=department, full_name=full_name, **values)
+
+
+class DepartmentPathTests(TestCase):
+    """
+    Материализованный путь: выборка поддерева, перенос потомков при
+    перемещении и запрет циклов
+    """
+
+    def setUp(self):
+        self.root = Department.objects.create(name='Дирекция')
+        self.child = Department.objects.create(name='Управление', parent=self.root)
+        self.grandchild = Department.objects.create(name='Отдел', parent=self.child)
+        self.other = Department.objects.create(name='Филиал')
+
+    def refresh(self, *departments):
+        for department in departments:
+            department.refresh_from_db()
+
+    def test_subtree_queries(self):
+        self.refresh(self.root, self.child, self.grandchild)
+        self.assertTrue(self.grandchild.path.startswith(self.child.path))
+        self.assertEqual(self.grandchild.level, 3)
+        self.assertEqual(self.grandchild.full_path, 'Дирекция → Управление → Отдел')
+        self.assertEqual(set(self.root.get_descendants()), {self.child, self.grandchild})
+        self.assertEqual(set(self.root.get_descendants(include_self=True)),
+                         {self.root, self.child, self.grandchild})
+        self.assertEqual(list(self.grandchild.get_ancestors()), [self.root, self.child])
+        self.assertEqual(set(self.other.get_descendants()), set())
+
+    def test_move_rebases_descendants(self):
+        employee = create_employee(self.grandchild, 'Иванов Иван Иванович')
+        self.child.refresh_from_db()
+        self.child.parent = self.other
+        self.child.name = 'Служба'
+        self.child.save()
+
+        self.refresh(self.other, self.grandchild)
+        self.assertTrue(self.grandchild.path.startswith(self.other.path))
+        self.assertEqual(self.grandchild.level, 3)
+        self.assertEqual(self.grandchild.full_path, 'Филиал → Служба → Отдел')
+        self.assertEqual(set(self.root.get_descendants()), set())
+        self.assertEqual(set(self.other.get_descendants()), {self.child, self.grandchild})
+
+        # Перенос в корень меняет уровни всего поддерева и у сотрудников
+        self.child.parent = None
+        self.child.save()
+        self.refresh(self.grandchild)
+        employee.refresh_from_db()
+        self.assertEqual(self.grandchild.level, 2)
+        self.assertEqual(self.grandchild.full_path, 'Служба → Отдел')
+        self.assertEqual(employee.department_level, 2)
+
+    def test_cycle_is_rejected(self):
+        self.root.refresh_from_db()
+        self.root.parent = self.grandchild
+        with self.assertRaises(ValidationError):
+            self.root.full_clean()
+        with self.assertRaises(ValidationError):
+            self.root.save()
+
+        self.child.refresh_from_db()
+        self.child.parent = self.child
+        with self.assertRaises(ValidationError):
+            self.child.save()
+
+
+class DepartmentCounterTests(TransactionTestCase):
+    """
+    Счётчики сотрудников и вложенных подразделений после создания,
+    перевода и удаления (пересчёт выполняется после фиксации транзакции)
+    """
+
+    def setUp(self):
+        self.root = Department.objects.create(name='Дирекция')
+        self.child = Department.objects.create(name='Управление', parent=self.root)
+        self.other = Department.objects.create(name='Филиал')
+
+    def assertCounters(self, department, direct, subtree, descendants):
+        department.refresh_from_db()
+        self.assertEqual(
+            [getattr(department, field) for field in Department.COUNTER_FIELDS],
+            [direct, subtree, descendants],
+            department.name,
+        )
+
+    def assertCountersConsistent(self):
+        # Полный пересчёт не должен найти расхождений с приращениями
+        self.assertEqual(rebuild_department_counters(), 0)
+
+    def test_employee_changes(self):
+        first = create_employee(self.child, 'Иванов Иван Иванович')
+        create_employee(self.root, 'Петров Пётр Петрович', internal_phone='102')
+        self.assertCounters(self.root, 1, 2, 1)
+        self.assertCounters(self.child, 1, 1, 0)
+
+        first.department = self.other
+        first.save()
+        self.assertCounters(self.root, 1, 1, 1)
+        self.assertCounters(self.child, 0, 0, 0)
+        self.assertCounters(self.other, 1, 1, 0)
+
+        first.delete()
+        self.assertCounters(self.other, 0, 0, 0)
+        self.assertCountersConsistent()
+
+    def test_department_changes(self):
+        grandchild = Department.objects.create(name='Отдел', parent=self.child)
+        create_employee(grandchild, 'Иванов Иван Иванович')
+        create_employee(self.child, 'Петров Пётр Петрович', internal_phone='102')
+        self.assertCounters(self.root, 0, 2, 2)
+        self.assertCounters(self.child, 1, 2, 1)
+
+        self.child.refresh_from_db()
+        self.child.parent = self.other
+        self.child.save()
+        self.assertCounters(self.root, 0, 0, 0)
+        self.assertCounters(self.other, 0, 2, 2)
+
+        # Сотрудники удалённого поддерева остаются без подразделения
+        self.child.delete()
+        self.assertCounters(self.other, 0, 0, 0)
+        self.assertEqual(Employee.objects.filter(department__isnull=True).count(), 2)
+        self.assertCountersConsistent()
+
+
+class ImporterTests(TestCase):
+    """
+    Счётчики импорта при первой загрузке и повторной загрузке того же файла
+    """
+
+    ROWS = [
+        ['ИИИ', 'Иванов Иван Иванович', 'Начальник отдела', 'Дирекция', 'Отдел кадров (ОК)', '', '',
+         '+7 (495) 111-11-11', '101', '201', '3'],
+        ['ППП', 'Петров Пётр Петрович', 'Специалист', 'Дирекция', 'Отдел кадров (ОК)', '', '',
+         '+7 (495) 111-11-12', '102', '202', ''],
+        ['СИИ', 'Сидоров Илья Ильич', 'Аналитик', 'Филиал', '', '', '', '', '103', '', ''],
+        # Повтор ключа (ФИО, внутренний телефон) в файле считается обновлением
+        ['ППП', 'Петров Пётр Петрович', 'Ведущий специалист', 'Дирекция', 'Отдел кадров (ОК)', '', '',
+         '+7 (495) 111-11-12', '102', '202', ''],
+    ]
+
+    def import_rows(self, rows):
+        output = io.StringIO()
+        writer = csv.writer(output, delimiter=';')
+        writer.writerow(IMPORT_COLUMNS)
+        writer.writerows(rows)
+        return import_file(ContentFile(output.getvalue().encode('utf-8'), name='staff.csv'))
+
+    def counters(self, result):
+        return {key: result[key] for key in ('status', 'total', 'added', 'updated', 'unchanged')}
+
+    def test_first_import(self):
+        result = self.import_rows(self.ROWS)
+        self.assertEqual(self.counters(result),
+                         {'status': 'success', 'total': 4, 'added': 3, 'updated': 1, 'unchanged': 0})
+        self.assertEqual(Employee.objects.count(), 3)
+        employee = Employee.objects.get(full_name='Петров Пётр Петрович')
+        self.assertEqual(employee.position, 'Ведущий специалист')
+        self.assertEqual(employee.department.full_path, 'Дирекция → Отдел кадров')
+        self.assertEqual(employee.department.short_name, 'ОК')
+
+        directorate = Department.objects.get(name='Дирекция')
+        self.assertEqual(directorate.subtree_employee_count, 2)
+        self.assertEqual(directorate.descendant_count, 1)
+
+    def test_reimport(self):
+        self.import_rows(self.ROWS)
+
+        # Как и раньше, updated — все найденные строки; unchanged — сотрудники без изменений
+        result = self.import_rows(self.ROWS)
+        self.assertEqual(self.counters(result),
+                         {'status': 'success', 'total': 4, 'added': 0, 'updated': 4, 'unchanged': 3})
+
+        rows = [list(row) for row in self.ROWS[:3]]
+        rows[2][2] = 'Ведущий аналитик'
+        result = self.import_rows(rows)
+        self.assertEqual(self.counters(result),
+                         {'status': 'success', 'total': 3, 'added': 0, 'updated': 3, 'unchanged': 1})
+        self.assertEqual(Employee.objects.count(), 3)
+        self.assertEqual(Employee.objects.get(full_name='Сидоров Илья Ильич').position, 'Ведущий аналитик')
+
+    def test_row_errors(self):
+        rows = [*self.ROWS[:1], ['', '', 'Специалист', 'Дирекция', '', '', '', '', '104', '', '']]
+        result = self.import_rows(rows)
+        self.assertEqual(result['status'], 'partial')
+        self.assertEqual((result['added'], result['updated']), (1, 0))
+        self.assertEqual(result['errors'], ['Строка 3: Отсутствует ФИО'])
+
+
+class ChangeFeedTests(TransactionTestCase):
+    """
+    Курсор и постраничная выдача журнала изменений (на PostgreSQL лента
+    отдаёт только зафиксированные транзакции)
+    """
+
+    def setUp(self):
+        self.department = Department.objects.create(name='Дирекция')
+        self.employees = [
+            create_employee(self.department, f'Сотрудник {number}', internal_phone=str(number))
+            for number in range(1, 5)
+        ]
+
+    def test_parse_cursor(self):
+        self.assertEqual(parse_cursor(''), (0, 0))
+        self.assertEqual(parse_cursor('0:15'), (0, 15))
+        self.assertEqual(parse_cursor('15'), (0, 15))
+        with self.assertRaises(ValueError):
+            parse_cursor('abc')
+
+    def test_paging(self):
+        received = []
+        since = parse_cursor('')
+        while True:
+            page = get_changes(since, limit=2)
+            self.assertLessEqual(len(page['changes']), 2)
+            received.extend((change['type'], change['id'], change['action']) for change in page['changes'])
+            since = parse_cursor(page['version'])
+            if not page['has_more']:
+                break
+
+        expected = [('department', self.department.pk, 'insert')]
+        expected += [('employee', employee.pk, 'insert') for employee in self.employees]
+        self.assertEqual(received, expected)
+        self.assertEqual(since[1], DirectoryChange.objects.latest('id').pk)
+
+        # Пустая страница возвращает тот же курсор
+        page = get_changes(since)
+        self.assertEqual((page['changes'], page['has_more']), ([], False))
+        self.assertEqual(parse_cursor(page['version']), since)
+
+    def test_latest_action_per_object(self):
+        since = parse_cursor(get_changes()['version'])
+        employee, deleted = self.employees[:2]
+        deleted_id = deleted.pk
+        employee.position = 'Аналитик'
+        employee.save()
+        deleted.delete()
+
+        changes = get_changes(since)['changes']
+        self.assertEqual(len(changes), 2)
+        self.assertEqual(changes[0]['action'], 'update')
+        self.assertEqual(changes[0]['data']['position'], 'Аналитик')
+        self.assertEqual(changes[1], {'change': changes[1]['change'], 'type': 'employee',
+                                      'id': deleted_id, 'action': 'delete'})
+
+    def test_api(self):
+        url = reverse('directory_changes_api')
+        response = self.client.get(url, {'since': '0:0', 'limit': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['changes']), 3)
+        self.assertTrue(response.json()['has_more'])
+
+        response = self.client.get(url, {'since': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+
+class ConditionalResponseTests(TransactionTestCase):
+    """
+    ETag и 304 для списка, поиска и карточки сотрудника; после изменения
+    справочника (версия увеличивается при фиксации) ETag меняется
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.department = Department.objects.create(name='Дирекция')
+        self.employee = create_employee(self.department, 'Иванов Иван Иванович')
+
+    def assertNotModifiedUntilEdit(self, url, edit):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        edit()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response
+
+    def rename_employee(self):
+        self.employee.full_name = 'Иванова Анна Ивановна'
+        self.employee.save()
+
+    def test_list(self):
+        self.assertNotModifiedUntilEdit(reverse('employee_list'), self.rename_employee)
+
+    def test_search_api(self):
+        url = f"{reverse('employee_search_api')}?query=Иванов"
+        response = self.assertNotModifiedUntilEdit(url, self.rename_employee)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_card_after_department_delete(self):
+        url = reverse('employee_detail_api', args=[self.employee.pk])
+        response = self.assertNotModifiedUntilEdit(url, self.department.delete)
+        self.assertEqual(response.json()['department'], 'Не указано')
+
+
+class AutocompleteTests(TransactionTestCase):
+    """
+    Индекс автодополнения отражает изменения сотрудников без полной
+    перестройки
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.index = AutocompleteIndex()
+        for target in ('employees.signals.autocomplete_index', 'employees.views.autocomplete_index'):
+            patcher = mock.patch(target, self.index)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.department = Department.objects.create(name='Отдел кадров', short_name='ОК')
+        self.employee = create_employee(self.department, 'Иванов Иван Иванович')
+
+    def names(self, query):
+        return [result['full_name'] for result in self.index.search(query)]
+
+    def test_results_after_edit(self):
+        self.assertEqual(self.names('ивано'), ['Иванов Иван Иванович'])
+        self.assertEqual(self.names('ghbdtn'), [])
+
+        self.employee.full_name = 'Смирнова Анна Петровна'
+        self.employee.save()
+        create_employee(self.department, 'Иванов Пётр Сергеевич', internal_phone='102')
+        # Изменения применены к индексу приращениями, версия совпадает
+        self.assertEqual(self.index.version, get_directory_version())
+
+        self.assertEqual(self.names('смирн'), ['Смирнова Анна Петровна'])
+        self.assertEqual(self.names('ivanov'), ['Иванов Пётр Сергеевич'])
+        self.assertEqual(self.names('Cvbhyjdf'), ['Смирнова Анна Петровна'])
+
+        response = self.client.get(reverse('employee_search_api'), {'query': 'Смирнова'})
+        self.assertEqual([result['id'] for result in response.json()['results']], [self.employee.pk])
+
+        self.employee.delete()
+        self.assertEqual(self.names('смирн'), [])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'порядок фиксации проверяется только на PostgreSQL')
+class ChangeFeedCommitOrderTests(TransactionTestCase):
+    """
+    Запись, вставленная раньше, но зафиксированная позже, не должна
+    оказаться позади курсора клиента
+    """
+
+    def record(self, object_id):
+        return DirectoryChange.objects.create(object_type='employee', object_id=object_id, action='update')
+
+    def test_slow_transaction_is_not_skipped(self):
+        since = parse_cursor('')
+        inserted = threading.Event()
+        release = threading.Event()
+        slow = {}
+
+        def slow_writer():
+            try:
+                with transaction.atomic():
+                    slow['change'] = self.record(1)
+                    inserted.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=slow_writer)
+        thread.start()
+        try:
+            self.assertTrue(inserted.wait(10))
+            with transaction.atomic():
+                fast = self.record(2)
+            self.assertLess(slow['change'].pk, fast.pk)
+
+            # Медленная транзакция ещё выполняется: курсор не двигается
+            page = get_changes(since)
+            self.assertEqual(page['changes'], [])
+            self.assertEqual(page['version'], '0:0')
+        finally:
+            release.set()
+            thread.join()
+
+        page = get_changes(parse_cursor(page['version']))
+        self.assertEqual([change['id'] for change in page['changes']], [1, 2])
+        self.assertEqual(get_changes(parse_cursor(page['version']))['changes'], [])
+
+    def test_legacy_integer_cursor(self):
+        # Записи, существовавшие до миграции, имеют нулевую транзакцию
+        first = self.record(1)
+        self.record(2)
+        DirectoryChange.objects.update(transaction_id=0)
+        self.record(3)
+
+        page = get_changes(parse_cursor(str(first.pk)))
+        self.assertEqual([change['id'] for change in page['changes']], [2, 3])
@@ -0,0 +1,57 @@
+"""
+Построение дерева подразделений для страницы справочника
+
+Дерево собирается в памяти одним запросом: количество сотрудников берётся
+из счётчиков подразделений (см. counters.py). Дерево хранится в кэше под
+ключом с номером версии справочника (см. versioning.py). Версия
+увеличивается при любом изменении подразделений или сотрудников,
+поэтому устаревшие деревья просто перестают запрашиваться.
+"""
+from django.core.cache import cache
+
+from .models import Department
+from .versioning import get_directory_version
+
+TREE_CACHE_KEY = 'employees:departments_tree:{version}'
+TREE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def build_departments_tree():
+    """
+    Строит дерево подразделений одним запросом.
+
+    Узел содержит подразделение, количество сотрудников в нём самом
+    (employee_count) и во всём поддереве (total_count), а также дочерние узлы.
+    Сами сотрудники в дерево не входят: их выводит постраничный список.
+    """
+    nodes = {}
+    for department in Department.objects.order_by('path'):
+        nodes[department.id] = {
+            'department': department,
+            'employee_count': department.direct_employee_count,
+            'total_count': department.subtree_employee_count,
+            'children': []
+        }
+
+    tree = []
+    for node in nodes.values():
+        parent_id = node['department'].parent_id
+        if parent_id is None:
+            tree.append(node)
+        elif parent_id in nodes:
+            nodes[parent_id]['children'].append(node)
+
+    tree.sort(key=lambda node: node['department'].id)
+    for node in nodes.values():
+        node['children'].sort(key=lambda child: child['department'].name)
+    return tree
+
+
+def get_departments_tree():
+    """Возвращает дерево подразделений из кэша, при необходимости строя его заново"""
+    key = TREE_CACHE_KEY.format(version=get_directory_version())
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_departments_tree()
+        cache.set(key, tree, TREE_CACHE_TIMEOUT)
+    return tree
@@ -1,19 +1,29 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Поиск и карточка сотрудника: асинхронные варианты для запуска под ASGI
+read_api = async_views if getattr(settings, 'EMPLOYEES_ASYNC_API', False) else views
 
 urlpatterns = [
     path('', views.EmployeeListView.as_view(), name='employee_list'),
     path('import/', views.ImportView.as_view(), name='import'),
     path('import/log/', views.ImportLogListView.as_view(), name='import_log'),
+    path('import/status/<int:pk>/', views.ImportStatusView.as_view(), name='import_status'),
+    path('import/<int:pk>/preview/', views.ImportPreviewView.as_view(), name='import_preview'),
+    path('import/<int:pk>/apply/', views.ImportApplyView.as_view(), name='import_apply'),
     
     # API endpoints
-    path('api/employees/search/', views.EmployeeSearchAPIView.as_view(), name='employee_search_api'),
-    path('api/employees/<int:pk>/', views.EmployeeDetailAPIView.as_view(), name='employee_detail_api'),
+    path('api/employees/search/', read_api.EmployeeSearchAPIView.as_view(), name='employee_search_api'),
+    path('api/employees/<int:pk>/', read_api.EmployeeDetailAPIView.as_view(), name='employee_detail_api'),
     path('api/employees/form/', views.EmployeeFormAPIView.as_view(), name='employee_form_create'),
     path('api/employees/form/<int:pk>/', views.EmployeeFormAPIView.as_view(), name='employee_form_update'),
     path('api/employees/create/', views.EmployeeCreateAPIView.as_view(), name='employee_create_api'),
     path('api/employees/update/<int:pk>/', views.EmployeeUpdateAPIView.as_view(), name='employee_update_api'),
     path('api/employees/delete/<int:pk>/', views.EmployeeDeleteAPIView.as_view(), name='employee_delete_api'),
+    path('api/departments/<int:pk>/subtree/', async_views.DepartmentSubtreeAPIView.as_view(),
+         name='department_subtree_api'),
+    path('api/changes/', views.DirectoryChangesAPIView.as_view(), name='directory_changes_api'),
     
     # Стандартные Django CRUD представления (альтернатива)
     path('employee/create/', views.EmployeeCreateView.as_view(), name='employee_create'),
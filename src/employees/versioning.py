@@ -0,0 +1,178 @@
+"""
+Версия справочника и условные ответы на её основе
+
+Номер версии хранится в базе (DirectoryVersion) и увеличивается после
+фиксации транзакции с изменением данных, один раз на транзакцию: сигналами
+моделей (в том числе при правке в админке), импортом и пересчётом
+счётчиков. Строка версии не блокируется на время транзакций записи, поэтому
+они не выстраиваются в очередь друг за другом. Читается номер через кэш;
+после увеличения ключ кэша удаляется, а короткий срок жизни ограничивает
+расхождение между процессами с локальным кэшем.
+
+Кэши дерева подразделений, карточек сотрудников и индекс автодополнения
+привязаны к номеру версии. Представления для чтения получают сильный ETag
+из версии, адреса запроса и вида страницы для пользователя, поэтому
+повторные запросы отвечают 304 без построения ответа. Страница с
+невыведенными сообщениями (django.contrib.messages) ETag не получает.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition
+
+from .models import DirectoryVersion
+
+DIRECTORY_VERSION_PK = 1
+DIRECTORY_VERSION_KEY = 'employees:directory_version'
+DIRECTORY_VERSION_TIMEOUT = 5
+DEFAULT_CACHE_MAX_AGE = 0
+
+
+def get_directory_version():
+    """Возвращает текущий номер версии справочника"""
+    version = cache.get(DIRECTORY_VERSION_KEY)
+    if version is None:
+        version = (DirectoryVersion.objects.filter(pk=DIRECTORY_VERSION_PK)
+                   .values_list('version', flat=True).first()) or 1
+        cache.set(DIRECTORY_VERSION_KEY, version, DIRECTORY_VERSION_TIMEOUT)
+    return version
+
+
+async def aget_directory_version():
+    """Асинхронный вариант get_directory_version"""
+    version = await cache.aget(DIRECTORY_VERSION_KEY)
+    if version is None:
+        version = (await DirectoryVersion.objects.filter(pk=DIRECTORY_VERSION_PK)
+                   .values_list('version', flat=True).afirst()) or 1
+        await cache.aset(DIRECTORY_VERSION_KEY, version, DIRECTORY_VERSION_TIMEOUT)
+    return version
+
+
+def on_commit_once(func):
+    """Выполняет func после фиксации текущей транзакции, не более раза на транзакцию"""
+    connection = transaction.get_connection()
+    if connection.in_atomic_block and any(callback is func for _, callback, _ in connection.run_on_commit):
+        return
+    transaction.on_commit(func)
+
+
+def increment_directory_version():
+    """Увеличивает номер версии и сбрасывает его кэш"""
+    updated = DirectoryVersion.objects.filter(pk=DIRECTORY_VERSION_PK).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        DirectoryVersion.objects.get_or_create(pk=DIRECTORY_VERSION_PK, defaults={'version': 2})
+    cache.delete(DIRECTORY_VERSION_KEY)
+
+
+def bump_directory_version():
+    """
+    Увеличивает номер версии после фиксации текущей транзакции (вне
+    транзакции — сразу); повторные вызовы в той же транзакции ничего не делают
+    """
+    on_commit_once(increment_directory_version)
+
+
+def has_pending_messages(request):
+    """Есть ли у запроса сообщения, которые ещё не выведены пользователю"""
+    storage = getattr(request, '_messages', None)
+    return storage is not None and len(storage) > 0
+
+
+def get_viewer(user):
+    """Признаки пользователя, от которых зависит страница"""
+    if user is not None and user.is_authenticated:
+        return f'{user.pk}:{int(user.is_superuser)}'
+    return ''
+
+
+def make_directory_etag(request, version, viewer='', vary=()):
+    """
+    Сильный ETag ответа: версия справочника, адрес с параметрами запроса,
+    пользователь и значения заголовков, от которых зависит вид ответа
+    """
+    headers = '|'.join(request.headers.get(header, '') for header in vary)
+    key = f'{version}|{request.get_full_path()}|{viewer}|{headers}'
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def patch_directory_cache_control(response, public=False, vary=()):
+    """
+    Выставляет Cache-Control для ответов справочника.
+
+    Публичные ответы (JSON API без данных пользователя) разрешено хранить
+    и прокси, но по умолчанию с no-cache: копия перепроверяется по ETag при
+    каждом запросе и не переживает изменение справочника. Срок, в течение
+    которого допустимо отдавать копию без проверки, задаёт
+    EMPLOYEES_CACHE_MAX_AGE (секунды). Страницы, зависящие от пользователя,
+    кэшируются только браузером и всегда перепроверяются.
+    Заголовки vary, от которых зависит ответ, добавляются в Vary.
+    """
+    if vary:
+        patch_vary_headers(response, vary)
+    if public:
+        max_age = getattr(settings, 'EMPLOYEES_CACHE_MAX_AGE', DEFAULT_CACHE_MAX_AGE)
+        if max_age:
+            patch_cache_control(response, public=True, max_age=max_age)
+        else:
+            patch_cache_control(response, public=True, no_cache=True)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def directory_conditional(public=False, vary=()):
+    """
+    Декоратор представлений для чтения: ETag по версии справочника, 304 при
+    совпадении If-None-Match и заголовок Cache-Control.
+
+    ETag публичных ответов не зависит от пользователя. vary — заголовки
+    запроса, меняющие ответ (например, HX-Request для фрагментов страницы).
+    Страницы пользователя с невыведенными сообщениями отдаются полностью и
+    без ETag: иначе 304 (или сохранённая браузером копия с прежними
+    сообщениями) скрыл бы их. Асинхронные представления получают версию
+    через асинхронный кэш и async ORM.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                etag = None
+                if request.method in ('GET', 'HEAD') and (
+                    public or not await sync_to_async(has_pending_messages)(request)
+                ):
+                    viewer = '' if public else get_viewer(await request.auser())
+                    etag = quote_etag(make_directory_etag(request, await aget_directory_version(), viewer, vary))
+                    response = get_conditional_response(request, etag=etag)
+                    if response is not None:
+                        return patch_directory_cache_control(response, public=public, vary=vary)
+
+                response = await view_func(request, *args, **kwargs)
+                if etag and response.status_code == 200 and not response.has_header('ETag'):
+                    response.headers['ETag'] = etag
+                return patch_directory_cache_control(response, public=public, vary=vary)
+            return async_wrapper
+
+        def etag_func(request, *args, **kwargs):
+            if not public and has_pending_messages(request):
+                return None
+            viewer = '' if public else get_viewer(getattr(request, 'user', None))
+            return make_directory_etag(request, get_directory_version(), viewer, vary)
+
+        conditional_view = condition(etag_func=etag_func)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            return patch_directory_cache_control(response, public=public, vary=vary)
+        return wrapper
+    return decorator
@@ -1,119 +1,93 @@
-import pandas as pd
-import re
-import json
-from django.shortcuts import render, get_object_or_404, redirect
+from itertools import groupby
+from django.shortcuts import render, get_object_or_404
 from django.http import JsonResponse, HttpResponse
-from django.views.generic import ListView, View, TemplateView, CreateView, UpdateView, DeleteView
-from django.db import transaction, models
+from django.views.generic import ListView, View, CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.contrib.auth.decorators import login_required, user_passes_test
 from django.utils.decorators import method_decorator
-from django.views.decorators.http import require_http_methods
-from django.views.decorators.csrf import csrf_exempt
-from django.urls import reverse_lazy, reverse
+from django.urls import reverse
 from django.contrib import messages
 
 from .models import Employee, ImportLog, Department
+from .autocomplete import autocomplete_index
+from .changefeed import DEFAULT_PAGE_SIZE, get_changes, parse_cursor
+from .details import employee_card_response, get_employee_card
 from .forms import EmployeeForm, ImportForm, SearchForm
+from .importer import import_file
+from .jobs import apply_import, enqueue_import, get_import_progress
+from .search import get_search_backend
+from .tree import get_departments_tree
+from .versioning import directory_conditional
 
 def is_superuser(user):
     """Проверка, что пользователь суперпользователь"""
     return user.is_superuser
 
-def extract_short_name(full_name):
-    """Извлекает сокращенное название из скобок"""
-    match = re.search(r'\((.*?)\)', full_name)
-    if match:
-        short_name = match.group(1)
-        clean_name = re.sub(r'\(.*?\)', '', full_name).strip()
-        return clean_name, short_name
-    return full_name, ''
-
-def determine_hierarchy_from_position(position):
-    """Определяет уровень иерархии на основе должности"""
-    position_lower = position.lower()
-
-    if any(word in position_lower for word in ['генеральный директор', 'гд', 'директор']):
-        return 1
-    elif any(word in position_lower for word in ['первый заместитель', '1-й зам']):
-        return 2
-    elif any(word in position_lower for word in ['заместитель', 'зам', 'вице']):
-        return 3
-    elif any(word in position_lower for word in ['руководитель центра', 'директор департамента', 'начальник департамента']):
-        return 4
-    elif any(word in position_lower for word in ['руководитель управления', 'начальник управления', 'руководитель отделения']):
-        return 5
-    elif any(word in position_lower for word in ['руководитель отдела', 'начальник отдела', 'руководитель службы']):
-        return 6
-    elif any(word in position_lower for word in ['специалист', 'эксперт', 'аналитик']):
-        return 7
-    else:
-        return 8  # Ассистенты по умолчанию
+# Заголовки HTMX, от которых зависит ответ списка: фрагмент или полная страница
+HTMX_VARY_HEADERS = ['HX-Request', 'HX-History-Restore-Request']
 
+@method_decorator(directory_conditional(vary=HTMX_VARY_HEADERS), name='get')
 class EmployeeListView(ListView):
     """
     Представление для отображения списка сотрудников с фильтрацией
+
+    Переходы по подразделениям, поиск и пагинация выполняются через HTMX:
+    в ответ отдаётся только фрагмент со списком, без дерева подразделений.
     """
     model = Employee
     template_name = 'employees/list.html'
+    partial_template_name = 'employees/employees_list_content.html'
     context_object_name = 'employees'
     paginate_by = 50
 
     def get_queryset(self):
-        queryset = super().get_queryset().select_related('department')
+        queryset = super().get_queryset().select_related('department').order_by(*Employee._meta.ordering)
         query = self.request.GET.get('query')
         department_id = self.request.GET.get('department')
 
         if query:
-            queryset = queryset.filter(
-                models.Q(full_name__icontains=query) |
-                models.Q(position__icontains=query) |
-                models.Q(department__name__icontains=query) |
-                models.Q(department__short_name__icontains=query) |
-                models.Q(phone__icontains=query) |
-                models.Q(email__icontains=query)
-            )
+            queryset = get_search_backend().search(queryset, query)
 
         if department_id:
             try:
-                department = Department.objects.get(id=department_id)
-                all_departments = [department] + list(department.get_all_children())
-                queryset = queryset.filter(department__in=all_departments)
-            except Department.DoesNotExist:
+                department = Department.objects.only('path').get(id=department_id)
+                queryset = queryset.filter(Department.subtree_q(department.path, prefix='department__'))
+            except (Department.DoesNotExist, ValueError):
                 pass
 
         return queryset
 
+    def is_partial(self):
+        """Запрос фрагмента от HTMX; при восстановлении истории нужна полная страница"""
+        htmx = self.request.htmx
+        return bool(htmx) and not htmx.history_restore_request
+
+    def get_template_names(self):
+        if self.is_partial():
+            return [self.partial_template_name]
+        return super().get_template_names()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['search_form'] = SearchForm(self.request.GET or None)
-        context['departments_tree'] = self.get_departments_tree()
+        if not self.is_partial():
+            context['search_form'] = SearchForm(self.request.GET or None)
+            context['departments_tree'] = self.get_departments_tree()
+        context['employee_groups'] = self.group_by_department(context['object_list'])
         context['is_superuser'] = self.request.user.is_superuser
         return context
 
+    def group_by_department(self, employees):
+        """Группирует сотрудников текущей страницы по подразделениям"""
+        groups = []
+        for department_id, items in groupby(employees, key=lambda employee: employee.department_id):
+            items = list(items)
+            groups.append({'department': items[0].department, 'employees': items})
+        return groups
+
     def get_departments_tree(self):
         """Возвращает древовидную структуру подразделений"""
-        top_level_departments = Department.objects.filter(level=1).order_by('id')
-        tree = []
-        
-        for dept in top_level_departments:
-            tree.append(self.build_department_node(dept))
-        
-        return tree
-
-    def build_department_node(self, department):
-        """Рекурсивно строит узел подразделения с дочерними элементами"""
-        node = {
-            'department': department,
-            'employees': list(department.employee_set.all().order_by('hierarchy', 'full_name')),
-            'children': []
-        }
-        
-        for child in department.children.all().order_by('name'):
-            node['children'].append(self.build_department_node(child))
-            
-        return node
+        return get_departments_tree()
 
+@method_decorator(directory_conditional(public=True), name='get')
 class EmployeeSearchAPIView(View):
     """
     API endpoint для поиска сотрудников
@@ -124,45 +98,33 @@ class EmployeeSearchAPIView(View):
         if not query or len(query) < 2:
             return JsonResponse({'results': []})
 
-        employees = Employee.objects.select_related('department').filter(
-            models.Q(full_name__icontains=query) |
-            models.Q(position__icontains=query) |
-            models.Q(department__name__icontains=query) |
-            models.Q(phone__icontains=query)
-        )[:15]
-
-        results = [
-            {
-                'id': emp.id,
-                'full_name': emp.full_name,
-                'position': emp.position,
-                'department': emp.department.name if emp.department else "Без подразделения",
-                'phone': emp.phone
-            }
-            for emp in employees
-        ]
+        results = autocomplete_index.search(query, limit=15)
 
         return JsonResponse({'results': results})
 
 class EmployeeDetailAPIView(View):
     """
     API endpoint для получения детальной информации о сотруднике
+
+    Поддерживает условные запросы: при совпадении If-None-Match или
+    If-Modified-Since возвращается 304 по закэшированной карточке.
     """
     def get(self, request, pk):
-        employee = get_object_or_404(Employee, pk=pk)
-        
-        data = {
-            'full_name': employee.full_name,
-            'position': employee.position,
-            'department': employee.department.get_full_path() if employee.department else 'Не указано',
-            'phone': employee.phone,
-            'internal_phone': employee.internal_phone,
-            'email': employee.email or 'Не указан',
-            'room': employee.room or 'Не указан',
-            'hierarchy': employee.get_hierarchy_display()
-        }
-        
-        return JsonResponse(data)
+        return employee_card_response(request, get_employee_card(pk))
+
+@method_decorator(directory_conditional(public=True), name='get')
+class DirectoryChangesAPIView(View):
+    """
+    API endpoint инкрементальной синхронизации: изменения после курсора since
+    """
+    def get(self, request):
+        try:
+            since = parse_cursor(request.GET.get('since'))
+            limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return JsonResponse({'error': 'Неверный курсор since или размер страницы limit'}, status=400)
+
+        return JsonResponse(get_changes(since, limit))
 
 class ImportView(LoginRequiredMixin, UserPassesTestMixin, View):
     """
@@ -180,143 +142,97 @@ class ImportView(LoginRequiredMixin, UserPassesTestMixin, View):
     def post(self, request):
         form = ImportForm(request.POST, request.FILES)
         if form.is_valid():
-            try:
-                result = self.process_excel_file(request.FILES['excel_file'], request.user)
-                return JsonResponse(result)
-            except Exception as e:
-                return JsonResponse({'status': 'failed', 'error': str(e)})
-        return JsonResponse({'status': 'failed', 'error': 'Invalid form'})
+            file = form.cleaned_data['excel_file']
+            log = ImportLog.objects.create(
+                file_name=file.name,
+                source_file=file,
+                status='pending',
+                dry_run=form.cleaned_data['dry_run'],
+                user=request.user
+            )
+            enqueue_import(log)
+            return JsonResponse({
+                'status': log.status,
+                'job_id': log.pk,
+                'progress_url': reverse('import_status', args=[log.pk])
+            }, status=202)
+        errors = form.errors.get('excel_file')
+        return JsonResponse({'status': 'failed', 'error': errors[0] if errors else 'Invalid form'})
 
     def process_excel_file(self, file, user):
-        try:
-            df = pd.read_excel(file, dtype=str)
-        except Exception as e:
-            raise ValueError(f"Ошибка чтения файла: {str(e)}")
-
-        # Заменяем NaN, None и строки 'nan' на пустые строки
-        df = df.fillna('')
-        df = df.replace(['nan', 'None', 'NONE', 'null', 'NULL'], '', regex=True)
-
-        # Проверяем наличие обязательных столбцов
-        required_columns = [
-            'Инициалы', 'ФИО', 'Должность', 'Структурное подразделение 1',
-            'Телефон', 'Внутренний телефон'
-        ]
-        
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            raise ValueError(f"Отсутствуют обязательные столбцы: {', '.join(missing_columns)}")
-
-        added = 0
-        updated = 0
-        errors = []
-
-        with transaction.atomic():
-            for index, row in df.iterrows():
-                try:
-                    # Функция для очистки значений
-                    def clean_value(value, is_level=False):
-                        if value is None or pd.isna(value) or str(value).strip().lower() in ['', 'nan', 'none', 'null']:
-                            return '' if not is_level else 7  # Специалист по умолчанию
-
-                        value_str = str(value).strip()
-
-                        if is_level:
-                            try:
-                                level = int(float(value_str))
-                                return max(1, min(8, level))  # Ограничиваем диапазон 1-8
-                            except (ValueError, TypeError):
-                                return 7  # Специалист по умолчанию
-                        return value_str
-
-                    # Обрабатываем подразделения с извлечением short_name
-                    dept_names = []
-                    for i in range(1, 5):
-                        col_name = f'Структурное подразделение {i}'
-                        dept_name = clean_value(row.get(col_name, ''))
-                        if dept_name:
-                            full_name, short_name = extract_short_name(dept_name)
-                            dept_names.append((full_name, short_name))
-
-                    # Строим иерархию подразделений
-                    parent = None
-                    current_level = 1
-
-                    for full_name, short_name in dept_names:
-                        dept, created = Department.objects.get_or_create(
-                            name=full_name,
-                            parent=parent,
-                            defaults={
-                                'short_name': short_name,
-                                'level': current_level
-                            }
-                        )
-
-                        # Обновляем short_name если он изменился
-                        if not created and short_name and dept.short_name != short_name:
-                            dept.short_name = short_name
-                            dept.save()
-
-                        parent = dept
-                        current_level += 1
-
-                    # Определяем уровень иерархии
-                    position = clean_value(row['Должность'])
-                    hierarchy = clean_value(row['Уровень'], is_level=True)
-
-                    # Если уровень не указан или указан некорректно, определяем по должности
-                    if hierarchy == 7:  # Только если не указан явно или указан как специалист
-                        hierarchy = determine_hierarchy_from_position(position)
-
-                    employee_data = {
-                        'initials': clean_value(row['Инициалы']),
-                        'full_name': clean_value(row['ФИО']),
-                        'position': position,
-                        'department': parent,
-                        'phone': clean_value(row['Телефон']),
-                        'internal_phone': clean_value(row['Внутренний телефон']),
-                        'room': clean_value(row['Кабинет']),
-                        'hierarchy': hierarchy,
-                        'email': clean_value(row.get('Email', ''))
-                    }
-
-                    if not employee_data['full_name']:
-                        errors.append(f"Строка {index + 2}: Отсутствует ФИО")
-                        continue
-
-                    employee, created = Employee.objects.update_or_create(
-                        full_name=employee_data['full_name'],
-                        internal_phone=employee_data['internal_phone'],
-                        defaults=employee_data
-                    )
-
-                    if created:
-                        added += 1
-                    else:
-                        updated += 1
-
-                except Exception as e:
-                    errors.append(f"Строка {index + 2}: {str(e)}")
-
-        status = 'success' if not errors else 'partial' if added + updated > 0 else 'failed'
+        """Синхронно импортирует файл (без фонового задания) и записывает лог"""
+        result = import_file(file)
 
         ImportLog.objects.create(
             file_name=file.name,
-            status=status,
-            total_records=len(df),
-            added=added,
-            updated=updated,
-            errors='\n'.join(errors),
+            status=result['status'],
+            total_records=result['total'],
+            processed_records=result['total'],
+            added=result['added'],
+            updated=result['updated'],
+            unchanged=result['unchanged'],
+            errors='\n'.join(result['errors']),
             user=user if user.is_authenticated else None
         )
 
-        return {
-            'status': status,
-            'total': len(df),
-            'added': added,
-            'updated': updated,
-            'errors': errors
-        }
+        return result
+
+class ImportStatusView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    API endpoint для отслеживания хода фонового импорта
+    """
+    def test_func(self):
+        return self.request.user.is_superuser
+
+    def get(self, request, pk):
+        log = get_object_or_404(ImportLog, pk=pk)
+        return JsonResponse(get_import_progress(log))
+
+class ImportPreviewView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    Просмотр набора изменений, подготовленного предпросмотром импорта
+    """
+    template_name = 'employees/import_preview.html'
+    items_limit = 200
+
+    def test_func(self):
+        return self.request.user.is_superuser
+
+    def get(self, request, pk):
+        log = get_object_or_404(ImportLog, pk=pk, change_set__isnull=False)
+        change_set = log.change_set
+        limit = self.items_limit
+        return render(request, self.template_name, {
+            'log': log,
+            'summary': change_set['summary'],
+            'new_departments': change_set['departments']['added'][:limit],
+            'renamed_departments': change_set['departments']['updated'][:limit],
+            'added': change_set['added'][:limit],
+            'updated': change_set['updated'][:limit],
+            'orphaned': change_set['orphaned'][:limit],
+            'errors': change_set['errors'][:limit],
+            'items_limit': limit,
+        })
+
+class ImportApplyView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    Применение набора изменений, подготовленного предпросмотром импорта
+    """
+    def test_func(self):
+        return self.request.user.is_superuser
+
+    def post(self, request, pk):
+        log = get_object_or_404(ImportLog, pk=pk)
+        if not apply_import(log):
+            return JsonResponse({
+                'status': 'failed',
+                'error': 'Набор изменений уже применён или недоступен'
+            }, status=409)
+        return JsonResponse({
+            'status': 'pending',
+            'job_id': log.pk,
+            'progress_url': reverse('import_status', args=[log.pk])
+        }, status=202)
 
 class ImportLogListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
     """
@@ -331,6 +247,10 @@ class ImportLogListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
     def test_func(self):
         return self.request.user.is_superuser
 
+    def get_queryset(self):
+        # Набор изменений может быть большим и в списке не нужен
+        return super().get_queryset().defer('change_set')
+
 class EmployeeFormAPIView(LoginRequiredMixin, UserPassesTestMixin, View):
     """
     API endpoint для получения HTML формы сотрудника
@@ -0,0 +1,276 @@
+"""
+Метрики производительности запросов
+
+MetricsMiddleware измеряет для каждого запроса время обработки, число и
+время SQL-запросов, время рендеринга TemplateResponse и размер ответа,
+добавляет заголовок Server-Timing (в режиме отладки или для сотрудников
+с is_staff) и накапливает значения по представлениям. metrics_view отдаёт их суперпользователю в текстовом
+формате Prometheus.
+
+SQL-запросы учитываются обёрткой выполнения (execute_wrapper), которая
+ставится на каждое соединение с базой. Запрос, к которому относится SQL,
+определяется через contextvars, поэтому учитываются и запросы async ORM,
+выполняемые в отдельном потоке. Метрики хранятся в памяти процесса: при
+нескольких воркерах каждый из них отдаёт свои значения.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+
+METRIC_PREFIX = 'phonebook'
+# Границы корзин гистограммы времени обработки, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+UNRESOLVED_VIEW = '<unresolved>'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_current_metrics = ContextVar('phonebook_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    Значения, собранные за время одного запроса
+    """
+    __slots__ = ('started', 'queries', 'query_time', 'render_started', 'render_time')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_time = 0.0
+        self.render_started = None
+        self.render_time = 0.0
+
+    def render_finished(self, response):
+        if self.render_started is not None:
+            self.render_time += time.perf_counter() - self.render_started
+            self.render_started = None
+
+
+class ViewStats:
+    """
+    Накопленные значения для пары представление/метод
+    """
+    __slots__ = ('buckets', 'count', 'duration', 'queries', 'query_time', 'render_time', 'response_size',
+                 'statuses')
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.duration = 0.0
+        self.queries = 0
+        self.query_time = 0.0
+        self.render_time = 0.0
+        self.response_size = 0
+        self.statuses = {}
+
+
+class MetricsRegistry:
+    """
+    Потокобезопасное хранилище метрик процесса
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def observe(self, view, method, status, duration, metrics, response_size):
+        bucket = bisect_left(LATENCY_BUCKETS, duration)
+        with self.lock:
+            stats = self.views.get((view, method))
+            if stats is None:
+                stats = self.views[(view, method)] = ViewStats()
+            if bucket < len(LATENCY_BUCKETS):
+                stats.buckets[bucket] += 1
+            stats.count += 1
+            stats.duration += duration
+            stats.queries += metrics.queries
+            stats.query_time += metrics.query_time
+            stats.render_time += metrics.render_time
+            stats.response_size += response_size
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def snapshot(self):
+        """Копия накопленных значений для выгрузки без удержания блокировки"""
+        with self.lock:
+            snapshot = {}
+            for key, stats in self.views.items():
+                copy = ViewStats()
+                for field in ViewStats.__slots__:
+                    setattr(copy, field, getattr(stats, field))
+                copy.buckets = list(stats.buckets)
+                copy.statuses = dict(stats.statuses)
+                snapshot[key] = copy
+            return snapshot
+
+    def clear(self):
+        with self.lock:
+            self.views.clear()
+
+    def export(self):
+        """Возвращает метрики в текстовом формате Prometheus"""
+        views = sorted(self.snapshot().items())
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f'# HELP {METRIC_PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {METRIC_PREFIX}_{name} {kind}')
+
+        def sample(name, labels, value):
+            label_text = ','.join(f'{key}="{escape_label(label_value)}"' for key, label_value in labels)
+            lines.append(f'{METRIC_PREFIX}_{name}{{{label_text}}} {format_value(value)}')
+
+        header('request_duration_seconds', 'histogram', 'Время обработки запроса')
+        for (view, method), stats in views:
+            labels = [('view', view), ('method', method)]
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                cumulative += count
+                sample('request_duration_seconds_bucket', labels + [('le', format_value(bound))], cumulative)
+            sample('request_duration_seconds_bucket', labels + [('le', '+Inf')], stats.count)
+            sample('request_duration_seconds_sum', labels, stats.duration)
+            sample('request_duration_seconds_count', labels, stats.count)
+
+        header('requests_total', 'counter', 'Количество запросов по статусам ответа')
+        for (view, method), stats in views:
+            for status, count in sorted(stats.statuses.items()):
+                sample('requests_total', [('view', view), ('method', method), ('status', status)], count)
+
+        counters = [
+            ('db_queries_total', 'Количество SQL-запросов', 'queries'),
+            ('db_query_seconds_total', 'Время выполнения SQL-запросов', 'query_time'),
+            ('template_render_seconds_total', 'Время рендеринга шаблонов', 'render_time'),
+            ('response_size_bytes_total', 'Суммарный размер ответов', 'response_size'),
+        ]
+        for name, help_text, field in counters:
+            header(name, 'counter', help_text)
+            for (view, method), stats in views:
+                sample(name, [('view', view), ('method', method)], getattr(stats, field))
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+def record_query(execute, sql, params, many, context):
+    """Обёртка выполнения SQL: учитывает запрос в метриках текущего HTTP-запроса"""
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.query_time += time.perf_counter() - started
+
+
+def install_query_wrapper(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def get_view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED_VIEW
+    return match.view_name or match._func_path
+
+
+class MetricsMiddleware:
+    """
+    Сбор метрик запроса и заголовок Server-Timing.
+
+    Должен стоять первым в MIDDLEWARE, чтобы учитывать время остальных
+    обработчиков. Работает и в синхронном, и в асинхронном режиме.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'METRICS_SERVER_TIMING', True)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+        connection_created.connect(install_query_wrapper, dispatch_uid='phonebook_metrics')
+        for connection in connections.all(initialized_only=True):
+            install_query_wrapper(connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = request._metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        show_timing = self.server_timing and self.server_timing_allowed(getattr(request, 'user', None))
+        return self.finish(request, response, metrics, show_timing)
+
+    async def __acall__(self, request):
+        metrics = request._metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        show_timing = self.server_timing
+        if show_timing and not settings.DEBUG:
+            user = await request.auser() if hasattr(request, 'auser') else None
+            show_timing = self.server_timing_allowed(user)
+        return self.finish(request, response, metrics, show_timing)
+
+    def server_timing_allowed(self, user):
+        # Время SQL и шаблонов не показывается посторонним: по нему можно
+        # судить о данных и нагрузке
+        return settings.DEBUG or (user is not None and user.is_staff)
+
+    def process_template_response(self, request, response):
+        # Ответ рендерится сразу после обработчиков process_template_response
+        metrics = getattr(request, '_metrics', None)
+        if metrics is not None:
+            metrics.render_started = time.perf_counter()
+            response.add_post_render_callback(metrics.render_finished)
+        return response
+
+    def finish(self, request, response, metrics, show_timing):
+        duration = time.perf_counter() - metrics.started
+        response_size = 0 if response.streaming else len(response.content)
+        registry.observe(get_view_name(request), request.method, response.status_code, duration, metrics,
+                         response_size)
+
+        if show_timing:
+            timings = [f'total;dur={duration * 1000:.1f}',
+                       f'db;dur={metrics.query_time * 1000:.1f};desc="{metrics.queries} SQL"']
+            if metrics.render_time:
+                timings.append(f'template;dur={metrics.render_time * 1000:.1f}')
+            response['Server-Timing'] = ', '.join(timings)
+        return response
+
+
+def metrics_view(request):
+    """Метрики в формате Prometheus (только для суперпользователей)"""
+    if not request.user.is_superuser:
+        raise PermissionDenied
+    return HttpResponse(registry.export(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -9,13 +9,30 @@ from pathlib import Path
 # Базовый директория проекта (корневая папка проекта)
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+
+def env_bool(name, default=False):
+    """Логическое значение переменной окружения (1/true/yes/on)"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_int(name, default):
+    """Целочисленное значение переменной окружения"""
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
 # Секретный ключ приложения
-SECRET_KEY = 'django-insecure-j(_g+2t(2xu##w+t4gp%3m9j1lwprgvylndda@u)xw@oh80s&-'
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY', 'django-insecure-j(_g+2t(2xu##w+t4gp%3m9j1lwprgvylndda@u)xw@oh80s&-'
+)
 
 # Режим отладки (включать только для разработки!)
-DEBUG = True
+DEBUG = env_bool('DJANGO_DEBUG', True)
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
 
 # Установленные приложения проекта
 INSTALLED_APPS = [
@@ -27,13 +44,16 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     # Сторонние приложения
     'django_bootstrap5',     # Bootstrap 5
+    'django_htmx',           # Поддержка запросов HTMX
     'sass_processor',        # Компилятор SASS/SCSS
+    'compressor',            # Объединение и минификация статики
     'widget_tweaks',         # Улучшение виджетов форм
     # Приложения проекта
     'employees'
 ]
 
 MIDDLEWARE = [
+    'phonebook.metrics.MetricsMiddleware',  # Метрики запросов и Server-Timing (первым)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -41,8 +61,15 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'django_htmx.middleware.HtmxMiddleware',
 ]
 
+# Метрики производительности: эндпоинт /metrics в формате Prometheus
+# (только для суперпользователей) и заголовок Server-Timing в ответах
+# (по умолчанию только в режиме отладки; вне его — только сотрудникам)
+METRICS_ENABLED = env_bool('METRICS_ENABLED', True)
+METRICS_SERVER_TIMING = env_bool('METRICS_SERVER_TIMING', DEBUG)
+
 # Корневой конфигуратор URL
 ROOT_URLCONF = 'phonebook.urls'
 
@@ -67,13 +94,89 @@ TEMPLATES = [
 WSGI_APPLICATION = 'phonebook.wsgi.application'
 
 # Конфигурация базы данных
-DATABASES = {
+# По умолчанию SQLite (разработка и тесты). Для PostgreSQL задаётся
+# DB_ENGINE=postgresql и параметры подключения DB_NAME, DB_USER,
+# DB_PASSWORD, DB_HOST, DB_PORT. Соединения переиспользуются: либо пулом
+# psycopg (DB_POOL=1, размер DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE), либо
+# постоянными соединениями с проверкой перед использованием
+# (DB_CONN_MAX_AGE секунд). Пул и постоянные соединения несовместимы.
+# DB_TRIGRAM_THRESHOLD — порог сходства для поиска ФИО с опечатками.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DB_POOL = env_bool('DB_POOL')
+    DB_TRIGRAM_THRESHOLD = float(os.environ.get('DB_TRIGRAM_THRESHOLD', 0.4))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'phonebook'),
+            'USER': os.environ.get('DB_USER', 'phonebook'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if DB_POOL else env_int('DB_CONN_MAX_AGE', 60),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Порог сходства слов ФИО для нечёткого поиска (оператор %>)
+                'options': f'-c pg_trgm.word_similarity_threshold={DB_TRIGRAM_THRESHOLD}',
+            },
+        }
+    }
+    if DB_POOL:
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': env_int('DB_POOL_MIN_SIZE', 2),
+            'max_size': env_int('DB_POOL_MAX_SIZE', 10),
+            'timeout': env_int('DB_POOL_TIMEOUT', 10),
+        }
+    # Триграммные и полнотекстовые выражения PostgreSQL
+    INSTALLED_APPS.append('django.contrib.postgres')
+else:
+    # Настройки SQLite применяются к каждому новому соединению. Журнал WAL
+    # позволяет читать, пока импорт держит транзакцию записи; писатели
+    # ждут освобождения блокировки (busy_timeout) и берут её сразу в начале
+    # транзакции (IMMEDIATE), а не при первой записи, поэтому не получают
+    # «database is locked» при повышении блокировки. Импорт фиксирует каждый
+    # пакет отдельной транзакцией, поэтому писатели ждут не дольше записи
+    # пакета, а не весь импорт. Периодическое
+    # обслуживание (PRAGMA optimize, контрольная точка WAL) выполняет
+    # команда optimize_database.
+    SQLITE_BUSY_TIMEOUT = env_int('SQLITE_BUSY_TIMEOUT', 20000)  # мс
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': SQLITE_BUSY_TIMEOUT,
+        'cache_size': env_int('SQLITE_CACHE_SIZE', -32000),    # отрицательное значение — в КиБ
+        'mmap_size': env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+        'temp_store': 'MEMORY',
+    }
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'phonebook_db.sqlite3'),
+            'OPTIONS': {
+                'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': SQLITE_BUSY_TIMEOUT / 1000,
+            },
+        }
+    }
+
+# Кэш (для нескольких процессов рекомендуется общий бэкенд, например Redis;
+# на SQLite через него же публикуется ход фонового импорта)
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'phonebook_db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'phonebook',
+        # Карточки сотрудников и фрагменты дерева подразделений кэшируются
+        # поштучно; значения по умолчанию (300) не хватает на весь справочник
+        'OPTIONS': {'MAX_ENTRIES': env_int('CACHE_MAX_ENTRIES', 20000)},
     }
 }
 
+# Асинхронные версии API поиска и карточки сотрудника (при запуске под ASGI,
+# например uvicorn phonebook.asgi:application)
+EMPLOYEES_ASYNC_API = env_bool('EMPLOYEES_ASYNC_API')
+
 # Валидаторы паролей
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -99,8 +202,32 @@ STATICFILES_FINDERS = [
     'django.contrib.staticfiles.finders.FileSystemFinder',
     'django.contrib.staticfiles.finders.AppDirectoriesFinder',
     'sass_processor.finders.CssFinder',  # Для обработки SASS
+    'compressor.finders.CompressorFinder',  # Бандлы django-compressor
 ]
 
+# Сборка статики для продакшена (команда build_static): SCSS компилируется
+# заранее, collectstatic добавляет хэш содержимого в имена файлов, а
+# django-compressor объединяет и минифицирует стили и скрипты страниц
+# (offline). Рядом с текстовыми файлами записываются сжатые копии .gz и
+# .br. Веб-сервер отдаёт их как есть (nginx: gzip_static, brotli_static),
+# а файлы с хэшем в имени — с Cache-Control: public, max-age=31536000,
+# immutable. Режим включается явно (STATIC_BUILD=1) и только после
+# build_static: без манифеста collectstatic ссылки на статику не строятся.
+# По умолчанию статика и SCSS обрабатываются на лету.
+STATIC_BUILD = env_bool('STATIC_BUILD')
+if STATIC_BUILD:
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'},
+    }
+SASS_PROCESSOR_ENABLED = not STATIC_BUILD
+COMPRESS_ENABLED = STATIC_BUILD
+COMPRESS_OFFLINE = STATIC_BUILD
+COMPRESS_FILTERS = {
+    'css': ['compressor.filters.css_default.CssAbsoluteFilter', 'compressor.filters.cssmin.rCSSMinFilter'],
+    'js': ['compressor.filters.jsmin.rJSMinFilter'],
+}
+
 # Медиа-файлы (загружаемые пользователями)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR.joinpath('media')
@@ -111,7 +238,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Настройки Bootstrap 5
 BOOTSTRAP5 = {
     "javascript_url": {
-        "url": "/static/bootstrap/js/bootstrap.bundle.min.js",
+        "url": STATIC_URL + "bootstrap/js/bootstrap.bundle.min.js",
     },
 }
 
@@ -5,7 +5,10 @@ Copyright (c) 2025 Artem Fomin
 from django.contrib import admin
 from django.urls import path, include
 
+from .metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('', include('employees.urls')),
 ]
\ No newline at end of file
@@ -18,26 +18,248 @@ function initializeEmployeesPage() {
         }, 500));
     }
 
-    // Обработка формы поиска
+    // Форму поиска отправляет HTMX (hx-get): приходит только фрагмент списка
     const searchForm = document.getElementById('searchForm');
     if (searchForm) {
-        searchForm.addEventListener('submit', function (e) {
-            e.preventDefault();
-            const query = searchInput.value.trim();
-            if (query) {
-                window.location.href = `?query=${encodeURIComponent(query)}`;
-            } else {
-                window.location.href = '?';
-            }
-        });
+        searchForm.addEventListener('submit', hideSearchResults);
     }
 
     // Инициализация модальных окон
     initModals();
+
+    // Локальный кэш справочника для поиска и карточек без запросов к серверу
+    DirectoryCache.init();
 }
 
+// === Локальный кэш справочника (IndexedDB) ===
+// Снимок справочника один раз загружается через /api/changes/ и хранится
+// в IndexedDB, затем обновляется дельтами по курсору журнала изменений.
+// Поиск и карточка сотрудника работают по снимку; если снимка нет или он
+// давно не синхронизировался, запросы идут в API, как раньше.
+const DirectoryCache = {
+    DB_NAME: 'phonebook-directory',
+    DB_VERSION: 1,
+    PAGE_SIZE: 2000,
+    SYNC_INTERVAL: 5 * 60 * 1000,
+    STALE_AFTER: 60 * 60 * 1000,
+    SEARCH_LIMIT: 15,
+    // Как в Employee.HIERARCHY_LEVELS
+    HIERARCHY_LEVELS: {
+        1: 'Высшее руководство (ГД)',
+        2: 'Первые заместители',
+        3: 'Заместители',
+        4: 'Руководители центров',
+        5: 'Руководители управлений',
+        6: 'Руководители отделов',
+        7: 'Специалисты',
+        8: 'Ассистенты',
+    },
+
+    db: null,
+    employees: new Map(),
+    departments: new Map(),
+    haystacks: new Map(),
+    cursor: '',
+    syncedAt: 0,
+    syncing: null,
+
+    async init() {
+        if (!window.indexedDB || !document.getElementById('search-input')) {
+            return;
+        }
+        try {
+            this.db = await this.open();
+            await this.load();
+        } catch (error) {
+            console.warn('Локальный кэш справочника недоступен:', error);
+            this.db = null;
+            return;
+        }
+        // Сохранённый снимок остаётся в работе, пока не устарел, даже если
+        // синхронизироваться сейчас не удалось
+        this.sync().catch(error => console.warn(error));
+        setInterval(() => this.sync().catch(() => {}), this.SYNC_INTERVAL);
+        document.addEventListener('visibilitychange', () => {
+            if (document.visibilityState === 'visible' && Date.now() - this.syncedAt > this.SYNC_INTERVAL) {
+                this.sync().catch(() => {});
+            }
+        });
+    },
+
+    open() {
+        return new Promise((resolve, reject) => {
+            const request = indexedDB.open(this.DB_NAME, this.DB_VERSION);
+            request.onupgradeneeded = () => {
+                const db = request.result;
+                // Смена версии схемы сбрасывает снимок: он загрузится заново
+                for (const name of Array.from(db.objectStoreNames)) {
+                    db.deleteObjectStore(name);
+                }
+                db.createObjectStore('records', { keyPath: 'key' });
+                db.createObjectStore('meta', { keyPath: 'name' });
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    },
+
+    requestResult(request) {
+        return new Promise((resolve, reject) => {
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    },
+
+    async load() {
+        const transaction = this.db.transaction(['records', 'meta'], 'readonly');
+        const records = await this.requestResult(transaction.objectStore('records').getAll());
+        const meta = await this.requestResult(transaction.objectStore('meta').getAll());
+
+        records.forEach(record => this.applyRecord(record.type, record.id, record.data));
+        meta.forEach(item => {
+            this[item.name] = item.value;
+        });
+    },
+
+    // Загружает изменения после курсора постранично и сохраняет их в IndexedDB
+    sync() {
+        if (!this.syncing) {
+            this.syncing = this.syncPages().finally(() => {
+                this.syncing = null;
+            });
+        }
+        return this.syncing;
+    },
+
+    async syncPages() {
+        let hasMore = true;
+        while (hasMore) {
+            const response = await fetch(`/api/changes/?since=${encodeURIComponent(this.cursor)}&limit=${this.PAGE_SIZE}`,
+                { cache: 'no-cache' });
+            if (!response.ok) {
+                throw new Error('Ошибка синхронизации справочника');
+            }
+            const page = await response.json();
+
+            const transaction = this.db.transaction(['records', 'meta'], 'readwrite');
+            const records = transaction.objectStore('records');
+            page.changes.forEach(change => {
+                const key = `${change.type}:${change.id}`;
+                if (change.action === 'delete') {
+                    records.delete(key);
+                    this.applyRecord(change.type, change.id, null);
+                } else {
+                    records.put({ key: key, type: change.type, id: change.id, data: change.data });
+                    this.applyRecord(change.type, change.id, change.data);
+                }
+            });
+            this.cursor = page.version;
+            hasMore = page.has_more;
+            if (!hasMore) {
+                this.syncedAt = Date.now();
+            }
+            const meta = transaction.objectStore('meta');
+            meta.put({ name: 'cursor', value: this.cursor });
+            meta.put({ name: 'syncedAt', value: this.syncedAt });
+            await new Promise((resolve, reject) => {
+                transaction.oncomplete = resolve;
+                transaction.onerror = () => reject(transaction.error);
+            });
+        }
+        // Названия подразделений входят в строки поиска сотрудников
+        this.haystacks.clear();
+    },
+
+    applyRecord(type, id, data) {
+        const store = type === 'employee' ? this.employees : this.departments;
+        if (data) {
+            store.set(id, data);
+        } else {
+            store.delete(id);
+        }
+        if (type === 'employee') {
+            this.haystacks.delete(id);
+        }
+    },
+
+    isFresh() {
+        return this.db !== null && this.cursor !== '' && Date.now() - this.syncedAt < this.STALE_AFTER;
+    },
+
+    normalize(text) {
+        return (text || '').toLowerCase().replace(/ё/g, 'е');
+    },
+
+    haystack(id, employee) {
+        let haystack = this.haystacks.get(id);
+        if (haystack === undefined) {
+            const department = this.departments.get(employee.department_id);
+            haystack = this.normalize([
+                employee.full_name, employee.position, employee.phone, employee.internal_phone,
+                department ? department.name : '', department ? department.short_name : '',
+            ].join(' '));
+            this.haystacks.set(id, haystack);
+        }
+        return haystack;
+    },
+
+    // Все слова запроса должны встречаться в строке сотрудника; выше
+    // ставятся совпадения с началом ФИО
+    search(query) {
+        const words = this.normalize(query).split(/\s+/).filter(Boolean);
+        const matches = [];
+        for (const [id, employee] of this.employees) {
+            const haystack = this.haystack(id, employee);
+            if (words.every(word => haystack.includes(word))) {
+                const score = this.normalize(employee.full_name).startsWith(words[0]) ? 0 : 1;
+                matches.push({ id, employee, score });
+            }
+        }
+        matches.sort((a, b) => a.score - b.score || a.employee.full_name.localeCompare(b.employee.full_name));
+        return matches.slice(0, this.SEARCH_LIMIT).map(({ id, employee }) => {
+            const department = this.departments.get(employee.department_id);
+            return {
+                id: id,
+                full_name: employee.full_name,
+                position: employee.position,
+                department: department ? department.name : 'Без подразделения',
+                phone: employee.phone,
+            };
+        });
+    },
+
+    // Данные карточки в том же виде, что отдаёт /api/employees/<id>/
+    details(id) {
+        const employee = this.employees.get(id);
+        if (!employee) {
+            return null;
+        }
+        const department = this.departments.get(employee.department_id);
+        return {
+            full_name: employee.full_name,
+            position: employee.position,
+            department: department ? department.full_path : 'Не указано',
+            phone: employee.phone,
+            internal_phone: employee.internal_phone,
+            email: employee.email || 'Не указан',
+            room: employee.room || 'Не указан',
+            hierarchy: this.HIERARCHY_LEVELS[employee.hierarchy] || 'Неизвестно',
+        };
+    },
+};
+
 // Функция для поиска сотрудников
 function searchEmployees(query) {
+    // Поиск по локальному снимку; если он устарел или ничего не нашёл
+    // (сервер дополнительно учитывает опечатки и раскладку), идём в API
+    if (DirectoryCache.isFresh()) {
+        const results = DirectoryCache.search(query);
+        if (results.length > 0) {
+            displaySearchResults(results);
+            return;
+        }
+    }
+
     showLoading('searchResults');
 
     fetch(`/api/employees/search/?query=${encodeURIComponent(query)}`)
@@ -85,19 +307,6 @@ function hideSearchResults() {
     container.style.display = 'none';
 }
 
-// Загрузка сотрудников по подразделению
-function loadDepartmentEmployees(departmentId) {
-    showLoading('employeesContent');
-
-    let url = '?';
-    if (departmentId) {
-        url += `department=${departmentId}`;
-    }
-
-    // Простая перезагрузка страницы с фильтром
-    window.location.href = url;
-}
-
 // Показать детали сотрудника
 function showEmployeeDetails(employeeId) {
     const modal = new bootstrap.Modal(document.getElementById('employeeDetailsModal'));
@@ -114,13 +323,16 @@ function showEmployeeDetails(employeeId) {
 
     modal.show();
 
-    fetch(`/api/employees/${employeeId}/`)
+    const cached = DirectoryCache.isFresh() ? DirectoryCache.details(employeeId) : null;
+    const request = cached ? Promise.resolve(cached) : fetch(`/api/employees/${employeeId}/`)
         .then(response => {
             if (!response.ok) {
                 throw new Error('Ошибка загрузки данных');
             }
             return response.json();
-        })
+        });
+
+    request
         .then(data => {
             modalBody.innerHTML = `
                 <div class="employee-details-content">
@@ -1,411 +1,174 @@
-// Файл: static/js/employees.js
-
 document.addEventListener('DOMContentLoaded', function () {
-    initializeEmployeesPage();
-});
-
-function initializeEmployeesPage() {
-    // Инициализация поиска
-    const searchInput = document.getElementById('search-input');
-    if (searchInput) {
-        searchInput.addEventListener('input', debounce(function (e) {
-            const query = e.target.value.trim();
-            if (query.length >= 2) {
-                searchEmployees(query);
-            } else {
-                hideSearchResults();
-            }
-        }, 500));
-    }
-
-    // Обработка формы поиска
-    const searchForm = document.getElementById('searchForm');
-    if (searchForm) {
-        searchForm.addEventListener('submit', function (e) {
-            e.preventDefault();
-            const query = searchInput.value.trim();
-            if (query) {
-                window.location.href = `?query=${encodeURIComponent(query)}`;
-            } else {
-                window.location.href = '?';
-            }
-        });
-    }
-
-    // Инициализация модальных окон
-    initModals();
-}
-
-// Функция для поиска сотрудников
-function searchEmployees(query) {
-    showLoading('searchResults');
-
-    fetch(`/api/employees/search/?query=${encodeURIComponent(query)}`)
-        .then(response => {
-            if (!response.ok) {
-                throw new Error('Ошибка сети');
-            }
-            return response.json();
-        })
-        .then(data => {
-            displaySearchResults(data.results);
-        })
-        .catch(error => {
-            console.error('Ошибка поиска:', error);
-            showError('searchResults', 'Ошибка при поиске сотрудников');
-        });
-}
-
-// Отображение результатов поиска
-function displaySearchResults(results) {
-    const container = document.getElementById('searchResults');
-    if (!results || results.length === 0) {
-        container.innerHTML = '<div class="search-result-item">Ничего не найдено</div>';
-        container.style.display = 'block';
-        return;
+    const importForm = document.getElementById('importForm');
+    const importBtn = document.getElementById('importBtn');
+    const applyForm = document.getElementById('applyForm');
+    const applyBtn = document.getElementById('applyBtn');
+    const importResult = document.getElementById('importResult');
+    const importProgress = document.getElementById('importProgress');
+    const progressBar = document.getElementById('importProgressBar');
+    const progressMessage = document.getElementById('importProgressMessage');
+    const POLL_INTERVAL = 1000;
+
+    let activeButton = null;
+    let activeButtonHtml = '';
+
+    function lockButton(button, text) {
+        activeButton = button;
+        activeButtonHtml = button.innerHTML;
+        button.disabled = true;
+        button.innerHTML = `<span class="spinner-border spinner-border-sm" role="status"></span> ${text}`;
     }
 
-    let html = '';
-    results.forEach(employee => {
-        html += `
-            <div class="search-result-item" onclick="showEmployeeDetails(${employee.id})">
-                <strong>${employee.full_name}</strong> - ${employee.position}<br>
-                <small>${employee.department} | ${employee.phone}</small>
-            </div>
-        `;
-    });
-
-    container.innerHTML = html;
-    container.style.display = 'block';
-}
-
-// Скрытие результатов поиска
-function hideSearchResults() {
-    const container = document.getElementById('searchResults');
-    container.style.display = 'none';
-}
-
-// Загрузка сотрудников по подразделению
-function loadDepartmentEmployees(departmentId) {
-    showLoading('employeesContent');
-
-    let url = '?';
-    if (departmentId) {
-        url += `department=${departmentId}`;
+    function resetButton() {
+        if (activeButton) {
+            activeButton.disabled = false;
+            activeButton.innerHTML = activeButtonHtml;
+            activeButton = null;
+        }
     }
 
-    // Простая перезагрузка страницы с фильтром
-    window.location.href = url;
-}
+    function showProgress(data) {
+        importProgress.style.display = 'block';
+        const percent = data.total ? Math.min(100, Math.round(data.processed * 100 / data.total)) : 0;
+        progressBar.style.width = `${percent}%`;
+        progressBar.textContent = `${percent}%`;
+        progressBar.setAttribute('aria-valuenow', percent);
 
-// Показать детали сотрудника
-function showEmployeeDetails(employeeId) {
-    const modal = new bootstrap.Modal(document.getElementById('employeeDetailsModal'));
-    const modalBody = document.getElementById('employeeDetails');
-
-    modalBody.innerHTML = `
-        <div class="text-center">
-            <div class="spinner-border" role="status">
-                <span class="visually-hidden">Загрузка...</span>
-            </div>
-            <p>Загрузка информации...</p>
-        </div>
-    `;
-
-    modal.show();
-
-    fetch(`/api/employees/${employeeId}/`)
-        .then(response => {
-            if (!response.ok) {
-                throw new Error('Ошибка загрузки данных');
-            }
-            return response.json();
-        })
-        .then(data => {
-            modalBody.innerHTML = `
-                <div class="employee-details-content">
-                    <h4>${data.full_name}</h4>
-                    <div class="hierarchy-badge">${data.hierarchy}</div>
-                    
-                    <div class="details-grid">
-                        <div class="detail-item">
-                            <strong>Должность:</strong>
-                            <span>${data.position}</span>
-                        </div>
-                        <div class="detail-item">
-                            <strong>Подразделение:</strong>
-                            <span>${data.department}</span>
-                        </div>
-                        <div class="detail-item">
-                            <strong>Телефон:</strong>
-                            <span>${data.phone}</span>
-                        </div>
-                        <div class="detail-item">
-                            <strong>Внутренний телефон:</strong>
-                            <span>${data.internal_phone}</span>
-                        </div>
-                        <div class="detail-item">
-                            <strong>Email:</strong>
-                            <span>${data.email}</span>
-                        </div>
-                        <div class="detail-item">
-                            <strong>Кабинет:</strong>
-                            <span>${data.room}</span>
-                        </div>
-                    </div>
-                </div>
-            `;
-        })
-        .catch(error => {
-            console.error('Ошибка:', error);
-            modalBody.innerHTML = `
-                <div class="alert alert-danger">
-                    <i class="bi bi-exclamation-triangle"></i>
-                    Ошибка при загрузке информации о сотруднике
-                </div>
-            `;
-        });
-}
-
-// Загрузка формы сотрудника
-function loadEmployeeForm(employeeId = null) {
-    const modal = new bootstrap.Modal(document.getElementById('modal'));
-    const modalContent = document.getElementById('modal-content');
-
-    modalContent.innerHTML = `
-        <div class="text-center">
-            <div class="spinner-border" role="status">
-                <span class="visually-hidden">Загрузка...</span>
-            </div>
-            <p>Загрузка формы...</p>
-        </div>
-    `;
-
-    let url = '/api/employees/form/';
-    if (employeeId) {
-        url += `${employeeId}/`;
+        let message = data.status === 'pending' ? 'Задание в очереди...' : `Обработано: ${data.processed} из ${data.total || '?'}`;
+        if (data.rows_per_second) {
+            message += ` (${data.rows_per_second} строк/с)`;
+        }
+        progressMessage.textContent = message;
     }
 
-    fetch(url)
-        .then(response => {
-            if (!response.ok) {
-                throw new Error('Ошибка загрузки формы');
-            }
-            return response.text();
-        })
-        .then(html => {
-            modalContent.innerHTML = html;
-
-            // Добавляем обработчик отправки формы
-            const form = document.getElementById('employeeForm');
-            if (form) {
-                form.addEventListener('submit', handleEmployeeFormSubmit);
-            }
+    function showResult(data) {
+        importProgress.style.display = 'none';
+        importResult.style.display = 'block';
 
-            modal.show();
-        })
-        .catch(error => {
-            console.error('Ошибка:', error);
-            modalContent.innerHTML = `
-                <div class="alert alert-danger">
-                    <i class="bi bi-exclamation-triangle"></i>
-                    Ошибка при загрузке формы
-                </div>
-            `;
-        });
-}
+        // Скрываем все алерты
+        document.getElementById('successAlert').style.display = 'none';
+        document.getElementById('partialAlert').style.display = 'none';
+        document.getElementById('previewAlert').style.display = 'none';
+        document.getElementById('errorAlert').style.display = 'none';
+        document.getElementById('errorDetails').style.display = 'none';
 
-// Обработчик отправки формы сотрудника
-function handleEmployeeFormSubmit(e) {
-    e.preventDefault();
+        const errors = data.errors || [];
 
-    const form = e.target;
-    const formData = new FormData(form);
-    const url = form.action;
-    const method = 'POST';
-
-    const submitButton = form.querySelector('button[type="submit"]');
-    const originalText = submitButton.innerHTML;
-    submitButton.innerHTML = `
-        <span class="spinner-border spinner-border-sm" role="status" aria-hidden="true"></span>
-        Сохранение...
-    `;
-    submitButton.disabled = true;
-
-    fetch(url, {
-        method: method,
-        body: formData,
-        headers: {
-            'X-Requested-With': 'XMLHttpRequest'
+        // Набор изменений применён: повторно применять нечего
+        if (applyForm && data.status !== 'preview') {
+            applyForm.style.display = 'none';
         }
-    })
-        .then(response => response.json())
-        .then(data => {
-            if (data.success) {
-                // Закрываем модальное окно и обновляем список
-                const modal = bootstrap.Modal.getInstance(document.getElementById('modal'));
-                modal.hide();
 
-                // Показываем сообщение об успехе
-                showNotification('Сотрудник успешно сохранен', 'success');
-
-                // Обновляем содержимое страницы
-                setTimeout(() => {
-                    window.location.reload();
-                }, 1000);
-            } else {
-                // Показываем ошибки валидации
-                showFormErrors(form, data.errors || data.error);
-                submitButton.innerHTML = originalText;
-                submitButton.disabled = false;
+        if (data.status === 'success') {
+            document.getElementById('successAlert').style.display = 'block';
+            document.getElementById('successMessage').textContent =
+                `Успешно обработано: ${data.total} записей. Добавлено: ${data.added}, Обновлено: ${data.updated}` +
+                (data.unchanged ? `, из них без изменений: ${data.unchanged}` : '');
+        }
+        else if (data.status === 'preview') {
+            const summary = data.summary;
+            document.getElementById('previewAlert').style.display = 'block';
+            document.getElementById('previewMessage').textContent =
+                `Строк: ${summary.total}. Будет добавлено: ${summary.added}, обновлено: ${summary.updated}, ` +
+                `без изменений: ${summary.unchanged}, нет в файле: ${summary.orphaned}. Ошибок: ${summary.errors}`;
+            document.getElementById('previewLink').href = data.preview_url;
+        }
+        else if (data.status === 'partial') {
+            document.getElementById('partialAlert').style.display = 'block';
+            document.getElementById('partialMessage').textContent =
+                `Обработано: ${data.total} записей. Добавлено: ${data.added}, Обновлено: ${data.updated}` +
+                (data.unchanged ? `, из них без изменений: ${data.unchanged}` : '') + `. Ошибок: ${errors.length}`;
+
+            if (errors.length > 0) {
+                document.getElementById('errorDetails').style.display = 'block';
+                document.getElementById('errorDetailsContent').textContent = errors.join('\n');
             }
-        })
-        .catch(error => {
-            console.error('Ошибка:', error);
-            showNotification('Ошибка при сохранении', 'error');
-            submitButton.innerHTML = originalText;
-            submitButton.disabled = false;
-        });
-}
-
-// Удаление сотрудника
-function deleteEmployee(employeeId) {
-    if (!confirm('Вы уверены, что хотите удалить этого сотрудника?')) {
-        return;
-    }
-
-    fetch(`/api/employees/delete/${employeeId}/`, {
-        method: 'DELETE',
-        headers: {
-            'X-CSRFToken': getCSRFToken(),
-            'X-Requested-With': 'XMLHttpRequest'
         }
-    })
-        .then(response => response.json())
-        .then(data => {
-            if (data.success) {
-                showNotification('Сотрудник успешно удален', 'success');
-                // Обновляем содержимое страницы
-                setTimeout(() => {
-                    window.location.reload();
-                }, 1000);
-            } else {
-                showNotification('Ошибка при удалении: ' + (data.error || 'Неизвестная ошибка'), 'error');
+        else {
+            document.getElementById('errorAlert').style.display = 'block';
+            document.getElementById('errorMessage').textContent = data.error || errors[0] || 'Произошла неизвестная ошибка';
+            if (errors.length > 1) {
+                document.getElementById('errorDetails').style.display = 'block';
+                document.getElementById('errorDetailsContent').textContent = errors.join('\n');
             }
-        })
-        .catch(error => {
-            console.error('Ошибка:', error);
-            showNotification('Ошибка при удалении сотрудника', 'error');
-        });
-}
-
-// Вспомогательные функции
-function debounce(func, wait) {
-    let timeout;
-    return function executedFunction(...args) {
-        const later = () => {
-            clearTimeout(timeout);
-            func(...args);
-        };
-        clearTimeout(timeout);
-        timeout = setTimeout(later, wait);
-    };
-}
-
-function getCSRFToken() {
-    return document.querySelector('[name=csrfmiddlewaretoken]')?.value || '';
-}
-
-function showLoading(elementId) {
-    const element = document.getElementById(elementId);
-    if (element) {
-        element.innerHTML = `
-            <div class="text-center">
-                <div class="spinner-border" role="status">
-                    <span class="visually-hidden">Загрузка...</span>
-                </div>
-            </div>
-        `;
+        }
     }
-}
 
-function showError(elementId, message) {
-    const element = document.getElementById(elementId);
-    if (element) {
-        element.innerHTML = `
-            <div class="alert alert-danger">
-                <i class="bi bi-exclamation-triangle"></i>
-                ${message}
-            </div>
-        `;
+    function showNetworkError(error) {
+        importProgress.style.display = 'none';
+        importResult.style.display = 'block';
+        document.getElementById('errorAlert').style.display = 'block';
+        document.getElementById('errorMessage').textContent = 'Ошибка сети: ' + error.message;
+        resetButton();
     }
-}
 
-function showNotification(message, type = 'info') {
-    // Создаем уведомление
-    const alertClass = type === 'success' ? 'alert-success' :
-        type === 'error' ? 'alert-danger' : 'alert-info';
+    // Опрашиваем состояние фонового задания до его завершения
+    function pollProgress(url) {
+        fetch(url, { headers: { 'Accept': 'application/json' } })
+            .then(response => response.json())
+            .then(data => {
+                if (data.finished) {
+                    showResult(data);
+                    resetButton();
+                    return;
+                }
+                showProgress(data);
+                setTimeout(() => pollProgress(url), POLL_INTERVAL);
+            })
+            .catch(showNetworkError);
+    }
 
-    const notification = document.createElement('div');
-    notification.className = `alert ${alertClass} alert-dismissible fade show`;
-    notification.style.cssText = `
-        position: fixed;
-        top: 20px;
-        right: 20px;
-        z-index: 9999;
-        min-width: 300px;
-    `;
-    notification.innerHTML = `
-        ${message}
-        <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
-    `;
+    // Отправляет форму и отслеживает созданное фоновое задание
+    function submitJob(url, formData) {
+        importResult.style.display = 'none';
 
-    document.body.appendChild(notification);
+        fetch(url, {
+            method: 'POST',
+            body: formData,
+            headers: {
+                'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]').value
+            }
+        })
+            .then(response => response.json())
+            .then(data => {
+                if (data.progress_url) {
+                    showProgress({ status: data.status, processed: 0, total: 0 });
+                    pollProgress(data.progress_url);
+                } else {
+                    showResult(data);
+                    resetButton();
+                }
+            })
+            .catch(showNetworkError);
+    }
 
-    // Автоматическое скрытие через 5 секунд
-    setTimeout(() => {
-        if (notification.parentNode) {
-            notification.parentNode.removeChild(notification);
-        }
-    }, 5000);
-}
+    if (importForm) {
+        importForm.addEventListener('submit', function (e) {
+            e.preventDefault();
 
-function showFormErrors(form, errors) {
-    // Очищаем предыдущие ошибки
-    const errorElements = form.querySelectorAll('.error-message');
-    errorElements.forEach(el => el.remove());
+            const formData = new FormData(this);
+            const fileInput = document.getElementById('excel_file');
 
-    const errorFields = form.querySelectorAll('.is-invalid');
-    errorFields.forEach(el => el.classList.remove('is-invalid'));
+            if (!fileInput.files[0]) {
+                alert('Пожалуйста, выберите файл');
+                return;
+            }
 
-    if (typeof errors === 'string') {
-        // Общая ошибка
-        showNotification(errors, 'error');
-        return;
+            lockButton(importBtn, 'Загрузка...');
+            submitJob('/import/', formData);
+        });
     }
 
-    // Показываем ошибки для конкретных полей
-    for (const field in errors) {
-        const input = form.querySelector(`[name="${field}"]`);
-        if (input) {
-            input.classList.add('is-invalid');
-            const errorDiv = document.createElement('div');
-            errorDiv.className = 'error-message text-danger small mt-1';
-            errorDiv.textContent = errors[field];
-            input.parentNode.appendChild(errorDiv);
-        }
-    }
-}
+    if (applyForm) {
+        applyForm.addEventListener('submit', function (e) {
+            e.preventDefault();
 
-function initModals() {
-    // Очистка модальных окон при закрытии
-    const modals = document.querySelectorAll('.modal');
-    modals.forEach(modal => {
-        modal.addEventListener('hidden.bs.modal', function () {
-            const modalContent = this.querySelector('.modal-content');
-            if (modalContent) {
-                modalContent.innerHTML = '';
+            if (!confirm('Применить изменения к справочнику?')) {
+                return;
             }
+
+            lockButton(applyBtn, 'Применение...');
+            submitJob(this.action, new FormData(this));
         });
-    });
-}
\ No newline at end of file
+    }
+});